@@ -0,0 +1,81 @@
+import hashlib
+import hmac
+import json
+import os
+import secrets
+
+# Headless authentication for batch jobs and the generation server. Unlike auth.auth it
+# never prompts and never imports rich: the verdict comes from an API key passed through
+# the environment or a key file, and is computed once per process.
+
+API_KEY_ENV = 'FAKER_MAKER_API_KEY'
+API_KEY_FILE_ENV = 'FAKER_MAKER_API_KEY_FILE'
+API_KEY_SHA256_ENV = 'FAKER_MAKER_API_KEY_SHA256'
+
+AUTH_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'auth.json')
+
+_cached_verdict = None # (allowed, reason) once check_headless_auth has run
+
+def hash_api_key(api_key):
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+def _read_auth_file():
+    try:
+        with open(AUTH_FILE, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def _read_key_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read().strip()
+
+def _evaluate(key_file):
+    key_file = key_file or os.environ.get(API_KEY_FILE_ENV)
+    api_key = os.environ.get(API_KEY_ENV)
+    if not api_key and key_file:
+        try:
+            api_key = _read_key_file(key_file)
+        except OSError as e:
+            return False, f"Could not read API key file {key_file}: {e}"
+
+    # The expected digest can come from the environment so containers need no auth.json.
+    expected_digest = os.environ.get(API_KEY_SHA256_ENV)
+    credentials = None
+    if not expected_digest:
+        credentials = _read_auth_file()
+        expected_digest = credentials.get('api_key_sha256')
+
+    if api_key:
+        if not expected_digest:
+            return False, "An API key was provided but no key is registered (run with --create-api-key)."
+        if hmac.compare_digest(hash_api_key(api_key), expected_digest.lower()):
+            return True, "API key accepted."
+        return False, "Invalid API key."
+
+    # No key supplied: accept an existing "stay logged in" session, but never prompt.
+    if credentials is None:
+        credentials = _read_auth_file()
+    if credentials.get('stay_logged_in', False):
+        return True, "Using saved login session."
+    return False, f"No credentials for headless mode. Set {API_KEY_ENV} or {API_KEY_FILE_ENV}, or pass --auth-key-file."
+
+def check_headless_auth(debug_print_func, key_file=None):
+    """
+    Returns (allowed, reason) for a non-interactive run without any prompts.
+    The result is cached, so later calls in the same process cost nothing.
+    """
+    global _cached_verdict
+    if _cached_verdict is None:
+        _cached_verdict = _evaluate(key_file)
+        debug_print_func(f"Headless auth: {_cached_verdict[1]}")
+    return _cached_verdict
+
+def create_api_key():
+    """Generates a new API key, registers its SHA-256 digest in auth.json and returns the key."""
+    api_key = secrets.token_urlsafe(32)
+    credentials = _read_auth_file()
+    credentials['api_key_sha256'] = hash_api_key(api_key)
+    with open(AUTH_FILE, 'w') as f:
+        json.dump(credentials, f)
+    return api_key
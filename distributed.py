@@ -0,0 +1,414 @@
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import time
+
+from utils.constraints import constraints_from_dict
+from utils.data_loader import load_region_data, load_regions_config
+from utils.generation_job import SEED_BITS, GenerationJob, JobCancelled
+from utils.json_backend import dumps, load_path, loads
+from utils.sharded_output import merge_manifests, write_json_atomic
+
+# Distributed generation over a shared job directory (a local disk for several processes on
+# one machine, or NFS and the like for several hosts). The coordinator splits a seeded run
+# into work units of consecutive indices, one file per unit under units/pending/. A worker
+# claims a unit by renaming its file into units/claimed/ (rename is atomic, so exactly one
+# worker wins) and stamping it with a claim token (worker id and attempt number). It
+# generates that index range as a GenerationJob under a shard prefix of its own for the
+# attempt (unit000000-a1), and moves the unit to units/done/, or to units/failed/ with the
+# error. While it works it touches the claimed file; the coordinator fails units whose claim
+# has not been touched within the claim timeout (dead or hung worker) and requeues failed
+# units until they run out of attempts. A worker whose claim was taken back finds another
+# token in the claimed file, stops, and cannot mark the unit done or failed; since every
+# attempt writes its own files, it never touches the output of the attempt that replaced it.
+# Profile i depends only on (seed, region, i), so the output is the same whichever workers
+# produced it. When every unit is done the coordinator merges the manifests of the attempts
+# that finished, in index order, and deletes the output of abandoned attempts.
+#
+# job_dir/
+#     job.json                  the run: seed, constraints, index range, unit size, shard settings
+#     status.json               written by the coordinator once the job is complete or has failed
+#     units/{pending,claimed,done,failed}/unit000000.json
+#     output/unit000000-a1-00001.ndjson.gz, unit000000-a1-manifest.json, ..., profiles-manifest.json
+
+JOB_VERSION = 2
+DEFAULT_UNIT_SIZE = 100000
+CLAIM_TIMEOUT_SECONDS = 120 # Claims not touched for this long are taken back
+HEARTBEATS_PER_TIMEOUT = 4 # Workers touch their claim this many times per claim timeout
+MAX_UNIT_ATTEMPTS = 3
+POLL_SECONDS = 1.0
+UNIT_STATES = ('pending', 'claimed', 'done', 'failed')
+
+def _no_debug(*args, **kwargs):
+    pass
+
+def unit_name(unit_id):
+    return f"unit{unit_id:06d}"
+
+def attempt_prefix(unit):
+    """Returns the shard prefix of a claimed unit's current attempt."""
+    return f"{unit['name']}-a{unit['attempts'] + 1}"
+
+class WorkQueue:
+    """The units of a job as files in job_dir/units/<state>/; moving a unit between states is a rename."""
+    def __init__(self, job_dir):
+        self.units_dir = os.path.join(job_dir, 'units')
+
+    def path(self, state, name):
+        return os.path.join(self.units_dir, state, f"{name}.json")
+
+    def create(self):
+        for state in UNIT_STATES:
+            state_dir = os.path.join(self.units_dir, state)
+            os.makedirs(state_dir, exist_ok=True)
+            for file_name in os.listdir(state_dir): # Left over from a job that was never started
+                os.unlink(os.path.join(state_dir, file_name))
+
+    def names(self, state):
+        return sorted(file_name[:-len('.json')] for file_name in os.listdir(os.path.join(self.units_dir, state))
+                      if file_name.endswith('.json'))
+
+    def counts(self):
+        return {state: len(self.names(state)) for state in UNIT_STATES}
+
+    def add(self, unit):
+        write_json_atomic(self.path('pending', unit['name']), unit)
+
+    def claim(self, worker_id):
+        """Moves the first pending unit to claimed and returns it, or returns None if none are pending."""
+        for name in self.names('pending'):
+            claimed_path = self.path('claimed', name)
+            try:
+                os.rename(self.path('pending', name), claimed_path)
+            except FileNotFoundError:
+                continue # Another worker got there first
+            unit = load_path(claimed_path)
+            unit = dict(unit, worker=worker_id, claim=f"{worker_id}#{unit['attempts'] + 1}", claimed_at=time.time())
+            write_json_atomic(claimed_path, unit)
+            return unit
+        return None
+
+    def holds(self, unit):
+        """Returns whether `unit` (as returned by claim) is still claimed under its token."""
+        try:
+            return load_path(self.path('claimed', unit['name'])).get('claim') == unit['claim']
+        except FileNotFoundError:
+            return False
+
+    def heartbeat(self, unit):
+        """Marks a claim as alive. Returns False if the claim has been taken back."""
+        if not self.holds(unit):
+            return False
+        try:
+            os.utime(self.path('claimed', unit['name']))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _take(self, unit):
+        """
+        Moves the claimed file out of the way if it still holds the unit's token, so nobody
+        else can act on the claim. Returns the file's new path, or None if the claim is gone.
+        """
+        if not self.holds(unit):
+            return None # Checked first so a stale worker does not even briefly move another worker's claim
+        claimed_path = self.path('claimed', unit['name'])
+        taken_path = f"{claimed_path}.{unit['attempts'] + 1}.taken"
+        try:
+            os.rename(claimed_path, taken_path)
+        except FileNotFoundError:
+            return None
+        if load_path(taken_path).get('claim') != unit['claim']:
+            os.rename(taken_path, claimed_path) # Another worker's claim; put it back
+            return None
+        return taken_path
+
+    def finish(self, unit, result):
+        """Records a claimed unit as done. Returns False (recording nothing) if the claim was taken back."""
+        taken_path = self._take(unit)
+        if taken_path is None:
+            return False
+        write_json_atomic(self.path('done', unit['name']), dict(unit, **result))
+        os.unlink(taken_path)
+        return True
+
+    def fail(self, unit, error):
+        """Records a claimed unit as failed, unless the claim was taken back."""
+        taken_path = self._take(unit)
+        if taken_path is None:
+            return
+        write_json_atomic(self.path('failed', unit['name']), dict(unit, attempts=unit['attempts'] + 1, error=error))
+        os.unlink(taken_path)
+
+    def _discard(self, state, name):
+        try:
+            os.unlink(self.path(state, name))
+        except FileNotFoundError:
+            pass
+
+    def expire_claims(self, timeout):
+        """Fails claims whose worker has not touched them for `timeout` seconds. Returns their names."""
+        expired = []
+        now = time.time()
+        claimed_dir = os.path.join(self.units_dir, 'claimed')
+        # Also picks up claims a worker took in finish()/fail() and then died holding
+        for file_name in sorted(os.listdir(claimed_dir)):
+            name = file_name.split('.', 1)[0]
+            claimed_path = os.path.join(claimed_dir, file_name)
+            try:
+                if now - os.stat(claimed_path).st_mtime < timeout:
+                    continue
+                failed_path = self.path('failed', name)
+                os.rename(claimed_path, failed_path) # The worker's next heartbeat sees the claim is gone
+            except FileNotFoundError:
+                continue # Finished or failed in the meantime
+            unit = load_path(failed_path)
+            write_json_atomic(failed_path, dict(unit, attempts=unit['attempts'] + 1,
+                                                error=f"worker {unit.get('worker')} stopped responding"))
+            expired.append(name)
+        return expired
+
+    def requeue_failed(self, max_attempts):
+        """Moves failed units back to pending. Returns the units that have used up their attempts."""
+        exhausted = []
+        for name in self.names('failed'):
+            unit = load_path(self.path('failed', name))
+            if os.path.exists(self.path('done', name)):
+                self._discard('failed', name) # The worker died after recording it done
+            elif unit['attempts'] >= max_attempts:
+                exhausted.append(unit)
+            else:
+                self.add(unit)
+                self._discard('failed', name)
+        return exhausted
+
+def load_job(job_dir):
+    spec = load_path(os.path.join(job_dir, 'job.json'))
+    if spec.get('version') != JOB_VERSION:
+        raise ValueError(f"{job_dir} was created by an incompatible version of the generator")
+    return spec
+
+def job_status(job_dir):
+    """Returns the coordinator's final status of the job, or None while it is running."""
+    status_path = os.path.join(job_dir, 'status.json')
+    return load_path(status_path) if os.path.exists(status_path) else None
+
+def create_job(job_dir, constraints, seed, start_index=0, unit_size=DEFAULT_UNIT_SIZE, output_format='json',
+               max_rows=None, max_bytes=None, compression='gzip', claim_timeout=CLAIM_TIMEOUT_SECONDS):
+    """
+    Splits profiles start_index .. start_index + constraints['num_profiles'] - 1 of `seed`
+    (picked at random if None) into units of `unit_size` in `job_dir` and returns the job.
+    If `job_dir` already holds the same job (a restarted coordinator) it is returned as is;
+    a different job raises ValueError. Shards hold one unit each unless max_rows or
+    max_bytes is given. Workers heartbeat HEARTBEATS_PER_TIMEOUT times per claim_timeout.
+    """
+    if unit_size < 1:
+        raise ValueError("The unit size must be at least 1.")
+    if claim_timeout <= 0:
+        raise ValueError("The claim timeout must be positive.")
+    total = constraints['num_profiles']
+    if total < 1:
+        raise ValueError("A distributed job needs at least one profile.")
+    # Round-tripped through JSON so it compares equal to the saved job
+    spec = loads(dumps({
+        'version': JOB_VERSION,
+        'seed': seed,
+        'constraints': constraints,
+        'start_index': start_index,
+        'num_profiles': total,
+        'unit_size': unit_size,
+        'units': -(-total // unit_size),
+        'output_format': output_format,
+        'max_rows': max_rows or (None if max_bytes else unit_size),
+        'max_bytes': max_bytes,
+        'compression': compression,
+        'claim_timeout': claim_timeout,
+    }))
+    job_path = os.path.join(job_dir, 'job.json')
+    if os.path.exists(job_path):
+        existing = load_job(job_dir)
+        # A restarted coordinator keeps the job's seed (unless one is given) and claim timeout
+        if (existing != dict(spec, seed=existing['seed'], claim_timeout=existing['claim_timeout'])
+                or (seed is not None and seed != existing['seed'])):
+            raise ValueError(f"{job_dir} already holds a different job; choose another job directory")
+        return existing
+
+    if spec['seed'] is None:
+        spec['seed'] = random.SystemRandom().getrandbits(SEED_BITS)
+    queue = WorkQueue(job_dir)
+    queue.create()
+    os.makedirs(os.path.join(job_dir, 'output'), exist_ok=True)
+    for unit_id in range(spec['units']):
+        unit_start = start_index + unit_id * unit_size
+        queue.add({
+            'id': unit_id,
+            'name': unit_name(unit_id),
+            'start_index': unit_start,
+            'count': min(unit_size, start_index + total - unit_start),
+            'attempts': 0,
+        })
+    # Written last: workers only start once every unit is queued
+    write_json_atomic(job_path, spec)
+    return spec
+
+class _Heartbeat(threading.Thread):
+    """Touches a claimed unit until stopped; sets `lost` if the claim is taken back."""
+    def __init__(self, queue, unit, interval):
+        super().__init__(name='unit-heartbeat', daemon=True)
+        self.queue = queue
+        self.unit = unit
+        self.interval = interval
+        self.lost = threading.Event()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            if not self.queue.heartbeat(self.unit):
+                self.lost.set()
+                return
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+def run_unit(job_dir, spec, unit, region_data, constraints, debug_print_func=_no_debug, stop_event=None):
+    """Generates a claimed unit's index range into job_dir/output under its attempt's prefix. Returns the result for finish()."""
+    prefix = attempt_prefix(unit)
+    job = GenerationJob(
+        os.path.join(job_dir, 'output'), region_data, dict(constraints, num_profiles=unit['count']),
+        output_format=spec['output_format'], max_rows=spec['max_rows'], max_bytes=spec['max_bytes'],
+        compression=spec['compression'], seed=spec['seed'], start_index=unit['start_index'],
+        prefix=prefix, debug_print_func=debug_print_func,
+    )
+    job.run(stop_event=stop_event)
+    return {'rows': unit['count'], 'prefix': prefix, 'manifest': f"{prefix}-manifest.json"}
+
+def run_worker(job_dir, data_dir, worker_id=None, log_func=print, debug_print_func=_no_debug):
+    """
+    Claims and generates units of the job in `job_dir` until the coordinator marks the job
+    complete or failed, loading region data from this machine's `data_dir`. Returns the
+    number of units this worker finished.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    while not os.path.exists(os.path.join(job_dir, 'job.json')):
+        if job_status(job_dir) is not None:
+            return 0
+        time.sleep(POLL_SECONDS)
+    spec = load_job(job_dir)
+    regions, _ = load_regions_config(data_dir)
+    constraints = constraints_from_dict(spec['constraints'], regions)
+    region_config = next((region for region in regions if region['id'] == constraints['region']), None)
+    if region_config is None:
+        raise ValueError(f"Region {constraints['region']!r} is not in {data_dir}/regions.json")
+    region_data = load_region_data(os.path.join(data_dir, region_config['file']), data_dir)
+
+    queue = WorkQueue(job_dir)
+    finished = 0
+    while job_status(job_dir) is None:
+        unit = queue.claim(worker_id)
+        if unit is None:
+            time.sleep(POLL_SECONDS)
+            continue
+        log_func(f"[{worker_id}] {unit['name']}: profiles {unit['start_index']}..{unit['start_index'] + unit['count'] - 1}"
+                 f" (attempt {unit['attempts'] + 1})")
+        heartbeat = _Heartbeat(queue, unit, spec['claim_timeout'] / HEARTBEATS_PER_TIMEOUT)
+        heartbeat.start()
+        try:
+            result = run_unit(job_dir, spec, unit, region_data, constraints, debug_print_func, heartbeat.lost)
+        except JobCancelled:
+            log_func(f"[{worker_id}] {unit['name']}: claim was taken back, dropping the unit")
+            continue
+        except Exception as e: # Reported to the coordinator, which retries the unit elsewhere
+            log_func(f"[{worker_id}] {unit['name']} failed: {type(e).__name__}: {e}")
+            queue.fail(unit, f"{type(e).__name__}: {e}")
+            continue
+        finally:
+            heartbeat.stop()
+        if queue.finish(unit, dict(result, worker=worker_id)):
+            finished += 1
+    return finished
+
+def _worker_process(job_dir, data_dir, worker_id):
+    run_worker(job_dir, data_dir, worker_id, log_func=lambda message: print(message, flush=True))
+
+def _remove_abandoned_attempts(output_dir, done_units):
+    """Deletes the files of attempts that did not finish their unit (e.g. of a worker that was taken off it)."""
+    kept = tuple(f"{unit['prefix']}-" for unit in done_units)
+    unit_prefixes = tuple(f"{unit['name']}-a" for unit in done_units)
+    for file_name in os.listdir(output_dir):
+        if file_name.startswith(unit_prefixes) and not file_name.startswith(kept):
+            try:
+                os.unlink(os.path.join(output_dir, file_name))
+            except FileNotFoundError:
+                pass
+
+def run_coordinator(job_dir, data_dir=None, local_workers=0, max_attempts=MAX_UNIT_ATTEMPTS,
+                    log_func=print, poll_seconds=POLL_SECONDS):
+    """
+    Watches the job in `job_dir` (see create_job) until every unit is done, taking back
+    expired claims and requeueing failed units, then merges the manifests of the finished
+    attempts into output/profiles-manifest.json and returns the merged manifest. With
+    local_workers, that many worker processes are started on this machine (and restarted if
+    they die). Raises ValueError if a unit fails max_attempts times.
+    """
+    spec = load_job(job_dir)
+    claim_timeout = spec['claim_timeout']
+    queue = WorkQueue(job_dir)
+    status = job_status(job_dir)
+    if status is not None and status['state'] == 'failed':
+        raise ValueError(f"The job in {job_dir} has failed: {status['error']}")
+
+    processes = []
+    restarts_left = local_workers * max_attempts
+    def start_worker(number):
+        process = multiprocessing.Process(target=_worker_process, args=(job_dir, data_dir, f"{socket.gethostname()}-local{number}"),
+                                          name=f"worker-{number}", daemon=True)
+        process.start()
+        return process
+    if status is None:
+        processes = [start_worker(number) for number in range(local_workers)]
+
+    last_counts = None
+    try:
+        while status is None:
+            for name in queue.expire_claims(claim_timeout):
+                log_func(f"{name}: claim expired, will retry")
+            exhausted = queue.requeue_failed(max_attempts)
+            if exhausted:
+                errors = '; '.join(f"{unit['name']}: {unit['error']}" for unit in exhausted)
+                status = {'state': 'failed', 'error': f"units failed {max_attempts} times: {errors}"}
+                write_json_atomic(os.path.join(job_dir, 'status.json'), status)
+                raise ValueError(status['error'])
+
+            counts = queue.counts()
+            if counts != last_counts:
+                log_func(f"Units: {counts['done']}/{spec['units']} done, {counts['claimed']} running, "
+                         f"{counts['pending']} pending, {counts['failed']} to retry")
+                last_counts = counts
+            if counts['done'] == spec['units'] and counts['claimed'] == counts['pending'] == counts['failed'] == 0:
+                break
+
+            for number, process in enumerate(processes):
+                if not process.is_alive() and restarts_left > 0:
+                    log_func(f"Local worker {number} exited with code {process.exitcode}; restarting it")
+                    restarts_left -= 1
+                    processes[number] = start_worker(number)
+            time.sleep(poll_seconds)
+
+        output_dir = os.path.join(job_dir, 'output')
+        done_units = [load_path(queue.path('done', unit_name(unit_id))) for unit_id in range(spec['units'])]
+        manifest_paths = [os.path.join(output_dir, unit['manifest']) for unit in done_units]
+        manifest = merge_manifests(manifest_paths, os.path.join(output_dir, 'profiles-manifest.json'))
+        _remove_abandoned_attempts(output_dir, done_units)
+        if manifest['total_rows'] != spec['num_profiles']:
+            raise ValueError(f"The units hold {manifest['total_rows']} profiles, expected {spec['num_profiles']}")
+        if status is None:
+            write_json_atomic(os.path.join(job_dir, 'status.json'), {'state': 'complete', 'total_rows': manifest['total_rows']})
+        return manifest
+    finally:
+        for process in processes: # Workers exit on their own once status.json exists
+            process.join(timeout=max(claim_timeout / HEARTBEATS_PER_TIMEOUT, POLL_SECONDS) * 2 + 1)
+            if process.is_alive():
+                process.terminate()
@@ -3,30 +3,23 @@ import os
 import argparse
 import json
 import sys
-import csv
 
-import questionary
-from rich.console import Console
-from rich.panel import Panel
-from rich.table import Table
-from rich.json import JSON
-
-from auth.auth import check_login_status
 from utils.data_loader import load_region_data, load_regions_config
-from user_input import get_user_input_generator
-from profile_generator import generate_fake_personal_info
-from profile_generator.validation_checks.profile_checker import check_profile
-from profile_generator.validation_checks.profile_logic_checker import check_profile_logic
+from utils.json_backend import dump_path
+from utils.csv_writer import write_profiles_csv
+from utils.region_schema import RegionDataError
+from utils.constraints import constraints_from_args
+from profile_generator import generate_fake_personal_info, generate_profiles_slice, RejectionStats
 from profile_generator.validation_checks.config_checker import check_email_phone_age_config
 
-from utils.system_checker import check_system_requirements
-from utils.custom_styles import custom_style
-from utils.output_formatter import _output_console
-
+# UI libraries (questionary, rich, textual), auth and the interactive wizard are imported
+# inside the functions that use them, so --non-interactive runs that write JSON/CSV start
+# with only the generator core loaded.
 
 DEBUG_MODE = False # Initialize at module level, will be set by args.debug
 display_logo_on_start = True
 apply_consistency_checks_for_generation = False
+MAX_REPORTED_INCONSISTENT_PROFILES = 20 # Profiles listed individually by the consistency checks
 
 def debug_print(*args, is_error=False, **kwargs):
     global DEBUG_MODE
@@ -36,20 +29,28 @@ def debug_print(*args, is_error=False, **kwargs):
 
 generated_profiles = [] # Global variable to store generated profiles
 
-def run_generator(args, console: Console, debug_print_func, is_cli_direct_mode=False):
+def run_generator(args, console, debug_print_func, is_cli_direct_mode=False):
     """Main function to run the fake personal information generator."""
     script_dir = os.path.dirname(os.path.realpath(__file__))
     data_dir = os.path.join(script_dir, 'data')
     regions, region_aliases = load_regions_config(data_dir)
 
-    constraints = get_user_input_generator(regions, data_dir, console, debug_print_func, args, is_cli_direct_mode)
-    # The generator yields, so we get the first result
-    if hasattr(constraints, '__iter__') and not isinstance(constraints, dict):
-        constraints = next(constraints, {})
+    if args.non_interactive or is_cli_direct_mode:
+        constraints = constraints_from_args(args, regions, debug_print_func)
+        debug_print_func(f"Constraints from args (non-interactive): {constraints}")
+    else:
+        from user_input import get_user_input_generator
+        constraints = get_user_input_generator(regions, data_dir, console, debug_print_func, args, is_cli_direct_mode)
+        # The generator yields, so we get the first result
+        if hasattr(constraints, '__iter__') and not isinstance(constraints, dict):
+            constraints = next(constraints, {})
 
     if not constraints or 'mode' not in constraints:
         console.print("[bold red]Profile generation cancelled or an error occurred. Exiting.[/bold red]")
         return
+    if args.start_index is not None and args.seed is None:
+        console.print("[bold red]Error: --start-index needs --seed.[/bold red]")
+        return
 
     selected_region_config = next((r for r in regions if r['id'] == constraints['region']), None)
     if not selected_region_config:
@@ -58,7 +59,12 @@ def run_generator(args, console: Console, debug_print_func, is_cli_direct_mode=F
 
     data_file_name = selected_region_config['file']
     region_data_path = os.path.join(data_dir, data_file_name)
-    region_data = load_region_data(region_data_path, data_dir)
+    try:
+        region_data = load_region_data(region_data_path, data_dir)
+    except RegionDataError as e:
+        console.print("[bold red]Error: the region data could not be loaded.[/bold red]")
+        console.print(str(e), markup=False)
+        return
 
     config_warnings = check_email_phone_age_config(region_data)
     if config_warnings:
@@ -68,14 +74,43 @@ def run_generator(args, console: Console, debug_print_func, is_cli_direct_mode=F
 
     console.print("\n[bold cyan]--- Generating Profiles ---\n")
 
+    output_format = constraints.get('output_format', 'console')
+    output_dir = args.output_dir or os.path.join(script_dir, 'generated_profiles')
+    if output_format in ('json', 'csv') and (args.shard_rows or args.shard_size_mb or args.resume):
+        generate_sharded(args, console, region_data, constraints, debug_print_func, output_dir)
+        return
+
     global generated_profiles
     profiles = []
     
-    # This is now handled by a prompt after generation
-    apply_consistency_checks_for_generation = False
+    # Valid-only mode checks each stage while generating; otherwise checks are offered after generation
+    apply_consistency_checks_for_generation = constraints.get('valid_only', False)
+    rejection_stats = RejectionStats() if apply_consistency_checks_for_generation else None
+
+    cache = open_profile_cache(args)
+    from_cache = False
+    try:
+        if args.seed is not None and cache is not None:
+            generated, from_cache = cache.profiles_slice(region_data, constraints, args.seed, args.start_index or 0, constraints['num_profiles'],
+                                                         debug_print_func, apply_consistency_checks_for_generation, rejection_stats)
+            profiles.extend(generated)
+        elif args.seed is not None:
+            # Counter-based: profile i depends only on (seed, region, i), so any slice can be generated on its own
+            profiles.extend(generate_profiles_slice(region_data, constraints, args.seed, args.start_index or 0, constraints['num_profiles'],
+                                                    debug_print_func, apply_consistency_checks_for_generation, rejection_stats))
+        else:
+            for _ in range(constraints['num_profiles']):
+                profiles.append(generate_fake_personal_info(region_data, constraints, debug_print_func, apply_consistency_checks_for_generation, rejection_stats))
+    except ValueError as e:
+        console.print(f"[bold red]Error: {e}[/bold red]")
+        return
 
-    for _ in range(constraints['num_profiles']):
-        profiles.append(generate_fake_personal_info(region_data, constraints, debug_print_func, apply_consistency_checks_for_generation))
+    if from_cache:
+        console.print(f"Loaded {len(profiles)} profiles from the cache in {cache.cache_dir}.")
+    elif rejection_stats is not None:
+        console.print("[bold cyan]Valid-only generation:[/bold cyan]")
+        for line in rejection_stats.summary_lines():
+            console.print(f"  {line}")
 
     generated_profiles = profiles
     debug_print_func(f"Generated {len(profiles)} profiles.")
@@ -86,68 +121,171 @@ def run_generator(args, console: Console, debug_print_func, is_cli_direct_mode=F
         return
 
     # --- Output and Saving ---
-    output_format = constraints.get('output_format', 'console')
     if output_format == 'console':
+        from utils.output_formatter import _output_console
         _output_console(profiles, console, constraints)
     
     elif output_format in ['json', 'csv']:
         console.print(f"Generated {len(profiles)} profiles.")
         save_output = True
         if not args.non_interactive:
+            import questionary
+            from utils.custom_styles import custom_style
             save_output = questionary.confirm(f"Save the generated profiles to a .{output_format} file?", style=custom_style).ask()
         
         if save_output:
-            output_dir = os.path.join(script_dir, 'generated_profiles')
             os.makedirs(output_dir, exist_ok=True)
             file_path = os.path.join(output_dir, f"profiles.{output_format}")
             
             try:
-                if output_format == 'json':
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        json.dump(profiles, f, indent=4)
+                if args.compression and args.compression != 'none':
+                    file_path, report = save_compressed(profiles, file_path, output_format, constraints, args.compression, args.json_indent)
+                    console.print(f"Compression {report.summary()}")
+                elif output_format == 'json':
+                    dump_path(profiles, file_path, args.json_indent)
                 elif output_format == 'csv':
-                    with open(file_path, 'w', newline='', encoding='utf-8') as f:
-                        if profiles:
-                            writer = csv.DictWriter(f, fieldnames=profiles[0].keys())
-                            writer.writeheader()
-                            writer.writerows(profiles)
+                    write_profiles_csv(profiles, file_path, constraints)
                 console.print(f"[bold green]Profiles saved to {file_path}[/bold green]")
+            except ValueError as e:
+                console.print(f"[bold red]Error: {e}[/bold red]")
             except IOError as e:
                 console.print(f"[bold red]Error saving file: {e}[/bold red]")
 
     # --- Consistency Checks ---
     if not args.non_interactive:
+        import questionary
+        from utils.custom_styles import custom_style
+        from profile_generator.validation_checks.batch_validator import validate_batch
         run_checks = questionary.confirm("Run consistency checks on the generated profiles?", style=custom_style).ask()
         if run_checks:
             console.print("\n[bold cyan]--- Running Consistency Checks ---\n")
-            for i, profile in enumerate(profiles):
-                console.print(f"\n[bold green]Checking Profile {i+1}...[/bold green]")
-                
-                # Run basic profile checks
-                is_valid, basic_reasons = check_profile(profile, region_data, constraints, debug_print_func)
-                if not is_valid:
-                    console.print("[bold red]Basic Profile Check Failed:[/bold red]")
-                    for reason in basic_reasons:
-                        console.print(f"  - {reason}")
-                else:
-                    console.print("[bold green]Basic Profile Check Passed.[/bold green]")
-
-                # Run logic consistency checks
-                logic_errors = check_profile_logic(profile, debug_print_func)
-                if logic_errors:
-                    console.print("[bold yellow]Logic Consistency Check Warnings/Errors:[/bold yellow]")
-                    for error in logic_errors:
-                        console.print(f"  - {error}")
-                else:
-                    console.print("[bold green]Logic Consistency Check Passed.[/bold green]")
-
-                if is_valid and not logic_errors:
-                    console.print("[bold green]Profile is consistent.[/bold green]")
-                else:
-                    console.print("[bold yellow]Profile has inconsistencies or warnings.[/bold yellow]")
-
-def run_system_check(console: Console):
+            result = validate_batch(profiles, region_data)
+            failing = result.failing_indices()
+            for i in failing[:MAX_REPORTED_INCONSISTENT_PROFILES]:
+                console.print(f"[bold yellow]Profile {i+1} has inconsistencies:[/bold yellow]")
+                for rule in result.failing_rules(i):
+                    console.print(f"  - {rule}: {result.descriptions[rule]}")
+            if len(failing) > MAX_REPORTED_INCONSISTENT_PROFILES:
+                console.print(f"... and {len(failing) - MAX_REPORTED_INCONSISTENT_PROFILES} more inconsistent profiles.")
+
+            console.print("\n[bold cyan]Violations per rule:[/bold cyan]")
+            for rule, count in result.summary().items():
+                console.print(f"  {rule}: {count}")
+            if failing:
+                console.print(f"[bold yellow]{result.num_valid()} of {len(profiles)} profiles are consistent.[/bold yellow]")
+            else:
+                console.print(f"[bold green]All {len(profiles)} profiles are consistent.[/bold green]")
+
+def open_profile_cache(args):
+    """Returns the ProfileCache for seeded runs (--cache-dir or FAKER_MAKER_CACHE_DIR), or None if there is none."""
+    cache_dir = args.cache_dir or os.environ.get('FAKER_MAKER_CACHE_DIR')
+    if not cache_dir:
+        return None
+    from utils.profile_cache import ProfileCache
+    return ProfileCache(cache_dir, int(args.cache_max_mb * 1024 * 1024))
+
+def save_compressed(profiles, file_path, output_format, constraints, compression, json_indent=None):
+    """
+    Writes profiles to file_path plus the codec's extension, compressing on a background
+    thread. Returns the path written and its CompressionReport.
+    """
+    import io
+    from utils.compression import CODECS, CompressionReport, open_output
+    from utils.csv_writer import ProfileCsvWriter, profile_columns
+    from utils.json_backend import dumps_bytes
+    report = CompressionReport(compression)
+    file_path += CODECS[compression].extension if compression in CODECS else ''
+    out = open_output(file_path, compression)
+    if output_format == 'json':
+        with out:
+            out.write(dumps_bytes(profiles, json_indent))
+    else:
+        with io.TextIOWrapper(out, encoding='utf-8', newline='') as text:
+            writer = ProfileCsvWriter(text, profile_columns(constraints))
+            writer.write_many(profiles)
+            writer.flush()
+    report.add(out)
+    return file_path, report
+
+def generate_sharded(args, console, region_data, constraints, debug_print_func, output_dir):
+    """
+    Streams profiles straight into rotating shards plus a manifest, without keeping the batch
+    in memory, checkpointing after every shard so --resume can finish an interrupted run.
+    """
+    from utils.generation_job import GenerationJob
+    valid_only = constraints.get('valid_only', False)
+    rejection_stats = RejectionStats() if valid_only else None
+    job = GenerationJob(
+        output_dir, region_data, constraints,
+        output_format=constraints['output_format'],
+        max_rows=args.shard_rows,
+        max_bytes=int(args.shard_size_mb * 1024 * 1024) if args.shard_size_mb else None,
+        compression=args.compression or 'gzip',
+        seed=args.seed,
+        start_index=args.start_index or 0,
+        debug_print_func=debug_print_func,
+    )
+    try:
+        produced = job.run(resume=args.resume, stats=rejection_stats)
+    except ValueError as e:
+        console.print(f"[bold red]Error: {e}[/bold red]")
+        if job.writer is not None:
+            console.print(f"Profiles up to the last checkpoint are kept; rerun with --resume to continue ({job.state_path}).")
+        return
+
+    if job.writer is None:
+        console.print(f"[bold green]The job in {output_dir} is already complete.[/bold green]")
+        return
+    if rejection_stats is not None:
+        console.print("[bold cyan]Valid-only generation:[/bold cyan]")
+        for line in rejection_stats.summary_lines():
+            console.print(f"  {line}")
+    writer = job.writer
+    resumed = f" ({produced} in this run)" if args.resume else ""
+    console.print(f"[bold green]Wrote {writer.rows_written} profiles{resumed} to {len(writer.shards)} shards in {output_dir}[/bold green]")
+    console.print(f"Manifest: {writer.manifest_path} (seed {job.seed})")
+    console.print(f"Compression {writer.report.summary()}")
+
+def run_distributed(args, console, debug_print_func):
+    """
+    Runs the coordinator (--coordinate) or a worker (--work) of a job split across processes
+    or hosts that share the job directory (see distributed.py).
+    """
+    import distributed
+    script_dir = os.path.dirname(os.path.realpath(__file__))
+    data_dir = os.path.join(script_dir, 'data')
+    log = lambda message: console.print(message, markup=False)
+    try:
+        if args.work:
+            finished = distributed.run_worker(args.work, data_dir, log_func=log, debug_print_func=debug_print_func)
+            console.print(f"[bold green]Worker finished {finished} units; the job is {distributed.job_status(args.work)['state']}.[/bold green]")
+            return
+
+        regions, _ = load_regions_config(data_dir)
+        constraints = constraints_from_args(args, regions, debug_print_func)
+        output_format = constraints.get('output_format') or 'json'
+        if output_format not in ('json', 'csv'):
+            console.print("[bold red]Error: distributed jobs write json or csv shards.[/bold red]")
+            return
+        constraints['output_format'] = output_format
+        spec = distributed.create_job(
+            args.coordinate, constraints, args.seed, start_index=args.start_index or 0, unit_size=args.unit_size,
+            output_format=output_format, max_rows=args.shard_rows,
+            max_bytes=int(args.shard_size_mb * 1024 * 1024) if args.shard_size_mb else None,
+            compression=args.compression or 'gzip', claim_timeout=args.claim_timeout,
+        )
+        console.print(f"Job in {args.coordinate}: {spec['num_profiles']} profiles of seed {spec['seed']} in {spec['units']} units."
+                      f" Start workers with: main.py --work {args.coordinate}")
+        manifest = distributed.run_coordinator(args.coordinate, data_dir, local_workers=args.local_workers, log_func=log)
+    except (ValueError, RegionDataError) as e:
+        console.print(f"[bold red]Error: {e}[/bold red]")
+        return
+    console.print(f"[bold green]Wrote {manifest['total_rows']} profiles to {len(manifest['shards'])} shards in "
+                  f"{os.path.join(args.coordinate, 'output')}[/bold green]")
+
+def run_system_check(console):
     """Runs a check for essential files and libraries."""
+    from utils.system_checker import check_system_requirements
     console.print("\n[bold cyan]--- Running System Check ---\n")
     script_dir = os.path.dirname(os.path.realpath(__file__))
     data_dir = os.path.join(script_dir, 'data')
@@ -157,7 +295,7 @@ def run_system_check(console: Console):
     console.print("[bold cyan]--- System Check Complete ---\n")
 
 
-def display_logo(console: Console):
+def display_logo(console):
     """Displays the ASCII art logo from assets/logo.txt."""
     try:
         logo_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'assets', 'logo.txt')
@@ -171,8 +309,11 @@ def display_logo(console: Console):
         debug_print(f"Could not display logo: {e}", is_error=True)
 
 
-def show_main_menu(console: Console):
+def show_main_menu(console):
     """Displays the main menu and returns the user's choice."""
+    import questionary
+    from rich.panel import Panel
+    from utils.custom_styles import custom_style
     console.print(Panel("Fake Personal Information Generator - Main Menu", style="bold blue", expand=False, border_style="blue"))
     choice = questionary.select(
         "What would you like to do?",
@@ -192,12 +333,22 @@ def show_main_menu(console: Console):
     return choice
 
 
-def main():
-    console = Console()
+def create_console(args=None):
+    """
+    Returns the console used for output. Headless runs that write JSON/CSV get a
+    PlainConsole so rich is never imported; everything else gets a rich Console.
+    """
+    if args is not None and ((args.non_interactive and args.output_format in ('json', 'csv')) or args.coordinate or args.work):
+        from utils.plain_console import PlainConsole
+        return PlainConsole()
+    from rich.console import Console
+    return Console()
 
+
+def main():
     class CustomArgumentParser(argparse.ArgumentParser):
         def error(self, message):
-            console.print(f"[bold red]Error: {message}[/bold red]")
+            create_console().print(f"[bold red]Error: {message}[/bold red]")
             self.print_help()
             sys.exit(1)
 
@@ -224,10 +375,34 @@ def main():
     parser.add_argument("--exceptionality-score", type=int, help="Set the exceptionality score for the generated profile (1-100).")
     parser.add_argument("--custom-first-name", type=str, help="Custom first name.")
     parser.add_argument("--custom-last-name", type=str, help="Custom last name.")
+    parser.add_argument("--output-format", choices=["console", "json", "csv"], help="Output format (console, json or csv).")
+    parser.add_argument("--output-dir", type=str, help="Directory for saved profiles (default: generated_profiles/).")
+    parser.add_argument("--shard-rows", type=int, help="Split json/csv output into shards of this many profiles (json shards are NDJSON).")
+    parser.add_argument("--shard-size-mb", type=float, help="Split json/csv output into shards of about this many MB (uncompressed).")
+    parser.add_argument("--seed", type=int, help="Generate profiles from this seed; profile i depends only on (seed, region, i). Sharded runs pick and record one if omitted.")
+    parser.add_argument("--start-index", type=int, help="With --seed, index of the first profile to generate (default 0).")
+    parser.add_argument("--count", type=int, dest="num_profiles", default=argparse.SUPPRESS, help="Same as --num-profiles.")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted sharded run in --output-dir from its last checkpoint.")
+    parser.add_argument("--compression", choices=["gzip", "lzma", "zstd", "lz4", "none"], help="Compress saved output (shards default to gzip, single files to none); zstd and lz4 need their packages.")
+    parser.add_argument("--coordinate", type=str, metavar="JOB_DIR", help="Split a seeded run into work units in JOB_DIR (shared with the workers), wait for them and merge their manifests.")
+    parser.add_argument("--work", type=str, metavar="JOB_DIR", help="Generate work units of the job in JOB_DIR until it is complete.")
+    parser.add_argument("--unit-size", type=int, default=100000, help="With --coordinate, profiles per work unit (default 100000).")
+    parser.add_argument("--local-workers", type=int, default=0, help="With --coordinate, also run this many workers on this machine.")
+    parser.add_argument("--claim-timeout", type=float, default=120, help="With --coordinate, seconds without a heartbeat before a unit is given to another worker.")
+    parser.add_argument("--cache-dir", type=str, help="Cache seeded runs in this directory and serve repeated ones from it (default: $FAKER_MAKER_CACHE_DIR).")
+    parser.add_argument("--cache-max-mb", type=float, default=1024, help="Size limit of the cache; least recently used entries are deleted beyond it (default 1024).")
+    parser.add_argument("--cache-stats", action="store_true", help="Show the size and hit rate of the cache and exit.")
+    parser.add_argument("--json-indent", type=int, help="Indent saved JSON by this many spaces (compact by default).")
+    parser.add_argument("--valid-only", action="store_true", help="Only output profiles that pass the consistency rules.")
     parser.add_argument("--include-hidden-attributes", action="store_true", help="Include hidden attributes (e.g., Personality Trait, Exceptionality Score).")
     parser.add_argument('-h', '--help', action='store_true', help='Show this help message and exit')
     # --tui is now effectively handled by the menu, but we keep it for direct access
     parser.add_argument("--tui", action="store_true", help="Run the Textual UI.")
+    parser.add_argument("--serve", action="store_true", help="Run the local HTTP generation service.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host for --serve.")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --serve.")
+    parser.add_argument("--auth-key-file", type=str, help="File containing the API key for headless (--non-interactive/--serve) runs.")
+    parser.add_argument("--create-api-key", action="store_true", help="Generate an API key for headless runs and exit.")
 
     try:
         args, unknown = parser.parse_known_args()
@@ -235,13 +410,16 @@ def main():
         # CustomArgumentParser's error method handles the exit, so we can just pass.
         pass
 
+    console = create_console(args)
+
     global DEBUG_MODE
     if args.debug:
         DEBUG_MODE = True
         debug_print("Debug mode enabled.")
 
     if args.help:
-        display_project_information(console, wait_for_input=False)
+        from utils.display_project_info import display_project_information
+        console.print(display_project_information(console, wait_for_input=False))
         sys.exit(0)
 
     # The TUI app is now launched via the menu, but this allows direct launch
@@ -251,9 +429,43 @@ def main():
         app.run()
         sys.exit(0)
 
-    if not check_login_status(console, debug_print):
-         console.print("[bold red]Login failed. Exiting.[/bold red]")
-         sys.exit(1)
+    if args.non_interactive or args.serve or args.coordinate or args.work:
+        # Headless runs (cron jobs, containers, the server) must never block on a prompt.
+        from auth.headless import check_headless_auth
+        allowed, reason = check_headless_auth(debug_print, args.auth_key_file)
+        if not allowed:
+            console.print(f"[bold red]Authentication failed: {reason}[/bold red]")
+            sys.exit(1)
+    else:
+        from auth.auth import check_login_status
+        # Login prompts go through rich, so auth always gets a rich Console.
+        if not check_login_status(create_console(), debug_print):
+             console.print("[bold red]Login failed. Exiting.[/bold red]")
+             sys.exit(1)
+
+    if args.create_api_key:
+        from auth.headless import create_api_key, API_KEY_ENV
+        console.print(f"[bold green]New API key (shown once):[/bold green] {create_api_key()}")
+        console.print(f"Export it as {API_KEY_ENV} for --non-interactive and --serve runs.")
+        sys.exit(0)
+
+    if args.cache_stats:
+        cache = open_profile_cache(args)
+        if cache is None:
+            console.print("[bold red]Error: no cache configured; pass --cache-dir or set FAKER_MAKER_CACHE_DIR.[/bold red]")
+            sys.exit(1)
+        for name, value in cache.stats().items():
+            console.print(f"{name}: {value}")
+        sys.exit(0)
+
+    if args.serve:
+        from server import run_server
+        run_server(args.host, args.port, debug_print_func=debug_print, cache=open_profile_cache(args))
+        sys.exit(0)
+
+    if args.coordinate or args.work:
+        run_distributed(args, console, debug_print)
+        sys.exit(0)
 
     # Check if any generator-specific args were passed to bypass the menu
     generator_args_passed = any([
@@ -270,6 +482,9 @@ def main():
         args.include_unconventional,
         args.custom_first_name,
         args.custom_last_name,
+        args.output_format,
+        args.valid_only,
+        args.seed is not None,
     ])
 
     if args.non_interactive or generator_args_passed:
@@ -277,6 +492,9 @@ def main():
         sys.exit(0)
 
     # Interactive menu loop
+    import questionary
+    from rich.json import JSON
+    from utils.custom_styles import custom_style
     while True:
         display_logo(console)
         choice = show_main_menu(console)
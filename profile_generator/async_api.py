@@ -0,0 +1,84 @@
+import asyncio
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from . import generate_fake_personal_info
+from .region_pack import PACK_SUFFIX, RegionPack, packed_region_data, write_region_pack
+
+def _no_debug(*args, **kwargs):
+    pass
+
+def generate_profile_chunk(region_data, constraints, count):
+    """Generates `count` profiles. Module-level so it can run in an executor."""
+    return [generate_fake_personal_info(region_data, constraints, _no_debug, False) for _ in range(count)]
+
+# Region data for process-pool workers, set once per worker by the pool initializer
+# so it is not pickled along with every chunk.
+_worker_region_data = None
+
+def _init_worker(region_data):
+    global _worker_region_data
+    _worker_region_data = region_data
+
+def _generate_chunk_in_worker(constraints, count):
+    return generate_profile_chunk(_worker_region_data, constraints, count)
+
+async def agenerate(region_data, constraints, num_profiles=None, chunk_size=100, max_pending_chunks=2, executor=None, processes=0):
+    """
+    Asynchronously yields generated profiles without blocking the event loop.
+
+    Profiles are produced in chunks of `chunk_size` on an executor (the loop's default
+    thread pool unless `executor` is given, or a private process pool of `processes`
+    workers). At most `max_pending_chunks` chunks are in flight or buffered at once, so a
+    slow consumer pauses generation instead of letting results pile up.
+    """
+    if num_profiles is None:
+        num_profiles = constraints.get('num_profiles', 1)
+    if chunk_size < 1 or max_pending_chunks < 1:
+        raise ValueError("chunk_size and max_pending_chunks must be at least 1")
+
+    loop = asyncio.get_running_loop()
+    own_executor = None
+    pack_dir = pack = None
+    pending = deque()
+    remaining = num_profiles
+    try:
+        if processes:
+            # Workers map the region's big tables from a shared pack file instead of each
+            # unpickling a private copy; the region dict they receive carries only its path.
+            pack_dir = tempfile.mkdtemp(prefix='faker-maker-')
+            pack_path = os.path.join(pack_dir, 'region' + PACK_SUFFIX)
+            write_region_pack(region_data, pack_path)
+            pack = RegionPack(pack_path)
+            worker_region_data = packed_region_data(region_data, pack)
+            own_executor = ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(worker_region_data,))
+            executor = own_executor
+
+        def submit(count):
+            if own_executor is not None:
+                return loop.run_in_executor(executor, _generate_chunk_in_worker, constraints, count)
+            return loop.run_in_executor(executor, generate_profile_chunk, region_data, constraints, count)
+
+        while remaining > 0 or pending:
+            # Top up the window of in-flight chunks; never more than max_pending_chunks.
+            while remaining > 0 and len(pending) < max_pending_chunks:
+                count = min(chunk_size, remaining)
+                pending.append(submit(count))
+                remaining -= count
+            chunk = await pending.popleft()
+            for profile in chunk:
+                yield profile
+            # Give other tasks a turn even if the consumer never awaits anything itself.
+            await asyncio.sleep(0)
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_executor is not None:
+            own_executor.shutdown(wait=False, cancel_futures=True)
+        if pack is not None:
+            pack.close()
+        if pack_dir is not None:
+            shutil.rmtree(pack_dir, ignore_errors=True) # Workers' mappings stay readable until unmapped
@@ -1,5 +1,5 @@
 from .inference import run_inference_engine
-from .demographics.occupation import determine_occupation
+from .demographics.occupation import determine_occupation, occupation_index
 
 def manage_profile_consistency(constraints, region_data, debug_print_func, apply_consistency_checks):
     """
@@ -25,7 +25,7 @@ def manage_profile_consistency(constraints, region_data, debug_print_func, apply
         # If consistency checks are off, prioritize user-provided occupation
         if constraints.get('occupation'):
             # Try to find the occupation object for its typical education level
-            occupation_obj = next((occ for occ in region_data.get('occupations', {}).get('occupations', []) if occ['name'] == constraints['occupation']), None)
+            occupation_obj = occupation_index(region_data).get(constraints['occupation'])
         else:
             # If no user-provided occupation, determine a random one (without inference)
             profile_for_occupation_determination = {
@@ -1,4 +1,4 @@
-import random
+from .. import rng
 
 def generate_age_and_dob(constraints):
     age_range_str = constraints.get('age_range', 'any')
@@ -19,9 +19,9 @@ def generate_age_and_dob(constraints):
         min_age = int(age_range_str)
         max_age = int(age_range_str)
 
-    age = random.randint(min_age, max_age)
+    age = rng.randint(min_age, max_age)
     birth_year = 2025 - age
-    birth_month = random.randint(1, 12)
-    birth_day = random.randint(1, 28) # Simple approach for now
+    birth_month = rng.randint(1, 12)
+    birth_day = rng.randint(1, 28) # Simple approach for now
     dob = f"{birth_year}-{birth_month:02d}-{birth_day:02d}"
     return {'age': age, 'dob': dob}
@@ -1,8 +1,8 @@
-import random
+from .. import rng
 
 def generate_gender(gender_constraint):
     if gender_constraint and gender_constraint != 'any':
         gender = gender_constraint
     else:
-        gender = random.choice(['male', 'female'])
+        gender = rng.choice(['male', 'female'])
     return {'gender': gender}
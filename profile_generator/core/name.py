@@ -1,4 +1,64 @@
-import random
+from .. import rng
+from bisect import bisect_right
+from itertools import accumulate
+
+# Name lists are compiled once per region into samplers over parallel name and cumulative
+# weight sequences. A region pack (see region_pack.py) provides the same samplers backed by
+# a shared read-only mapping instead of lists.
+
+MIDDLE_NAME_PROBABILITY = 0.9
+MAX_CACHED_NAME_TABLES = 8
+
+NAME_LIST_KEYS = ('first_names_male', 'first_names_female', 'last_names', 'middle_names')
+
+class NameSampler:
+    """Weighted choice over a sequence of names and their cumulative weights."""
+    __slots__ = ('names', 'cum_weights')
+
+    def __init__(self, names, cum_weights):
+        self.names = names
+        self.cum_weights = cum_weights
+
+    @classmethod
+    def from_entries(cls, entries):
+        """Builds a sampler from [{'name': ..., 'weight': ...}, ...], or returns None if empty."""
+        if not entries:
+            return None
+        return cls([entry['name'] for entry in entries], list(accumulate(entry['weight'] for entry in entries)))
+
+    def __len__(self):
+        return len(self.names)
+
+    def sample(self):
+        total = self.cum_weights[-1]
+        if total <= 0:
+            return rng.choice(self.names)
+        return self.names[bisect_right(self.cum_weights, rng.random() * total)]
+
+def build_name_tables(region_data):
+    """Returns {list key: NameSampler or None}, plus 'first_names_any' over both first name lists."""
+    tables = {key: NameSampler.from_entries(region_data[key]) for key in ('first_names_male', 'first_names_female', 'last_names')}
+    tables['middle_names'] = NameSampler.from_entries(region_data.get('middle_names'))
+    tables['first_names_any'] = NameSampler.from_entries(region_data['first_names_male'] + region_data['first_names_female'])
+    return tables
+
+# id(region_data) -> (region_data, the name lists the tables were built from, tables)
+_name_tables_cache = {}
+
+def get_name_tables(region_data):
+    """Returns the region's name samplers, from its region pack if it has one."""
+    pack = region_data.get('region_pack')
+    if pack is not None:
+        return pack.name_tables
+    lists = tuple(region_data.get(key) for key in NAME_LIST_KEYS)
+    cached = _name_tables_cache.get(id(region_data))
+    if cached is None or cached[0] is not region_data or any(a is not b for a, b in zip(cached[1], lists)):
+        if len(_name_tables_cache) >= MAX_CACHED_NAME_TABLES:
+            _name_tables_cache.clear()
+        # Holding region_data in the entry keeps its id from being reused while cached.
+        cached = (region_data, lists, build_name_tables(region_data))
+        _name_tables_cache[id(region_data)] = cached
+    return cached[2]
 
 def generate_name(region_data, gender, name_method=None, custom_first_name=None, custom_last_name=None):
     first_name = None
@@ -10,25 +70,22 @@ def generate_name(region_data, gender, name_method=None, custom_first_name=None,
         last_name = custom_last_name
         # For custom names, middle name is not generated by default
     else: # 'random' or 'existing'
-        # Determine gender-specific first names
+        tables = get_name_tables(region_data)
+        # Determine gender-specific first names; 'any' or unspecified gender picks from both lists
         if gender == 'male':
-            first_names_list = region_data['first_names_male']
+            first_names = tables['first_names_male']
         elif gender == 'female':
-            first_names_list = region_data['first_names_female']
-        else: # 'any' or unspecified gender, pick from both lists
-            first_names_list = region_data['first_names_male'] + region_data['first_names_female']
+            first_names = tables['first_names_female']
+        else:
+            first_names = tables['first_names_any']
 
         # Select first name based on weights
-        if first_names_list:
-            first_name = random.choices([name['name'] for name in first_names_list], [name['weight'] for name in first_names_list])[0]
-        else:
-            first_name = "John" # Fallback
+        first_name = first_names.sample() if first_names else "John" # Fallback
+        last_name = tables['last_names'].sample()
 
-        last_name = random.choices([name['name'] for name in region_data['last_names']], [name['weight'] for name in region_data['last_names']])[0]
-        
         # Generate middle name if available and random chance passes
-        if region_data.get('middle_names') and random.random() < 0.9:
-            middle_name = random.choices([name['name'] for name in region_data['middle_names']], [name['weight'] for name in region_data['middle_names']])[0]
+        if tables['middle_names'] and rng.random() < MIDDLE_NAME_PROBABILITY:
+            middle_name = tables['middle_names'].sample()
 
     return {
         'first_name': first_name,
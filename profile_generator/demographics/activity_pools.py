@@ -0,0 +1,171 @@
+from .. import rng
+from heapq import nlargest
+from operator import itemgetter
+
+# Hobbies, skills and interests are drawn from pools compiled once per rule set: every age
+# maps to its bracket's pool, and each pool also has an "offline" variant with the
+# internet-based options already removed, so elderly profiles no longer rebuild filtered
+# lists on every call.
+
+MAX_POOL_AGE = 120
+MAX_CACHED_POOLS = 8
+
+ELDERLY_AGE = 60
+OFFLINE_PROBABILITY = 0.9 # Chance that an elderly profile gets no internet-based options
+
+INTERNET_HOBBIES = frozenset(["social media", "gaming", "coding", "coding side projects"])
+INTERNET_SKILLS = frozenset(["digital literacy", "programming", "debugging", "system design", "data analysis", "cloud computing"])
+INTERNET_INTERESTS = frozenset(["gaming", "coding", "technology", "robotics", "artificial intelligence", "space exploration", "futurism"])
+
+def weighted_sample(items, weights, k):
+    """
+    Draws up to k distinct items with probability proportional to their weights, using
+    Efraimidis-Spirakis: every item gets the key u ** (1 / weight) and the k largest keys win.
+    Items with a zero weight are never drawn; if every weight is zero the draw is uniform.
+    """
+    if k <= 0 or not items:
+        return []
+    keyed = [(rng.random() ** (1.0 / w), item) for item, w in zip(items, weights) if w > 0]
+    if not keyed:
+        return rng.sample(list(items), min(k, len(items)))
+    if k == 1:
+        return [max(keyed, key=itemgetter(0))[1]]
+    return [item for _, item in nlargest(k, keyed, key=itemgetter(0))]
+
+class _Option:
+    __slots__ = ('name', 'biases', 'trait_bias')
+
+    def __init__(self, option):
+        if not isinstance(option, dict):
+            option = {'name': option}
+        self.name = option['name']
+        self.biases = tuple(
+            (attr, rule['min'], rule['max'], rule['weight'])
+            for attr, rule in (option.get('hidden_attribute_biases') or {}).items()
+        )
+        trait_bias = option.get('personality_trait_bias')
+        self.trait_bias = (trait_bias['min'], trait_bias['max'], trait_bias['weight']) if trait_bias else None
+
+    def weight(self, hidden_attributes, personality_trait):
+        weight = 1
+        if hidden_attributes:
+            for attr, low, high, factor in self.biases:
+                value = hidden_attributes.get(attr)
+                if value is not None and low <= value <= high:
+                    weight *= factor
+        if self.trait_bias is not None and personality_trait is not None:
+            low, high, factor = self.trait_bias
+            if low <= personality_trait <= high:
+                weight *= factor
+        return weight
+
+class _Pool:
+    """The options of one age bracket, with their biases compiled to tuples."""
+    __slots__ = ('names', 'options', 'unbiased')
+
+    def __init__(self, options):
+        self.options = tuple(options)
+        self.names = tuple(option.name for option in self.options)
+        self.unbiased = not any(option.biases or option.trait_bias for option in self.options)
+
+    def __len__(self):
+        return len(self.names)
+
+    def weights(self, hidden_attributes, personality_trait):
+        # personality_trait_bias ranges are on the 0-1000 scale of the numerical hidden
+        # attributes; generated traits are labels ('Reserved', ...), which the bias skips
+        if not isinstance(personality_trait, (int, float)):
+            personality_trait = None
+        return [option.weight(hidden_attributes, personality_trait) for option in self.options]
+
+    def choice(self, hidden_attributes, personality_trait):
+        if not self.names:
+            return None
+        if self.unbiased:
+            return rng.choice(self.names)
+        weights = self.weights(hidden_attributes, personality_trait)
+        if sum(weights) <= 0:
+            return rng.choice(self.names)
+        return rng.choices(self.names, weights=weights, k=1)[0]
+
+    def sample(self, k, hidden_attributes, personality_trait):
+        if self.unbiased:
+            return rng.sample(self.names, min(k, len(self.names)))
+        return weighted_sample(self.names, self.weights(hidden_attributes, personality_trait), k)
+
+class _Bracket:
+    """An age bracket's pool and its pre-filtered offline variant."""
+    __slots__ = ('full', 'offline')
+
+    def __init__(self, options, internet_names):
+        self.full = _Pool(options)
+        self.offline = _Pool(option for option in self.full.options if option.name not in internet_names)
+
+    def pick(self, age):
+        if age >= ELDERLY_AGE and rng.random() < OFFLINE_PROBABILITY:
+            return self.offline
+        return self.full
+
+_UNCLAIMED = object()
+
+def _by_age(rules, options_key, internet_names):
+    """
+    Returns a list indexed by age holding the bracket of the first rule covering that age.
+    A rule with no options still claims its ages, which then have no bracket (None).
+    """
+    table = [_UNCLAIMED] * (MAX_POOL_AGE + 1)
+    for rule in rules:
+        min_age, max_age = rule['age_range']
+        options = rule.get(options_key)
+        bracket = _Bracket([_Option(option) for option in options], internet_names) if options else None
+        for age in range(max(min_age, 0), min(max_age, MAX_POOL_AGE) + 1):
+            if table[age] is _UNCLAIMED:
+                table[age] = bracket
+    return [None if bracket is _UNCLAIMED else bracket for bracket in table]
+
+class HobbyPools:
+    """Precompiled age-bracket hobby pools for one hobbies_rules set."""
+    def __init__(self, hobbies_rules):
+        self.by_age = _by_age(hobbies_rules.get('age_based_hobbies', []), 'hobbies', INTERNET_HOBBIES)
+
+    def bracket(self, age):
+        return self.by_age[min(max(age, 0), MAX_POOL_AGE)]
+
+class SkillPools:
+    """Precompiled age-bracket skill pools and interest lists for one skills_interests_rules set."""
+    def __init__(self, skills_interests_rules):
+        self.by_age = _by_age(skills_interests_rules.get('age_based_skills', []), 'skills', INTERNET_SKILLS)
+        self.interests = tuple(skills_interests_rules.get('interests', []))
+        self.offline_interests = tuple(i for i in self.interests if i not in INTERNET_INTERESTS)
+
+    def bracket(self, age):
+        return self.by_age[min(max(age, 0), MAX_POOL_AGE)]
+
+    def pick_interests(self, age):
+        if age >= ELDERLY_AGE and rng.random() < OFFLINE_PROBABILITY:
+            return self.offline_interests
+        return self.interests
+
+_NO_RULES = {}
+
+# (pools class, id(rules)) -> (rules, pools)
+_pools_cache = {}
+
+def _get_pools(rules, pools_class):
+    key = (pools_class, id(rules))
+    cached = _pools_cache.get(key)
+    if cached is None or cached[0] is not rules:
+        if len(_pools_cache) >= MAX_CACHED_POOLS:
+            _pools_cache.clear()
+        # Holding the rules in the entry keeps their id from being reused while cached.
+        cached = (rules, pools_class(rules))
+        _pools_cache[key] = cached
+    return cached[1]
+
+def get_hobby_pools(hobbies_rules):
+    """Returns the HobbyPools for the rules, building them on first use."""
+    return _get_pools(hobbies_rules or _NO_RULES, HobbyPools)
+
+def get_skill_pools(skills_interests_rules):
+    """Returns the SkillPools for the rules, building them on first use."""
+    return _get_pools(skills_interests_rules or _NO_RULES, SkillPools)
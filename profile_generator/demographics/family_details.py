@@ -1,169 +1,216 @@
-import random
-from rich.prompt import Prompt
-from user_input.exceptions import BackException
+from .. import rng
+from bisect import bisect_right
+from collections import defaultdict
+from functools import lru_cache
+
+# Family details are drawn from age-indexed tables built once per region: for every age
+# there is a ready sampler (values + cumulative weights), so generating a profile's marital
+# status and children is a list index and a bisect instead of scanning the rule lists.
+
+MAX_TABLE_AGE = 120
+MIN_PARENT_AGE = 16
+MAX_CACHED_FAMILY_TABLES = 8
+
+class _Sampler:
+    __slots__ = ('values', 'cum_weights', 'total')
+
+    def __init__(self, weights, cast=None):
+        self.values = tuple(cast(k) if cast else k for k in weights)
+        self.cum_weights = []
+        running = 0.0
+        for w in weights.values():
+            running += w
+            self.cum_weights.append(running)
+        self.total = running
+
+    def sample(self):
+        return self.values[bisect_right(self.cum_weights, rng.random() * self.total)]
+
+    def sample_many(self, k):
+        return rng.choices(self.values, cum_weights=self.cum_weights, k=k)
+
+def _sampler_or_none(weights, cast=None):
+    if not weights or sum(weights.values()) <= 0:
+        return None # Callers fall back to the same defaults the rules used to
+    return _Sampler(weights, cast)
+
+def _by_age(age_rules):
+    """Returns a list indexed by age holding the sampler of the first rule covering that age."""
+    table = [None] * (MAX_TABLE_AGE + 1)
+    for rule, sampler in age_rules:
+        min_age, max_age = rule['age_range']
+        for age in range(max(min_age, 0), min(max_age, MAX_TABLE_AGE) + 1):
+            if table[age] is None:
+                table[age] = sampler
+    return table
+
+class FamilyTables:
+    """Precompiled marital status and children samplers for one region."""
+    def __init__(self, region_data):
+        self.legal_marriage_age = region_data.get('legal_marriage_age', 18)
+        family_rules = region_data.get('family_details_rules', {})
+
+        self.marital_status = _by_age(
+            (rule, _sampler_or_none(rule['status_weights'])) for rule in family_rules.get('marital_status_rules', [])
+        )
+
+        # Education-based children rules take precedence over marital status rules.
+        education_rules = defaultdict(list)
+        status_rules = {}
+        for rule in family_rules.get('children_info_rules', []):
+            if 'education_level_in' in rule:
+                for education_level in rule['education_level_in']:
+                    education_rules[education_level].extend(
+                        (age_rule, _sampler_or_none(age_rule['children_weights'], int)) for age_rule in rule.get('age_ranges', [])
+                    )
+            elif 'marital_status' in rule and rule['marital_status'] not in status_rules:
+                if rule['marital_status'] == 'Married':
+                    status_rules['Married'] = _by_age(
+                        (age_rule, _sampler_or_none(age_rule['children_weights'], int)) for age_rule in rule.get('age_ranges', [])
+                    )
+                else:
+                    status_rules[rule['marital_status']] = [_sampler_or_none(rule.get('children_weights'), int)] * (MAX_TABLE_AGE + 1)
+        self.children_by_education = {level: _by_age(rules) for level, rules in education_rules.items()}
+        self.children_by_status = status_rules
+
+    def marital_status_sampler(self, age):
+        return self.marital_status[min(max(age, 0), MAX_TABLE_AGE)]
+
+    def children_sampler(self, age, marital_status, education_level):
+        age = min(max(age, 0), MAX_TABLE_AGE)
+        by_education = self.children_by_education.get(education_level)
+        if by_education is not None and by_education[age] is not None:
+            return by_education[age]
+        by_status = self.children_by_status.get(marital_status)
+        return by_status[age] if by_status is not None else None
+
+# id(family_details_rules) -> (family_details_rules, legal_marriage_age, FamilyTables)
+_family_tables_cache = {}
+
+def get_family_tables(region_data):
+    """Returns the FamilyTables for the region, building them on first use."""
+    family_rules = region_data.get('family_details_rules', {})
+    legal_marriage_age = region_data.get('legal_marriage_age', 18)
+    cached = _family_tables_cache.get(id(family_rules))
+    if cached is None or cached[0] is not family_rules or cached[1] != legal_marriage_age:
+        if len(_family_tables_cache) >= MAX_CACHED_FAMILY_TABLES:
+            _family_tables_cache.clear()
+        # Holding family_rules in the entry keeps its id from being reused while cached.
+        cached = (family_rules, legal_marriage_age, FamilyTables(region_data))
+        _family_tables_cache[id(family_rules)] = cached
+    return cached[2]
+
+@lru_cache(maxsize=256)
+def parse_marital_status_constraint(value):
+    """Maps a requested marital status ('married', 'Married', 'any', None) to the rule spelling, or None."""
+    if not isinstance(value, str) or value.strip().lower() in ('', 'any'):
+        return None
+    return value.strip().capitalize()
+
+@lru_cache(maxsize=256)
+def parse_children_constraint(value):
+    """Parses a children constraint ('any', 2, '2', '1-3') into an inclusive (min, max) range, or None."""
+    if isinstance(value, int):
+        return (value, value)
+    if not isinstance(value, str) or value.strip().lower() in ('', 'any'):
+        return None
+    try:
+        if '-' in value:
+            low, high = value.split('-', 1)
+            low, high = int(low), int(high)
+        else:
+            low = high = int(value)
+    except ValueError:
+        return None
+    return (low, high) if 0 <= low <= high else None
 
-def generate_marital_status(age, constraints, region_data, province_data, debug_print_func):
+def generate_marital_status(age, constraints, region_data, province_data, debug_print_func, tables=None):
+    tables = tables or get_family_tables(region_data)
     allow_unconventional = constraints.get('allow_unconventional', False)
-    legal_marriage_age = region_data.get('legal_marriage_age', 18)
 
-    if age < legal_marriage_age:
+    if age < tables.legal_marriage_age:
         return "Single"
 
-    if allow_unconventional and province_data.get('allows_early_marriage'):
-        if random.random() < 0.1: # 10% chance of early marriage
+    if allow_unconventional and (province_data or {}).get('allows_early_marriage'):
+        if rng.random() < 0.1: # 10% chance of early marriage
             return 'Married'
 
-    allow_unconventional = constraints.get('allow_unconventional', False)
-    legal_marriage_age = region_data.get('legal_marriage_age', 18)
+    requested = parse_marital_status_constraint(constraints.get('marital_status'))
+    if requested is not None:
+        return requested
 
-    family_rules = region_data.get('family_details_rules', {})
-    marital_status_rules = family_rules.get('marital_status_rules', [])
+    sampler = tables.marital_status_sampler(age)
+    return sampler.sample() if sampler is not None else "Single"
 
-    selected_rule = None
-    for rule in marital_status_rules:
-        min_age, max_age = rule['age_range']
-        if min_age <= age <= max_age:
-            selected_rule = rule
-            break
-
-    if selected_rule:
-        status_weights = selected_rule['status_weights']
-        statuses = list(status_weights.keys())
-        weights = list(status_weights.values())
-        if sum(weights) > 0:
-            return random.choices(statuses, weights=weights, k=1)[0]
-        else:
-            return "Single" # Fallback
-    else:
-        return "Single" # Default if no rule matches
-
-def generate_children_info(age, marital_status, constraints, region_data, education_level, debug_print_func):
+def generate_children_info(age, marital_status, constraints, region_data, education_level, debug_print_func, tables=None):
     allow_unconventional = constraints.get('allow_unconventional', False)
-    num_children_constraint = constraints.get('num_children', 'any')
 
-    if age < 16:
+    if age < MIN_PARENT_AGE:
         return 0
 
     if marital_status == "Single" and not allow_unconventional:
         return 0
 
-    if num_children_constraint != 'any':
-        debug_print_func(f"generate_children_info - Returning num_children from constraint: {num_children_constraint}")
-        return num_children_constraint
+    requested = parse_children_constraint(constraints.get('num_children', 'any'))
+    if requested is not None:
+        return requested[0] if requested[0] == requested[1] else rng.randint(*requested)
 
-    family_rules = region_data.get('family_details_rules', {})
-    children_info_rules = family_rules.get('children_info_rules', [])
-
-    num_children = 0
-    selected_rule_with_weights = None
-
-    debug_print_func(f"generate_children_info - Age: {age}, Marital Status: {marital_status}, Education Level: {education_level}")
-
-    # First, try to apply rules based on education level and age
-    for rule in children_info_rules:
-        if "education_level_in" in rule and education_level in rule["education_level_in"]:
-            debug_print_func(f"generate_children_info - Checking education-based rule: {rule.get('education_level_in')}")
-            for age_rule in rule.get("age_ranges", []):
-                min_age, max_age = age_rule['age_range']
-                if min_age <= age <= max_age:
-                    selected_rule_with_weights = age_rule
-                    debug_print_func(f"generate_children_info - Matched education-based age rule: {age_rule['age_range']}")
-                    break
-            if selected_rule_with_weights:
-                break
-
-    # If no education-based rule matched, proceed with marital status rules
-    if not selected_rule_with_weights:
-        debug_print_func("generate_children_info - No education-based rule matched, checking marital status rules.")
-        for rule in children_info_rules:
-            if rule.get('marital_status') == marital_status:
-                debug_print_func(f"generate_children_info - Checking marital status rule: {rule.get('marital_status')}")
-                if marital_status == "Married":
-                    for age_rule in rule.get('age_ranges', []):
-                        min_age, max_age = age_rule['age_range']
-                        if min_age <= age <= max_age:
-                            selected_rule_with_weights = age_rule
-                            debug_print_func(f"generate_children_info - Matched marital status age rule: {age_rule['age_range']}")
-                            break
-                else:
-                    selected_rule_with_weights = rule
-                    debug_print_func(f"generate_children_info - Matched marital status rule (non-married): {rule.get('marital_status')}")
-                break
-
-    if selected_rule_with_weights:
-        children_weights = selected_rule_with_weights['children_weights']
-        debug_print_func(f"generate_children_info - Using children_weights: {children_weights}")
-        children_counts = [int(c) for c in children_weights.keys()]
-        weights = list(children_weights.values())
-        debug_print_func(f"generate_children_info - children_counts: {children_counts}, weights: {weights}")
-        if sum(weights) > 0:
-            num_children = random.choices(children_counts, weights=weights, k=1)[0]
-            debug_print_func(f"generate_children_info - Randomly chosen num_children: {num_children}")
-        else:
-            num_children = 0 # Fallback
-            debug_print_func("generate_children_info - Sum of weights is 0, defaulting to 0 children.")
-    else:
-        debug_print_func("generate_children_info - No rule matched, defaulting to 0 children.")
-        num_children = 0 # Default if no rule matches
-    
-    # Handle unconventional single parent case if not covered by rules
-    if marital_status == "Single" and allow_unconventional and num_children == 0 and random.random() < 0.05:
-        num_children = random.choices([0, 1], weights=[0.8, 0.2], k=1)[0]
-        debug_print_func(f"generate_children_info - Unconventional single parent case applied, num_children: {num_children}")
+    tables = tables or get_family_tables(region_data)
+    sampler = tables.children_sampler(age, marital_status, education_level)
+    num_children = sampler.sample() if sampler is not None else 0
 
-    debug_print_func(f"generate_children_info - Final num_children: {num_children}")
+    # Handle unconventional single parent case if not covered by rules
+    if marital_status == "Single" and allow_unconventional and num_children == 0 and rng.random() < 0.05:
+        num_children = rng.choices([0, 1], weights=[0.8, 0.2], k=1)[0]
     return num_children
 
-def select_family_details(console, max_age, unconventional_data_selection, debug_print_func):
-    debug_print_func("Selecting family details.")
-    include_family_details = Prompt.ask(
-        "[bold green]Do you want to include family details (marital status, children)?[/bold green]",
-        choices=["y", "n", "back"],
-        default="n",
-        console=console
-    )
-    if include_family_details == "back":
-        raise BackException
-
-    marital_status = "any"
-    num_children = "any"
-
-    if include_family_details == "y":
-        if max_age >= 16: # Assuming 16 is a reasonable minimum age for marital status
-            marital_status = Prompt.ask(
-                "[bold green]Select marital status:[/bold green]",
-                choices=["single", "married", "divorced", "widowed", "any", "back"],
-                default="any",
-                console=console
-            )
-            if marital_status == "back":
-                raise BackException
-            
-            if marital_status in ["married", "divorced", "widowed"]:
-                num_children = Prompt.ask(
-                    "[bold green]Number of children (e.g., '0', '1', '1-3', 'any'):[/bold green]",
-                    default="any",
-                    console=console
-                )
-                if num_children == "back":
-                    raise BackException
-                
-                # Basic validation for num_children
-                if num_children != "any":
-                    if "-" in num_children:
-                        try:
-                            min_c, max_c = map(int, num_children.split("-"))
-                            if min_c < 0 or max_c < min_c:
-                                console.print("[yellow]Invalid range for children. Using 'any'.[/yellow]")
-                                num_children = "any"
-                        except ValueError:
-                            console.print("[yellow]Invalid format for children. Using 'any'.[/yellow]")
-                            num_children = "any"
-                    elif not num_children.isdigit() or int(num_children) < 0:
-                        console.print("[yellow]Invalid number of children. Using 'any'.[/yellow]")
-                        num_children = "any"
+def generate_family_details(age, education_level, constraints, region_data, debug_print_func, province_data=None):
+    """Returns {'marital_status': ..., 'children': ...} for one profile."""
+    tables = get_family_tables(region_data)
+    marital_status = generate_marital_status(age, constraints, region_data, province_data, debug_print_func, tables)
+    children = generate_children_info(age, marital_status, constraints, region_data, education_level, debug_print_func, tables)
+    return {'marital_status': marital_status, 'children': children}
+
+def generate_family_details_batch(ages, education_levels, constraints, region_data, debug_print_func):
+    """
+    Batch counterpart of generate_family_details: returns a list of family detail dicts for
+    parallel lists of ages and education levels. Profiles are grouped by sampler so each
+    group is drawn with one rng.choices call.
+    """
+    tables = get_family_tables(region_data)
+    n = len(ages)
+    allow_unconventional = constraints.get('allow_unconventional', False)
+    requested_status = parse_marital_status_constraint(constraints.get('marital_status'))
+    requested_children = parse_children_constraint(constraints.get('num_children', 'any'))
+
+    statuses = ["Single"] * n
+    groups = defaultdict(list)
+    for i, age in enumerate(ages):
+        if age < tables.legal_marriage_age:
+            continue
+        if requested_status is not None:
+            statuses[i] = requested_status
         else:
-            console.print("[yellow]Age is too low for marital status and children details. Skipping.[/yellow]")
-            include_family_details = "n" # Force to 'n' if age is too low
-
-    return include_family_details == "y", marital_status, num_children
\ No newline at end of file
+            sampler = tables.marital_status_sampler(age)
+            if sampler is not None:
+                groups[sampler].append(i)
+    for sampler, indices in groups.items():
+        for i, status in zip(indices, sampler.sample_many(len(indices))):
+            statuses[i] = status
+
+    children = [0] * n
+    groups = defaultdict(list)
+    for i, (age, status, education_level) in enumerate(zip(ages, statuses, education_levels)):
+        if age < MIN_PARENT_AGE or (status == "Single" and not allow_unconventional):
+            continue
+        if requested_children is not None or (status == "Single" and allow_unconventional):
+            children[i] = generate_children_info(age, status, constraints, region_data, education_level, debug_print_func, tables)
+            continue
+        sampler = tables.children_sampler(age, status, education_level)
+        if sampler is not None:
+            groups[sampler].append(i)
+    for sampler, indices in groups.items():
+        for i, count in zip(indices, sampler.sample_many(len(indices))):
+            children[i] = count
+
+    return [{'marital_status': s, 'children': c} for s, c in zip(statuses, children)]
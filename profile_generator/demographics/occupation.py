@@ -1,4 +1,19 @@
-import random
+from .. import rng
+
+# id(occupations list) -> (occupations list, {name: occupation}); the list is held so its id stays unique.
+_occupation_index_cache = {}
+MAX_CACHED_OCCUPATION_INDEXES = 16
+
+def occupation_index(region_data):
+    """Returns {occupation name: occupation dict} for the region, built once per occupations list."""
+    occupations = region_data['occupations'] # A list; the file's {"occupations": [...]} shape is normalized at load time
+    cached = _occupation_index_cache.get(id(occupations))
+    if cached is None or cached[0] is not occupations:
+        if len(_occupation_index_cache) >= MAX_CACHED_OCCUPATION_INDEXES:
+            _occupation_index_cache.clear()
+        cached = (occupations, {occ['name']: occ for occ in occupations if 'name' in occ})
+        _occupation_index_cache[id(occupations)] = cached
+    return cached[1]
 
 def _get_initial_occupations(region_data, age, gender, constraints, debug_print_func, desired_education_level=None):
     # Prioritize 'Student' for young ages
@@ -23,7 +38,7 @@ def _get_initial_occupations(region_data, age, gender, constraints, debug_print_
         debug_print_func(f"Content of region_data['occupations']: {region_data['occupations']}")
         valid_occupations = [occ for occ in region_data['occupations'] if occ['min_age'] <= age <= occ['max_age']]
     else:
-        valid_occupations = region_data['occupations']['occupations']
+        valid_occupations = region_data['occupations']
 
     if not valid_occupations:
         return []
@@ -42,11 +57,11 @@ def _get_initial_occupations(region_data, age, gender, constraints, debug_print_
         weighted_occupations.append(occ)
         weights.append(gender_weight)
 
-    # Use random.choices for initial selection based on gender bias
+    # Use rng.choices for initial selection based on gender bias
     if sum(weights) == 0:
         return valid_occupations # Fallback to all valid if no weights
     else:
-        return random.choices(weighted_occupations, weights=weights, k=len(weighted_occupations)) # Return a list of occupations, potentially with duplicates based on weight
+        return rng.choices(weighted_occupations, weights=weights, k=len(weighted_occupations)) # Return a list of occupations, potentially with duplicates based on weight
 
 def determine_occupation(profile, region_data, debug_print_func, constraints, hidden_attributes):
     age = profile['age']
@@ -103,7 +118,7 @@ def determine_occupation(profile, region_data, debug_print_func, constraints, hi
         best_occupations = [occ for occ, score in occupation_scores if score == max_score]
         
         # If multiple occupations have the same max score, choose one randomly
-        selected_occupation = random.choice(best_occupations)
+        selected_occupation = rng.choice(best_occupations)
         return selected_occupation['name'], selected_occupation
     else:
         return "Unemployed", {"typical_education_level": "Varies"}
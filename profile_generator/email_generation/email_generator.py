@@ -1,4 +1,4 @@
-import random
+from .. import rng
 import unicodedata
 from datetime import datetime
 
@@ -21,9 +21,9 @@ def generate_email_address(first_name, last_name, middle_name, region_data, age,
     no_email_prob_young = age_limits.get('no_email_probability_young', 0)
     no_email_prob_old = age_limits.get('no_email_probability_old', 0)
 
-    if age < min_email_age and random.random() < no_email_prob_young:
+    if age < min_email_age and rng.random() < no_email_prob_young:
         return None
-    if age > max_email_age and random.random() < no_email_prob_old:
+    if age > max_email_age and rng.random() < no_email_prob_old:
         return None
 
     # Domains from the specific region's email file
@@ -62,12 +62,12 @@ def generate_email_address(first_name, last_name, middle_name, region_data, age,
             # Merge with general styles, giving Vietnamese styles priority
             combined_styles = {**local_part_styles, **vietnamese_styles}
             if combined_styles and sum(combined_styles.values()) > 0:
-                chosen_style = random.choices(list(combined_styles.keys()), weights=list(combined_styles.values()), k=1)[0]
+                chosen_style = rng.choices(list(combined_styles.keys()), weights=list(combined_styles.values()), k=1)[0]
             else:
                 chosen_style = "first_last_random_number" # Fallback
         else:
             if local_part_styles and sum(local_part_styles.values()) > 0:
-                chosen_style = random.choices(list(local_part_styles.keys()), weights=list(local_part_styles.values()), k=1)[0]
+                chosen_style = rng.choices(list(local_part_styles.keys()), weights=list(local_part_styles.values()), k=1)[0]
             else:
                 chosen_style = "first_last_random_number" # Fallback
 
@@ -75,37 +75,37 @@ def generate_email_address(first_name, last_name, middle_name, region_data, age,
             if chosen_style == "first_middle_last_year":
                 local_part = f"{unaccented_first_name}{unaccented_middle_name}{unaccented_last_name}{birth_year}"
             elif chosen_style == "first_middle_last_random_number":
-                local_part = f"{unaccented_first_name}{unaccented_middle_name}{unaccented_last_name}{random.randint(1,99)}"
+                local_part = f"{unaccented_first_name}{unaccented_middle_name}{unaccented_last_name}{rng.randint(1,99)}"
             elif chosen_style == "first_middle_last_dot_year":
                 local_part = f"{unaccented_first_name}.{unaccented_middle_name}.{unaccented_last_name}{birth_year}"
             elif chosen_style == "first_middle_last_dot_random_number":
-                local_part = f"{unaccented_first_name}.{unaccented_middle_name}.{unaccented_last_name}{random.randint(1,99)}"
+                local_part = f"{unaccented_first_name}.{unaccented_middle_name}.{unaccented_last_name}{rng.randint(1,99)}"
             elif chosen_style == "first_middle_last_initial_year":
                 local_part = f"{unaccented_first_name}{unaccented_middle_name[0] if unaccented_middle_name else ''}{unaccented_last_name}{birth_year}"
             elif chosen_style == "first_middle_last_initial_random_number":
-                local_part = f"{unaccented_first_name}{unaccented_middle_name[0] if unaccented_middle_name else ''}{unaccented_last_name}{random.randint(1,99)}"
+                local_part = f"{unaccented_first_name}{unaccented_middle_name[0] if unaccented_middle_name else ''}{unaccented_last_name}{rng.randint(1,99)}"
             else:
                 # Fallback to existing styles if no specific middle name style is chosen
                 if chosen_style == "nickname_random_number":
                     nicknames = region_data.get('nicknames', {}).get('nicknames', [])
                     if nicknames:
-                        local_part = strip_accents(random.choice(nicknames).lower())
-                        local_part += str(random.randint(1,99))
+                        local_part = strip_accents(rng.choice(nicknames).lower())
+                        local_part += str(rng.randint(1,99))
                     else:
-                        local_part = f"{unaccented_first_name}{random.randint(1,99)}"
+                        local_part = f"{unaccented_first_name}{rng.randint(1,99)}"
                 elif chosen_style == "nickname_idol":
                     idol_nicknames = email_rules.get('idol_nicknames', [])
                     if idol_nicknames:
-                        local_part = random.choice(idol_nicknames).lower()
-                        local_part += str(random.randint(1,999))
+                        local_part = rng.choice(idol_nicknames).lower()
+                        local_part += str(rng.randint(1,999))
                     else:
-                        local_part = f"{unaccented_first_name}{random.randint(1,99)}"
+                        local_part = f"{unaccented_first_name}{rng.randint(1,99)}"
                 elif chosen_style == "first_name_random_number":
-                    local_part = f"{unaccented_first_name}{random.randint(1,99)}"
+                    local_part = f"{unaccented_first_name}{rng.randint(1,99)}"
                 elif chosen_style == "first_last_initial_year":
                     local_part = f"{unaccented_first_name}{unaccented_last_name[0]}{str(birth_year)[-2:]}"
                 elif chosen_style == "first_last_random_number":
-                    local_part = f"{unaccented_first_name}{unaccented_last_name}{random.randint(1,99)}"
+                    local_part = f"{unaccented_first_name}{unaccented_last_name}{rng.randint(1,99)}"
                 elif chosen_style == "first_last_year":
                     local_part = f"{unaccented_first_name}{unaccented_last_name}{birth_year}"
                 elif chosen_style == "first_last_dot_year":
@@ -119,30 +119,30 @@ def generate_email_address(first_name, last_name, middle_name, region_data, age,
                 elif chosen_style == "simple_name":
                     local_part = f"{unaccented_first_name}{unaccented_last_name}"
                 else:
-                    local_part = f"{unaccented_first_name}{unaccented_last_name}{random.randint(1,99)}" # Default fallback
+                    local_part = f"{unaccented_first_name}{unaccented_last_name}{rng.randint(1,99)}" # Default fallback
         else:
             # Existing logic for non-Vietnamese profiles
             if chosen_style == "nickname_random_number":
                 nicknames = region_data.get('nicknames', {}).get('nicknames', [])
                 debug_print_func(f"email_generator.py - Nicknames: {nicknames}")
                 if nicknames:
-                    local_part = strip_accents(random.choice(nicknames).lower())
-                    local_part += str(random.randint(1,99))
+                    local_part = strip_accents(rng.choice(nicknames).lower())
+                    local_part += str(rng.randint(1,99))
                 else:
-                    local_part = f"{unaccented_first_name}{random.randint(1,99)}"
+                    local_part = f"{unaccented_first_name}{rng.randint(1,99)}"
             elif chosen_style == "nickname_idol":
                 idol_nicknames = email_rules.get('idol_nicknames', [])
                 if idol_nicknames:
-                    local_part = random.choice(idol_nicknames).lower()
-                    local_part += str(random.randint(1,999))
+                    local_part = rng.choice(idol_nicknames).lower()
+                    local_part += str(rng.randint(1,999))
                 else:
-                    local_part = f"{unaccented_first_name}{random.randint(1,99)}"
+                    local_part = f"{unaccented_first_name}{rng.randint(1,99)}"
             elif chosen_style == "first_name_random_number":
-                local_part = f"{unaccented_first_name}{random.randint(1,99)}"
+                local_part = f"{unaccented_first_name}{rng.randint(1,99)}"
             elif chosen_style == "first_last_initial_year":
                 local_part = f"{unaccented_first_name}{unaccented_last_name[0]}{str(birth_year)[-2:]}"
             elif chosen_style == "first_last_random_number":
-                local_part = f"{unaccented_first_name}{unaccented_last_name}{random.randint(1,99)}"
+                local_part = f"{unaccented_first_name}{unaccented_last_name}{rng.randint(1,99)}"
             elif chosen_style == "first_last_year":
                 local_part = f"{unaccented_first_name}{unaccented_last_name}{birth_year}"
             elif chosen_style == "first_last_dot_year":
@@ -156,14 +156,14 @@ def generate_email_address(first_name, last_name, middle_name, region_data, age,
             elif chosen_style == "simple_name":
                 local_part = f"{unaccented_first_name}{unaccented_last_name}"
             else:
-                local_part = f"{unaccented_first_name}{unaccented_last_name}{random.randint(1,99)}" # Default fallback
+                local_part = f"{unaccented_first_name}{unaccented_last_name}{rng.randint(1,99)}" # Default fallback
         # Determine domain
         # Prioritize occupation-based domains
         occupation_based_domains = selected_rule.get('occupation_based_domains', {})
         if occupation_based_domains and occupation in occupation_based_domains:
             domain_weights = occupation_based_domains[occupation]
             if sum(domain_weights.values()) > 0:
-                selected_domain = random.choices(list(domain_weights.keys()), weights=list(domain_weights.values()), k=1)[0]
+                selected_domain = rng.choices(list(domain_weights.keys()), weights=list(domain_weights.values()), k=1)[0]
 
         # Prioritize education-based domains if no occupation-based domain was selected
         if selected_domain is None:
@@ -171,19 +171,19 @@ def generate_email_address(first_name, last_name, middle_name, region_data, age,
             if education_based_domains and education_level in education_based_domains:
                 domain_weights = education_based_domains[education_level]
                 if sum(domain_weights.values()) > 0:
-                    selected_domain = random.choices(list(domain_weights.keys()), weights=list(domain_weights.values()), k=1)[0]
+                    selected_domain = rng.choices(list(domain_weights.keys()), weights=list(domain_weights.values()), k=1)[0]
         
         # If no education-based or occupation-based domain, use rule's domains
         if selected_domain is None:
             rule_domains = selected_rule.get('domains', {})
             if rule_domains and sum(rule_domains.values()) > 0:
-                selected_domain = random.choices(list(rule_domains.keys()), weights=list(rule_domains.values()), k=1)[0]
+                selected_domain = rng.choices(list(rule_domains.keys()), weights=list(rule_domains.values()), k=1)[0]
 
         # Legacy domain retention
-        if selected_domain and random.random() < selected_rule.get('legacy_domain_retention_probability', 0):
+        if selected_domain and rng.random() < selected_rule.get('legacy_domain_retention_probability', 0):
             legacy_domains = [d for d in region_domains if d in ["yahoo.com", "hotmail.com", "live.com"]]
             if legacy_domains:
-                selected_domain = random.choice(legacy_domains)
+                selected_domain = rng.choice(legacy_domains)
 
     # Fallback if no specific rule matched or domain not selected
     if selected_domain is None:
@@ -191,11 +191,11 @@ def generate_email_address(first_name, last_name, middle_name, region_data, age,
         if default_domain_weights and sum(default_domain_weights.values()) > 0:
             filtered_default_domains = {d: w for d, w in default_domain_weights.items() if d in region_domains}
             if filtered_default_domains and sum(filtered_default_domains.values()) > 0:
-                selected_domain = random.choices(list(filtered_default_domains.keys()), weights=list(filtered_default_domains.values()), k=1)[0]
+                selected_domain = rng.choices(list(filtered_default_domains.keys()), weights=list(filtered_default_domains.values()), k=1)[0]
             else:
-                selected_domain = random.choice(region_domains) if region_domains else None # Fallback to any region domain
+                selected_domain = rng.choice(region_domains) if region_domains else None # Fallback to any region domain
         else:
-            selected_domain = random.choice(region_domains) # Fallback to any region domain
+            selected_domain = rng.choice(region_domains) # Fallback to any region domain
 
     if not selected_domain:
         return None # Should not happen if region_domains is not empty
@@ -203,13 +203,13 @@ def generate_email_address(first_name, last_name, middle_name, region_data, age,
     # Ensure local_part is generated even if no specific style was chosen or if names are missing
     if not local_part:
         if unaccented_first_name and unaccented_last_name:
-            local_part = f"{unaccented_first_name}{unaccented_last_name}{random.randint(1,99)}"
+            local_part = f"{unaccented_first_name}{unaccented_last_name}{rng.randint(1,99)}"
         elif unaccented_first_name:
-            local_part = f"{unaccented_first_name}{random.randint(1,999)}"
+            local_part = f"{unaccented_first_name}{rng.randint(1,999)}"
         elif unaccented_last_name:
-            local_part = f"{unaccented_last_name}{random.randint(1,999)}"
+            local_part = f"{unaccented_last_name}{rng.randint(1,999)}"
         else:
-            local_part = f"user{random.randint(1000,9999)}" # Generic fallback
+            local_part = f"user{rng.randint(1000,9999)}" # Generic fallback
 
     return f"{local_part}@{selected_domain}"
 
@@ -1,16 +1,17 @@
+from collections import OrderedDict, deque, namedtuple
 
+from .demographics.occupation import occupation_index
 
 def infer_age_from_occupation(constraints, region_data, debug_print_func):
     """If occupation is set and age is not, infer a suitable age range."""
     if 'occupation' in constraints and 'age_range' not in constraints:
         occupation_name = constraints['occupation']
-        for occ in region_data.get('occupations', {}).get('occupations', []):
-            if occ['name'] == occupation_name:
-                min_age = occ.get('min_age', 18)
-                max_age = occ.get('max_age', 65)
-                constraints['age_range'] = (min_age, max_age)
-                debug_print_func(f"Inferred age range {constraints['age_range']} from occupation {occupation_name}")
-                return constraints
+        occ = occupation_index(region_data).get(occupation_name)
+        if occ is not None:
+            min_age = occ.get('min_age', 18)
+            max_age = occ.get('max_age', 65)
+            constraints['age_range'] = (min_age, max_age)
+            debug_print_func(f"Inferred age range {constraints['age_range']} from occupation {occupation_name}")
     return constraints
 
 def infer_marital_status_from_age(constraints, region_data, debug_print_func):
@@ -32,28 +33,90 @@ def infer_occupation_from_skills(constraints, region_data, debug_print_func):
     pass
     return constraints
 
+# func: rule(constraints, region_data, debug_print_func) -> constraints
+# reads: constraint keys the rule looks at (including keys it only tests for presence)
+# writes: the only constraint keys the rule may add or change
+InferenceRule = namedtuple('InferenceRule', ['func', 'reads', 'writes'])
+
 INFERENCE_RULES = [
-    infer_age_from_occupation,
-    infer_marital_status_from_age,
-    infer_occupation_from_skills,
+    InferenceRule(infer_age_from_occupation, reads=('occupation', 'age_range'), writes=('age_range',)),
+    InferenceRule(infer_marital_status_from_age, reads=('age_range', 'marital_status'), writes=('marital_status',)),
+    InferenceRule(infer_occupation_from_skills, reads=('skills',), writes=()),
 ]
 
+MAX_INFERENCE_STEPS = 1000 # Guards against rules that keep rewriting each other's outputs
+MAX_CACHED_INFERENCES = 128
+
+_MISSING = object()
+
+# (id(region_data), frozen constraints) -> (region_data, {key: inferred value})
+_inference_cache = OrderedDict()
+
+def _freeze(value):
+    """Turns a constraint value into a hashable equivalent for the memo key."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _run_worklist(constraints, region_data, debug_print_func, rules):
+    """
+    Runs every rule once, then re-runs only the rules that read a key some rule just changed,
+    until nothing changes. Returns {key: new value} for the keys that were added or changed.
+    """
+    readers = {}
+    for rule in rules:
+        for key in rule.reads:
+            readers.setdefault(key, []).append(rule)
+
+    worklist = deque(rules)
+    queued = {id(rule) for rule in rules}
+    changes = {}
+    for _ in range(MAX_INFERENCE_STEPS):
+        if not worklist:
+            break
+        rule = worklist.popleft()
+        queued.discard(id(rule))
+        before = [constraints.get(key, _MISSING) for key in rule.writes]
+        constraints = rule.func(constraints, region_data, debug_print_func)
+        for key, old_value in zip(rule.writes, before):
+            new_value = constraints.get(key, _MISSING)
+            if new_value is old_value or new_value == old_value:
+                continue
+            changes[key] = new_value
+            for reader in readers.get(key, ()):
+                if id(reader) not in queued:
+                    queued.add(id(reader))
+                    worklist.append(reader)
+    else:
+        debug_print_func(f"Inference stopped after {MAX_INFERENCE_STEPS} steps without reaching a fixed point.")
+    return changes
+
 def run_inference_engine(constraints, region_data, debug_print_func):
     """
-    Runs a set of inference rules to derive new constraints from existing ones,
-    creating a more complete and logical set of profile characteristics.
+    Derives new constraints from existing ones by running the inference rules until nothing
+    changes. Results are cached per constraint set and region, so identical calls infer once.
     """
+    try:
+        key = (id(region_data), _freeze(constraints))
+        hash(key)
+    except TypeError:
+        key = None # Unhashable constraint value; infer without the cache
+
+    cached = _inference_cache.get(key) if key is not None else None
+    if cached is not None and cached[0] is region_data:
+        _inference_cache.move_to_end(key)
+        constraints.update(cached[1])
+        debug_print_func("Inference result reused for identical constraints.")
+        return constraints
+
     debug_print_func("Running inference engine...")
-    
-    # Loop until no new information can be inferred in a full pass
-    while True:
-        previous_constraints = constraints.copy()
-        
-        for rule in INFERENCE_RULES:
-            constraints = rule(constraints, region_data, debug_print_func)
-            
-        if constraints == previous_constraints:
-            break  # Exit loop if no new constraints were added
-            
+    changes = _run_worklist(constraints, region_data, debug_print_func, INFERENCE_RULES)
+    if key is not None:
+        # Holding region_data in the entry keeps its id from being reused while cached.
+        _inference_cache[key] = (region_data, changes)
+        if len(_inference_cache) > MAX_CACHED_INFERENCES:
+            _inference_cache.popitem(last=False)
     debug_print_func(f"Inference complete. Final constraints: {constraints}")
     return constraints
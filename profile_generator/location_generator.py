@@ -1,97 +1,344 @@
-import random
+from . import rng
+import unicodedata
+from bisect import bisect_right
+from collections import namedtuple
+from functools import lru_cache
+from itertools import accumulate
 
-def get_random_location(region_data, constraints):
-    location_constraints = constraints.get('location', {})
-    
-    regions = region_data.get('address_data', {}).get('regions', [])
-    if not regions:
-        return "Unknown Address", "Unknown Location", None
-
-    selected_region = None
-    if location_constraints.get('region'):
-        selected_region = next((r for r in regions if r['name'] == location_constraints['region']), None)
-    if not selected_region: # If constrained region not found or no constraint, pick randomly
-        if regions:
-            selected_region = random.choice(regions)
+# Addresses are drawn from a sampler built once per region: the address tree is flattened
+# into leaves (one per street, or per deepest unit without streets), each leaf gets the
+# product of its units' shares among their siblings, and an alias table over those masses
+# picks a leaf in O(1). With no weight data every province is equally likely, and below the
+# province level every sibling gets an equal share.
+
+MAX_CACHED_SAMPLERS = 8
+MAX_STREET_NUMBER = 999
+
+# Keys a region may use for its province-level units, in lookup order
+PROVINCE_KEYS = ('provinces', 'states', 'counties', 'principal_areas', 'districts', 'regions')
+
+# Location constraint keys, one per level of the address tree
+CONSTRAINT_LEVELS = ('region', 'province', 'district', 'commune')
+
+# Trailing words naming a unit's type ('Hà Nội City', 'Bắc Giang Province'); a constraint may leave them out
+UNIT_TYPE_WORDS = frozenset(('city', 'province', 'state', 'county', 'district', 'ward', 'commune', 'township', 'town', 'region'))
+
+TOURISM_WEIGHTS = {'Low': 0.75, 'Medium': 1.0, 'High': 1.5, 'Very High': 2.0}
+
+def _explicit_weight(unit):
+    for key in ('population', 'weight'):
+        value = unit.get(key)
+        if isinstance(value, (int, float)) and value >= 0:
+            return float(value)
+    return None
+
+def _proxy_fields(unit):
+    economy = unit.get('economy')
+    gdp = economy.get('gdp_per_capita_usd') if isinstance(economy, dict) else None
+    length = unit.get('length_km')
+    return (
+        gdp if isinstance(gdp, (int, float)) and gdp > 0 else None,
+        length if isinstance(length, (int, float)) and length > 0 else None,
+    )
+
+def sibling_shares(units):
+    """
+    Returns each unit's share of its parent's mass. Explicit 'population' or 'weight' fields
+    are used when every sibling has one; otherwise the shares come from proxies: GDP per
+    capita scaled by tourism status for provinces, length for streets. A sibling missing a
+    proxy gets the average of the siblings that have it.
+    """
+    if not units:
+        return []
+    explicit = [_explicit_weight(unit) for unit in units]
+    if all(weight is not None for weight in explicit):
+        weights = explicit
+    else:
+        proxies = [_proxy_fields(unit) for unit in units]
+        averages = []
+        for column in zip(*proxies):
+            known = [value for value in column if value is not None]
+            averages.append(sum(known) / len(known) if known else 1.0)
+        weights = []
+        for unit, fields in zip(units, proxies):
+            weight = TOURISM_WEIGHTS.get(unit.get('tourism_status'), 1.0)
+            for value, average in zip(fields, averages):
+                weight *= value if value is not None else average
+            weights.append(weight)
+    total = sum(weights)
+    if total <= 0:
+        return [1.0 / len(units)] * len(units)
+    return [weight / total for weight in weights]
+
+@lru_cache(maxsize=4096)
+def normalize_place_name(name):
+    """Folds case, accents and spacing so 'Hà Nội', 'ha noi' and 'HA  NOI' match."""
+    folded = unicodedata.normalize('NFKD', name.replace('đ', 'd').replace('Đ', 'D'))
+    return ' '.join(''.join(c for c in folded if not unicodedata.combining(c)).casefold().split())
+
+def strip_unit_type(normalized_name):
+    """Drops a trailing unit type word from a normalized name: 'ha noi city' -> 'ha noi'."""
+    words = normalized_name.split(' ')
+    if len(words) > 1 and words[-1] in UNIT_TYPE_WORDS:
+        return ' '.join(words[:-1])
+    return normalized_name
+
+# unit: the address data dict; [start, end): the unit's leaves in LocationSampler order
+LocationNode = namedtuple('LocationNode', ['unit', 'start', 'end'])
+
+def _unit_label(unit):
+    return f"{unit.get('type', '')} {unit.get('name', '')}".strip()
+
+class _AliasTable:
+    """Walker/Vose alias table: O(n) to build, O(1) per draw."""
+    __slots__ = ('n', 'probability', 'alias')
+
+    def __init__(self, weights):
+        self.n = n = len(weights)
+        total = sum(weights)
+        scaled = [w * n / total for w in weights] if total > 0 else [1.0] * n
+        self.probability = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.probability[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Whatever is left over is 1.0 up to rounding error
+
+    @classmethod
+    def from_arrays(cls, probability, alias):
+        """Wraps prebuilt probability and alias sequences, e.g. views into a region pack."""
+        table = cls.__new__(cls)
+        table.n, table.probability, table.alias = len(probability), probability, alias
+        return table
+
+    def sample(self):
+        i = int(rng.random() * self.n)
+        return i if rng.random() < self.probability[i] else self.alias[i]
+
+    def sample_many(self, k):
+        n, probability, alias, rand = self.n, self.probability, self.alias, rng.current().random
+        indices = []
+        for _ in range(k):
+            i = int(rand() * n)
+            indices.append(i if rand() < probability[i] else alias[i])
+        return indices
+
+class LocationSampler:
+    """Population-weighted address sampler over one region's flattened address tree."""
+    def __init__(self, address_data):
+        self.addresses = [] # ", "-joined address without the street number
+        self.streets = [] # street name, or None for leaves without streets
+        self.cities = []
+        self.provinces = []
+        # One dict per constraint level: normalized name -> [LocationNode]. Leaves are laid out
+        # depth-first, so every unit's leaves form the contiguous range [start, end).
+        self.index = [{} for _ in CONSTRAINT_LEVELS]
+        masses = []
+
+        def leaf(parts, mass, city, province, street=None):
+            self.addresses.append(", ".join(filter(None, parts)))
+            self.streets.append(street)
+            self.cities.append(city)
+            self.provinces.append(province)
+            masses.append(mass)
+
+        def index_unit(level, unit, start):
+            if unit.get('name'):
+                node = LocationNode(unit, start, len(masses))
+                self.index[level].setdefault(normalize_place_name(unit['name']), []).append(node)
+
+        # Province-level units are weighed against every other one in the country, so a region's
+        # mass is that of its provinces; only explicit region weights split the mass by region.
+        regions = address_data.get('regions', [])
+        top_level = [] # (region, province or None, mass)
+        region_provinces = [next((region[key] for key in PROVINCE_KEYS if region.get(key)), []) for region in regions]
+        if regions and all(_explicit_weight(region) is not None for region in regions):
+            for region, region_share, provinces in zip(regions, sibling_shares(regions), region_provinces):
+                top_level.extend((region, province, region_share * share) for province, share in zip(provinces, sibling_shares(provinces)))
+                if not provinces:
+                    top_level.append((region, None, region_share))
+        else:
+            pairs = [(region, province) for region, provinces in zip(regions, region_provinces) for province in provinces or [None]]
+            units = [province if province is not None else region for _, province in pairs]
+            top_level = [(region, province, share) for (region, province), share in zip(pairs, sibling_shares(units))]
+
+        region_starts = {} # id(region) -> (region, first leaf)
+        for region, province, province_mass in top_level:
+            region_starts.setdefault(id(region), (region, len(masses)))
+            region_parts = [region['name']]
+            if province is None:
+                leaf(region_parts, province_mass, "Unknown Location", None)
+                continue
+            province_start = len(masses)
+            province_parts = [_unit_label(province)] + region_parts
+            districts = province.get('administrative_units', [])
+            if not districts:
+                leaf(province_parts, province_mass, "Unknown Location", province)
+            for district, district_share in zip(districts, sibling_shares(districts)):
+                district_start = len(masses)
+                district_parts = [_unit_label(district)] + province_parts
+                district_mass = province_mass * district_share
+                communes = district.get('sub_units', [])
+                if not communes:
+                    leaf(district_parts, district_mass, district['name'], province)
+                for commune, commune_share in zip(communes, sibling_shares(communes)):
+                    commune_start = len(masses)
+                    commune_parts = [_unit_label(commune)] + district_parts
+                    # Some communes nest one more level of units holding the streets
+                    finals = commune.get('sub_units') or [commune]
+                    for final, final_share in zip(finals, sibling_shares(finals)):
+                        final_parts = commune_parts if final is commune else [_unit_label(final)] + commune_parts
+                        final_mass = district_mass * commune_share * final_share
+                        streets = final.get('streets', [])
+                        if not streets:
+                            leaf(final_parts, final_mass, district['name'], province)
+                        for street, street_share in zip(streets, sibling_shares(streets)):
+                            leaf(final_parts, final_mass * street_share, district['name'], province, street['name'])
+                    index_unit(3, commune, commune_start)
+                index_unit(2, district, district_start)
+            index_unit(1, province, province_start)
+        # Every region's provinces are consecutive in top_level, so its leaves are contiguous too
+        end = len(masses)
+        for region_id in reversed(list(region_starts)):
+            region, region_start = region_starts[region_id]
+            if region.get('name'):
+                node = LocationNode(region, region_start, end)
+                self.index[0].setdefault(normalize_place_name(region['name']), []).append(node)
+            end = region_start
+
+        self.masses = masses
+        self.cum_masses = list(accumulate(masses))
+        self.table = _AliasTable(masses) if masses else None
+        self._constrained = {} # constraint values -> (leaf ranges, cumulative range masses)
+        self._short_index = None
+
+    def _nodes(self, level, name):
+        """
+        Returns the LocationNodes named `name` at a level (an index into CONSTRAINT_LEVELS).
+        Without an exact match the unit type word is ignored on both sides, so 'ha noi' and
+        'Ha Noi Province' find 'Hà Nội City'.
+        """
+        key = normalize_place_name(name)
+        nodes = self.index[level].get(key)
+        if nodes is None:
+            if self._short_index is None:
+                self._short_index = []
+                for level_index in self.index:
+                    short_index = {}
+                    for full_name, level_nodes in level_index.items():
+                        short_index.setdefault(strip_unit_type(full_name), []).extend(level_nodes)
+                    self._short_index.append(short_index)
+            nodes = self._short_index[level].get(strip_unit_type(key))
+        return nodes or ()
+
+    def find(self, level, name):
+        """Returns the first unit at a constraint level ('region', 'province', ...) with this name, or None."""
+        nodes = self._nodes(CONSTRAINT_LEVELS.index(level), name) if name else ()
+        return nodes[0].unit if nodes else None
+
+    def _ranges_for(self, key):
+        """
+        Returns the leaf ranges matching the constraint values and their cumulative masses.
+        Each level narrows the ranges to the named units inside them; a name that matches
+        nothing there leaves that level unconstrained.
+        """
+        if key not in self._constrained:
+            ranges = [(0, len(self.cum_masses))]
+            for level, value in enumerate(key):
+                if not value:
+                    continue
+                nodes = self._nodes(level, value)
+                matching = [(node.start, node.end) for node in nodes
+                            if node.end > node.start and any(s <= node.start and node.end <= e for s, e in ranges)]
+                if matching:
+                    ranges = matching
+            range_masses = [self._range_mass(s, e) for s, e in ranges]
+            self._constrained[key] = (ranges, list(accumulate(range_masses)))
+        return self._constrained[key]
+
+    def _range_mass(self, start, end):
+        return self.cum_masses[end - 1] - (self.cum_masses[start - 1] if start else 0.0)
+
+    def _sample_index(self, key):
+        if not any(key):
+            return self.table.sample()
+        ranges, range_cum = self._ranges_for(key)
+        if len(ranges) == 1:
+            start, end = ranges[0]
+        elif range_cum[-1] > 0:
+            start, end = ranges[min(bisect_right(range_cum, rng.random() * range_cum[-1]), len(ranges) - 1)]
         else:
-            return "Unknown Address", "Unknown Location", None # Should not happen due to initial check
-
-    # Initialize address parts
-    address_parts = []
-    city_name = "Unknown Location" # Initialize city_name
-    selected_province_obj = None
-
-    # Process Region
-    if selected_region:
-        address_parts.append(selected_region['name'])
-
-        # Process Province/State
-        provinces = selected_region.get('provinces', []) or \
-                    selected_region.get('states', []) or \
-                    selected_region.get('counties', []) or \
-                    selected_region.get('principal_areas', []) or \
-                    selected_region.get('districts', []) or \
-                    selected_region.get('regions', []) # Fallback for regions within regions
-
-        selected_province = None
-        if location_constraints.get('province'):
-            selected_province = next((p for p in provinces if p['name'] == location_constraints['province']), None)
-        if not selected_province:
-            if provinces:
-                selected_province = random.choice(provinces)
-        
-        if selected_province:
-            address_parts.insert(0, f"{selected_province.get('type', '')} {selected_province.get('name', '')}".strip())
-            selected_province_obj = selected_province
-
-            # Process District/Administrative Unit
-            districts = selected_province.get('administrative_units', [])
-            selected_admin_unit = None
-            if location_constraints.get('district'):
-                selected_admin_unit = next((d for d in districts if d['name'] == location_constraints['district']), None)
-            if not selected_admin_unit:
-                if districts:
-                    selected_admin_unit = random.choice(districts)
-            
-            if selected_admin_unit:
-                address_parts.insert(0, f"{selected_admin_unit.get('type', '')} {selected_admin_unit.get('name', '')}".strip())
-                city_name = selected_admin_unit['name'] # Store the city name here
-
-                # Process Commune/Sub-unit
-                communes = selected_admin_unit.get('sub_units', [])
-                selected_sub_unit = None
-                if location_constraints.get('commune'):
-                    selected_sub_unit = next((c for c in communes if c['name'] == location_constraints['commune']), None)
-                if not selected_sub_unit:
-                    if communes:
-                        selected_sub_unit = random.choice(communes)
-                
-                if selected_sub_unit:
-                    address_parts.insert(0, f"{selected_sub_unit.get('type', '')} {selected_sub_unit.get('name', '')}".strip())
-
-                    # Handle nested sub_units for streets
-                    final_level_unit = selected_sub_unit
-                    if 'sub_units' in selected_sub_unit and selected_sub_unit['sub_units']:
-                        final_level_unit = random.choice(selected_sub_unit['sub_units'])
-                        address_parts.insert(0, f"{final_level_unit.get('type', '')} {final_level_unit.get('name', '')}".strip())
-
-                    # Process Streets
-                    streets = final_level_unit.get('streets', [])
-                    if streets:
-                        selected_street = random.choice(streets)
-                        street_number = random.randint(1, 999)
-                        address_parts.insert(0, f"{street_number} {selected_street['name']}")
-                        # location_name remains the deepest unit with streets
-
-    # Filter out empty strings and join
-    final_address = ", ".join(filter(None, address_parts))
-    if not final_address:
-        return "Unknown Address", "Unknown Location", None # Fallback if nothing could be generated
-
-    return final_address, city_name, selected_province_obj
+            start, end = rng.choice(ranges)
+        base = self.cum_masses[start - 1] if start else 0.0
+        mass = self.cum_masses[end - 1] - base
+        if mass <= 0:
+            return rng.randrange(start, end)
+        return bisect_right(self.cum_masses, base + rng.random() * mass, start, end - 1)
+
+    def _location(self, i):
+        street = self.streets[i]
+        address = self.addresses[i]
+        if street is not None:
+            address = f"{rng.randint(1, MAX_STREET_NUMBER)} {street}, {address}" if address else f"{rng.randint(1, MAX_STREET_NUMBER)} {street}"
+        return address or "Unknown Address", self.cities[i], self.provinces[i]
+
+    def sample(self, location_constraints=None):
+        """Returns (address, city name, province dict or None)."""
+        if self.table is None:
+            return "Unknown Address", "Unknown Location", None
+        location_constraints = location_constraints or {}
+        key = tuple(location_constraints.get(level) for level in CONSTRAINT_LEVELS)
+        return self._location(self._sample_index(key))
+
+    def sample_many(self, k, location_constraints=None):
+        """Returns k (address, city name, province dict or None) tuples."""
+        if self.table is None:
+            return [("Unknown Address", "Unknown Location", None)] * k
+        location_constraints = location_constraints or {}
+        key = tuple(location_constraints.get(level) for level in CONSTRAINT_LEVELS)
+        if not any(key):
+            return [self._location(i) for i in self.table.sample_many(k)]
+        return [self._location(self._sample_index(key)) for _ in range(k)]
+
+_NO_ADDRESS_DATA = {}
+
+# id(address_data) -> (address_data, LocationSampler)
+_sampler_cache = {}
+
+def get_location_sampler(region_data):
+    """Returns the LocationSampler for the region's address data, building it on first use."""
+    pack = region_data.get('region_pack')
+    if pack is not None:
+        return pack.location_sampler
+    address_data = region_data.get('address_data') or _NO_ADDRESS_DATA
+    cached = _sampler_cache.get(id(address_data))
+    if cached is None or cached[0] is not address_data:
+        if len(_sampler_cache) >= MAX_CACHED_SAMPLERS:
+            _sampler_cache.clear()
+        # Holding address_data in the entry keeps its id from being reused while cached.
+        cached = (address_data, LocationSampler(address_data))
+        _sampler_cache[id(address_data)] = cached
+    return cached[1]
+
+def find_province(region_data, name):
+    """Returns the province-level unit with this name (case- and accent-insensitive), or None."""
+    return get_location_sampler(region_data).find('province', name)
+
+def get_random_location(region_data, constraints):
+    return get_location_sampler(region_data).sample(constraints.get('location', {}))
 
 def generate_address(region_data, region_id):
     """Wrapper function to generate just the address string."""
     # We pass an empty constraints dict because we are not constraining location here
     address, _, _ = get_random_location(region_data, {})
     return {"Address": address}
+
+def generate_addresses(region_data, count, constraints=None):
+    """Batch counterpart of generate_address: returns `count` address dicts."""
+    locations = get_location_sampler(region_data).sample_many(count, (constraints or {}).get('location', {}))
+    return [{"Address": address} for address, _, _ in locations]
@@ -0,0 +1,233 @@
+import weakref
+from collections import namedtuple
+
+from .core.name import generate_name
+from .core.age_dob import generate_age_and_dob
+from .core.gender import generate_gender
+from .location_generator import generate_address
+from .contact.phone_number import generate_phone_number
+from .demographics.occupation import generate_occupation, occupation_index
+from .demographics.family_details import generate_family_details
+from .email_generation.email_generator import generate_email
+from .physical.physical_description import generate_physical_description
+from .demographics.hobbies import generate_hobbies_interests
+from .demographics.skills_interests import generate_skills_interests
+from .unconventional.unconventional_data import generate_unconventional_data, generate_hidden_attributes
+from .validation_checks.rule_engine import get_rule_set
+
+# A profile is built by a fixed sequence of stages. Each stage returns the fields it adds, so
+# in valid-only mode a stage whose output breaks a consistency rule can be thrown away and
+# re-run on its own instead of regenerating the whole profile.
+
+MAX_STAGE_RETRIES = 20 # Re-runs of one failing stage before the profile is started over
+MAX_PROFILE_ATTEMPTS = 5 # Full restarts before giving up on the constraints
+
+# name: stage name; fields: the (lower-case) fields it produces, used to decide after which
+# stage each consistency rule can be checked; run: fn(profile, region_data, constraints,
+# debug_print_func, context) -> dict of new fields.
+ProfileStage = namedtuple('ProfileStage', ['name', 'fields', 'run'])
+
+def _core_stage(profile, region_data, constraints, debug_print_func, context):
+    fields = {}
+    fields.update(generate_name(region_data, constraints.get('gender'), constraints.get('name_method'), constraints.get('custom_first_name'), constraints.get('custom_last_name')))
+    fields.update(generate_age_and_dob({'age_range': constraints.get('age_range')}))
+    fields.update(generate_gender(constraints.get('gender')))
+    fields.update(generate_address(region_data, constraints.get('region')))
+    # Add region_id to region_data for email generation
+    region_data['region_id'] = constraints.get('region')
+    return fields
+
+def _hidden_stage(profile, region_data, constraints, debug_print_func, context):
+    # These are the "nội tại bên trong" that will influence other generations
+    hidden_attributes = generate_hidden_attributes(
+        unconventional_data_rules=region_data['unconventional_data_rules'],
+        profile=profile, # Pass current profile for age/gender context if needed by hidden_attributes generation
+        constraints=constraints,
+        debug_print_func=debug_print_func,
+        skills_interests_rules=region_data.get('skills_interests_rules'),
+        region_data=region_data # Pass region_data for location biases
+    )
+    context['hidden_attributes'] = hidden_attributes
+    return hidden_attributes
+
+def _occupation_stage(profile, region_data, constraints, debug_print_func, context):
+    return generate_occupation(region_data, profile.get('age'), constraints.get('occupation'), context['hidden_attributes'])
+
+def _family_stage(profile, region_data, constraints, debug_print_func, context):
+    if not constraints.get('family_details'):
+        return {}
+    education_level = constraints.get('desired_education_level')
+    if not education_level or education_level == 'any':
+        occupation = occupation_index(region_data).get(profile.get('Occupation'))
+        education_level = occupation.get('typical_education_level') if occupation else None
+    return generate_family_details(profile.get('age'), education_level, constraints, region_data, debug_print_func)
+
+def _contact_stage(profile, region_data, constraints, debug_print_func, context):
+    hidden_attributes = context['hidden_attributes']
+    fields = {}
+    fields.update(generate_email(profile, region_data, constraints, hidden_attributes))
+    fields.update(generate_phone_number(region_data, profile.get('age'), hidden_attributes))
+    return fields
+
+def _physical_stage(profile, region_data, constraints, debug_print_func, context):
+    return generate_physical_description(region_data, profile.get('gender'), profile.get('age'), context['hidden_attributes'], debug_print_func)
+
+def _unconventional_stage(profile, region_data, constraints, debug_print_func, context):
+    if not constraints.get('include_unconventional'):
+        return {}
+    unconventional_choices = {
+        key: key in constraints.get('unconventional_data_selection', []) for key in [
+            'personality_traits', 'life_events', 'online_behaviors',
+            'texting_typing_style', 'digital_footprint', 'device_habits'
+        ]
+    }
+    # personality_traits is already handled by generate_hidden_attributes; generate_unconventional_data
+    # only generates the *other* unconventional data.
+    if not any(unconventional_choices.values()):
+        return {}
+    return generate_unconventional_data(
+        unconventional_data_rules=region_data['unconventional_data_rules'],
+        age=profile.get('age'),
+        unconventional_data_selection=unconventional_choices,
+        hidden_attributes=context['hidden_attributes'],
+        debug_print_func=debug_print_func
+    )
+
+def _skills_stage(profile, region_data, constraints, debug_print_func, context):
+    if not constraints.get('include_skills_interests'):
+        return {}
+    hidden_attributes = context['hidden_attributes']
+    skills, interests = generate_skills_interests(
+        age=profile.get('age'),
+        skills_interests_rules=region_data.get('skills_interests_rules'),
+        personality_trait=hidden_attributes.get('personality_trait'),
+        debug_print_func=debug_print_func,
+        hidden_attributes=hidden_attributes
+    )
+    # Hobbies are generated alongside, also influenced by hidden attributes
+    hobbies = generate_hobbies_interests(
+        age=profile.get('age'),
+        region_data=region_data,
+        personality_trait=hidden_attributes.get('personality_trait'),
+        debug_print_func=debug_print_func,
+        hidden_attributes=hidden_attributes
+    )
+    return {'skills': skills, 'interests': interests, 'hobbies': hobbies}
+
+PROFILE_STAGES = (
+    ProfileStage('core', ('first_name', 'middle_name', 'last_name', 'age', 'dob', 'gender', 'address'), _core_stage),
+    ProfileStage('hidden', ('personality_trait', 'exceptionality_score', 'self_memory_accuracy', 'internal_consistency',
+                            'digital_native_score', 'culture_exposure_level', 'geo_mobility_index', 'education_index'), _hidden_stage),
+    ProfileStage('occupation', ('occupation',), _occupation_stage),
+    ProfileStage('family', ('marital_status', 'children'), _family_stage),
+    ProfileStage('contact', ('email', 'phone_number'), _contact_stage),
+    ProfileStage('physical', ('eye_color', 'hair_color', 'hair_style', 'height_cm', 'build', 'distinguishing_marks'), _physical_stage),
+    ProfileStage('unconventional', ('life_events', 'online_behavior', 'texting_typing_style', 'digital_footprint', 'device_habits'), _unconventional_stage),
+    ProfileStage('skills', ('skills', 'interests', 'hobbies'), _skills_stage),
+)
+
+def run_pipeline(region_data, constraints, debug_print_func, stages=PROFILE_STAGES):
+    """Runs every stage once and returns the profile, without any consistency checks."""
+    profile, context = {}, {}
+    for stage in stages:
+        profile.update(stage.run(profile, region_data, constraints, debug_print_func, context))
+    return profile
+
+class RejectionStats:
+    """Counts, per stage and per rule, how often valid-only generation had to regenerate."""
+    def __init__(self):
+        self.accepted = 0
+        self.restarts = 0
+        self.stage_runs = {}
+        self.rejections = {} # rule_id -> number of stage outputs it rejected
+        self.rule_stage = {} # rule_id -> stage the rule is checked after
+
+    def record_run(self, stage_name):
+        self.stage_runs[stage_name] = self.stage_runs.get(stage_name, 0) + 1
+
+    def record_rejection(self, stage_name, rule_id):
+        self.rejections[rule_id] = self.rejections.get(rule_id, 0) + 1
+        self.rule_stage[rule_id] = stage_name
+
+    def merge(self, other):
+        self.accepted += other.accepted
+        self.restarts += other.restarts
+        for stage_name, count in other.stage_runs.items():
+            self.stage_runs[stage_name] = self.stage_runs.get(stage_name, 0) + count
+        for rule_id, count in other.rejections.items():
+            self.rejections[rule_id] = self.rejections.get(rule_id, 0) + count
+        self.rule_stage.update(other.rule_stage)
+
+    def rejection_rates(self):
+        """Returns {rule_id: fraction of its stage's runs the rule rejected}, highest first."""
+        rates = {rule_id: count / max(self.stage_runs.get(self.rule_stage[rule_id], 0), 1)
+                 for rule_id, count in self.rejections.items()}
+        return dict(sorted(rates.items(), key=lambda item: item[1], reverse=True))
+
+    def summary_lines(self):
+        lines = [f"Accepted profiles: {self.accepted}, full restarts: {self.restarts}"]
+        for rule_id, rate in self.rejection_rates().items():
+            lines.append(f"{rule_id} ({self.rule_stage[rule_id]}): rejected {self.rejections[rule_id]} times, {rate:.2%} of runs")
+        return lines
+
+# rule set -> {groups: (rule ids checked after stage 0, after stage 1, ...)}
+_stage_rule_cache = weakref.WeakKeyDictionary()
+
+def stage_rule_ids(rule_set, groups, stages=PROFILE_STAGES):
+    """
+    Assigns every rule in `groups` to the last stage producing a field it reads, i.e. the
+    earliest point where all its inputs exist. Rules reading no stage's fields go last.
+    """
+    per_groups = _stage_rule_cache.setdefault(rule_set, {})
+    key = (groups, tuple(stage.name for stage in stages))
+    if key not in per_groups:
+        stage_of_field = {}
+        for index, stage in enumerate(stages):
+            for field in stage.fields:
+                stage_of_field[field] = index
+        assigned = [set() for _ in stages]
+        for rule in rule_set.select(groups):
+            indices = [stage_of_field[f] for f in rule.reads if f in stage_of_field]
+            assigned[max(indices) if indices else len(stages) - 1].add(rule.id)
+        per_groups[key] = tuple(frozenset(ids) for ids in assigned)
+    return per_groups[key]
+
+def generate_valid_profile(region_data, constraints, debug_print_func, stats=None, stages=PROFILE_STAGES):
+    """
+    Generates a profile that passes every error-level consistency rule. The rules are checked
+    right after the stage that completes their inputs, and only that stage is regenerated on a
+    violation. A stage that keeps failing restarts the profile, since an earlier stage may be
+    the cause. Raises ValueError if the constraints never yield a consistent profile.
+    """
+    rule_set = get_rule_set(region_data)
+    groups = ('profile', 'logic') if constraints.get('allow_unconventional', False) else ('profile', 'logic', 'strict')
+    rules_after = stage_rule_ids(rule_set, groups, stages)
+    stats = stats if stats is not None else RejectionStats()
+
+    last_rule_id = None
+    for attempt in range(MAX_PROFILE_ATTEMPTS):
+        profile, context = {}, {}
+        for stage, rule_ids in zip(stages, rules_after):
+            for retry in range(MAX_STAGE_RETRIES + 1):
+                produced = stage.run(profile, region_data, constraints, debug_print_func, context)
+                profile.update(produced)
+                stats.record_run(stage.name)
+                if not rule_ids:
+                    break
+                violations = rule_set.evaluate(profile, groups, first_error=True, only=rule_ids)
+                if not violations:
+                    break
+                last_rule_id = violations[0].rule_id
+                stats.record_rejection(stage.name, last_rule_id)
+                debug_print_func(f"Stage '{stage.name}' rejected by {last_rule_id}: {violations[0].message}")
+                for key in produced:
+                    profile.pop(key, None)
+            else:
+                stats.restarts += 1
+                debug_print_func(f"Stage '{stage.name}' failed {MAX_STAGE_RETRIES + 1} times; restarting the profile.")
+                break
+        else:
+            stats.accepted += 1
+            return profile
+    raise ValueError(f"Could not generate a consistent profile in {MAX_PROFILE_ATTEMPTS} attempts; "
+                     f"rule '{last_rule_id}' kept failing. The constraints may be contradictory.")
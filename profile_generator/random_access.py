@@ -0,0 +1,34 @@
+import hashlib
+import random
+
+from . import rng
+from .pipeline import run_pipeline, generate_valid_profile
+
+# Counter-based generation: profile number `index` of a seed is generated from a random.Random
+# of its own, seeded from a hash of (seed, region, index), so any profile or range of profiles
+# can be produced on its own, in any order, process or thread, and always comes out the same.
+# Seeding costs a few microseconds per profile. (Dates of birth and email years are relative
+# to the current year, so results only repeat within the same calendar year.)
+
+SEED_PERSONALIZATION = b'fm-profile'
+
+def profile_seed(seed, region, index):
+    """Returns the 128-bit seed of profile `index` of `seed` in `region`."""
+    digest = hashlib.blake2b(f"{seed}:{region}:{index}".encode('utf-8'), digest_size=16, person=SEED_PERSONALIZATION).digest()
+    return int.from_bytes(digest, 'little')
+
+def generate_profile_at(region_data, constraints, seed, index, debug_print_func, apply_consistency_checks=False, stats=None):
+    """
+    Generates profile number `index` for `seed` without generating the ones before it.
+    The profile draws from its own generator (see rng.py), so other generation running at the
+    same time cannot change it, and the random module's shared state is left untouched.
+    """
+    with rng.use(random.Random(profile_seed(seed, constraints.get('region'), index))):
+        if apply_consistency_checks or constraints.get('valid_only'):
+            return generate_valid_profile(region_data, constraints, debug_print_func, stats)
+        return run_pipeline(region_data, constraints, debug_print_func)
+
+def generate_profiles_slice(region_data, constraints, seed, start_index, count, debug_print_func, apply_consistency_checks=False, stats=None):
+    """Yields profiles start_index .. start_index + count - 1 of `seed`, each as generate_profile_at would."""
+    for index in range(start_index, start_index + count):
+        yield generate_profile_at(region_data, constraints, seed, index, debug_print_func, apply_consistency_checks, stats)
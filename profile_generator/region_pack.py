@@ -0,0 +1,300 @@
+import array
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from . import rng
+from .core.name import NameSampler, build_name_tables
+from .location_generator import CONSTRAINT_LEVELS, MAX_STREET_NUMBER, LocationNode, LocationSampler, _AliasTable, get_location_sampler, normalize_place_name
+
+# A region pack holds a region's large lookup tables (weighted name lists and the flattened
+# address leaves with their name index) in one flat binary file. Processes open it with a
+# read-only mmap: strings stay in a UTF-8 blob addressed through an offset array, weights
+# are float64 arrays read through memoryviews, so every worker shares the same pages
+# instead of holding its own copy of the JSON-derived dicts.
+#
+# Layout: header, section directory, then 8-byte aligned sections. A string table "x" is
+# the two sections "x.offsets" (uint32, one more than the number of strings) and "x.blob".
+
+PACK_MAGIC = b'FMRPACK1'
+PACK_VERSION = 1
+PACK_SUFFIX = '.pack'
+SECTION_ALIGNMENT = 8
+
+# region_data keys whose contents a pack replaces
+PACKED_KEYS = ('first_names_male', 'first_names_female', 'last_names', 'middle_names', 'address_data')
+
+NAME_TABLE_KEYS = ('first_names_male', 'first_names_female', 'first_names_any', 'last_names', 'middle_names')
+
+NO_PROVINCE = 0xFFFFFFFF
+
+_HEADER = struct.Struct('<8sHBxI') # magic, version, byte order, section count
+_SECTION = struct.Struct('<32scxxxxxxxQQ') # name, array typecode, offset, item count
+_BYTE_ORDERS = {'little': 0, 'big': 1}
+
+def _uint32_typecode():
+    for typecode in ('I', 'L'):
+        if array.array(typecode).itemsize == 4:
+            return typecode
+    raise RuntimeError("No 4-byte unsigned array type on this platform")
+
+UINT32 = _uint32_typecode()
+
+def _align(offset):
+    return -(-offset // SECTION_ALIGNMENT) * SECTION_ALIGNMENT
+
+class _PackWriter:
+    def __init__(self):
+        self.sections = [] # (name, typecode, data bytes, item count)
+
+    def add_array(self, name, typecode, values):
+        values = array.array(typecode, values)
+        self.sections.append((name, typecode, values.tobytes(), len(values)))
+
+    def add_strings(self, name, strings):
+        blob = bytearray()
+        offsets = array.array(UINT32, [0])
+        for string in strings:
+            blob += string.encode('utf-8')
+            offsets.append(len(blob))
+        self.sections.append((f'{name}.offsets', UINT32, offsets.tobytes(), len(offsets)))
+        self.sections.append((f'{name}.blob', 'B', bytes(blob), len(blob)))
+
+    def write(self, path):
+        directory = []
+        offset = _align(_HEADER.size + _SECTION.size * len(self.sections))
+        for name, typecode, data, count in self.sections:
+            encoded_name = name.encode('utf-8')
+            if len(encoded_name) > 32:
+                raise ValueError(f"Region pack section name too long: {name}")
+            directory.append((encoded_name, typecode, offset, count, data))
+            offset = _align(offset + len(data))
+
+        # Write next to the target and rename, so readers never map a half-written pack.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, _BYTE_ORDERS[sys.byteorder], len(directory)))
+                for encoded_name, typecode, section_offset, count, _ in directory:
+                    f.write(_SECTION.pack(encoded_name, typecode.encode('ascii'), section_offset, count))
+                for _, _, section_offset, _, data in directory:
+                    f.write(b'\0' * (section_offset - f.tell()))
+                    f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+def write_region_pack(region_data, path):
+    """Compiles the region's name lists and address tree into a region pack at `path`."""
+    writer = _PackWriter()
+
+    for key, sampler in build_name_tables(region_data).items():
+        if sampler is not None:
+            writer.add_strings(f'names.{key}', sampler.names)
+            writer.add_array(f'names.{key}.cum', 'd', sampler.cum_weights)
+
+    sampler = get_location_sampler(region_data)
+    province_ids = {}
+    provinces = []
+    def province_id(province):
+        if province is None:
+            return NO_PROVINCE
+        if id(province) not in province_ids:
+            province_ids[id(province)] = len(provinces)
+            provinces.append(province)
+        return province_ids[id(province)]
+
+    writer.add_strings('address.addresses', sampler.addresses)
+    writer.add_strings('address.streets', (street or '' for street in sampler.streets))
+    writer.add_strings('address.cities', sampler.cities)
+    writer.add_array('address.province', UINT32, (province_id(p) for p in sampler.provinces))
+    writer.add_array('address.cum_masses', 'd', sampler.cum_masses)
+    if sampler.table is not None:
+        writer.add_array('address.alias_probability', 'd', sampler.table.probability)
+        writer.add_array('address.alias', UINT32, sampler.table.alias)
+
+    for level, index in zip(CONSTRAINT_LEVELS, sampler.index):
+        nodes = [node for level_nodes in index.values() for node in level_nodes]
+        writer.add_strings(f'index.{level}.names', (node.unit['name'] for node in nodes))
+        writer.add_array(f'index.{level}.ranges', UINT32, (bound for node in nodes for bound in (node.start, node.end)))
+        if level == 'province':
+            writer.add_array('index.province.units', UINT32, (province_id(node.unit) for node in nodes))
+
+    # Provinces are kept for their metadata (geography, economy, ...); their subtrees are the leaves.
+    writer.add_strings('provinces', (
+        json.dumps({k: v for k, v in province.items() if k != 'administrative_units'}, ensure_ascii=False)
+        for province in provinces
+    ))
+    writer.write(path)
+
+class StringTable:
+    """Read-only sequence of the strings in a pack's string table, decoded on access."""
+    __slots__ = ('_offsets', '_blob')
+
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        return str(self._blob[self._offsets[i]:self._offsets[i + 1]], 'utf-8')
+
+class _OptionalStrings:
+    """A StringTable where the empty string stands for None."""
+    __slots__ = ('_strings',)
+
+    def __init__(self, strings):
+        self._strings = strings
+
+    def __len__(self):
+        return len(self._strings)
+
+    def __getitem__(self, i):
+        return self._strings[i] or None
+
+class _ProvinceList:
+    """Maps each leaf to its province dict, decoding every province once."""
+    __slots__ = ('_ids', '_json', '_decoded')
+
+    def __init__(self, ids, province_json):
+        self._ids = ids
+        self._json = province_json
+        self._decoded = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def unit(self, province_id):
+        if province_id == NO_PROVINCE:
+            return None
+        province = self._decoded.get(province_id)
+        if province is None:
+            province = self._decoded[province_id] = json.loads(self._json[province_id])
+        return province
+
+    def __getitem__(self, i):
+        return self.unit(self._ids[i])
+
+class PackedLocationSampler(LocationSampler):
+    """A LocationSampler whose leaf tables are views into a region pack."""
+    def __init__(self, pack):
+        self.addresses = pack.strings('address.addresses')
+        self.streets = _OptionalStrings(pack.strings('address.streets'))
+        self.cities = pack.strings('address.cities')
+        self.provinces = _ProvinceList(pack.array('address.province'), pack.strings('provinces'))
+        self.cum_masses = pack.array('address.cum_masses')
+        self.table = _AliasTable.from_arrays(pack.array('address.alias_probability'), pack.array('address.alias')) if len(self.cum_masses) else None
+        self._pack = pack
+        self._index = None
+        self._short_index = None
+        self._constrained = {}
+
+    def _location(self, i):
+        # Same result as LocationSampler._location, reading the tables without the wrappers
+        address = self.addresses[i]
+        street = self.streets._strings[i]
+        if street:
+            address = f"{rng.randint(1, MAX_STREET_NUMBER)} {street}, {address}" if address else f"{rng.randint(1, MAX_STREET_NUMBER)} {street}"
+        return address or "Unknown Address", self.cities[i], self.provinces.unit(self.provinces._ids[i])
+
+    @property
+    def masses(self):
+        cum_masses = self.cum_masses
+        return [cum_masses[i] - (cum_masses[i - 1] if i else 0.0) for i in range(len(cum_masses))]
+
+    @property
+    def index(self):
+        # The name index is per unit rather than per leaf, so it is small; build it on first use.
+        if self._index is None:
+            index = []
+            for level in CONSTRAINT_LEVELS:
+                names = self._pack.strings(f'index.{level}.names')
+                ranges = self._pack.array(f'index.{level}.ranges')
+                units = self._pack.array('index.province.units') if level == 'province' else None
+                level_index = {}
+                for i in range(len(names)):
+                    name = names[i]
+                    unit = self.provinces.unit(units[i]) if units is not None else {'name': name}
+                    level_index.setdefault(normalize_place_name(name), []).append(LocationNode(unit, ranges[2 * i], ranges[2 * i + 1]))
+                index.append(level_index)
+            self._index = index
+        return self._index
+
+class RegionPack:
+    """A region pack mapped read-only into memory. Pickles as its path, so it is cheap to send to workers."""
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = view = memoryview(self._mmap)
+        try:
+            magic, version, byte_order, count = _HEADER.unpack_from(view, 0)
+        except struct.error:
+            raise ValueError(f"{self.path} is not a region pack")
+        if magic != PACK_MAGIC:
+            raise ValueError(f"{self.path} is not a region pack")
+        if version != PACK_VERSION:
+            raise ValueError(f"{self.path} is a version {version} region pack; expected version {PACK_VERSION}")
+        if byte_order != _BYTE_ORDERS[sys.byteorder]:
+            raise ValueError(f"{self.path} was written on a machine with a different byte order")
+
+        self._sections = {}
+        for i in range(count):
+            name, typecode, offset, item_count = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+            typecode = typecode.decode('ascii')
+            size = item_count * array.array(typecode).itemsize
+            self._sections[name.rstrip(b'\0').decode('utf-8')] = view[offset:offset + size].cast(typecode)
+
+        self.name_tables = {
+            key: NameSampler(self.strings(f'names.{key}'), self.array(f'names.{key}.cum'))
+            if f'names.{key}.cum' in self._sections else None
+            for key in NAME_TABLE_KEYS
+        }
+        self._location_sampler = None
+
+    def close(self):
+        """Unmaps the pack; samplers taken from it stop working."""
+        for section in self._sections.values():
+            section.release()
+        self._view.release()
+        self._mmap.close()
+
+    def __reduce__(self):
+        return (open_region_pack, (self.path,))
+
+    def array(self, name):
+        return self._sections[name]
+
+    def strings(self, name):
+        return StringTable(self._sections[f'{name}.offsets'], self._sections[f'{name}.blob'])
+
+    @property
+    def location_sampler(self):
+        if self._location_sampler is None:
+            self._location_sampler = PackedLocationSampler(self)
+        return self._location_sampler
+
+# path -> RegionPack, so every user in a process shares one mapping
+_open_packs = {}
+
+def open_region_pack(path):
+    """Returns the RegionPack at `path`, mapping it on first use in this process."""
+    path = os.path.abspath(path)
+    pack = _open_packs.get(path)
+    if pack is None:
+        pack = _open_packs[path] = RegionPack(path)
+    return pack
+
+def packed_region_data(region_data, pack):
+    """Returns a copy of region_data with the packed tables replaced by the pack."""
+    light = {key: value for key, value in region_data.items() if key not in PACKED_KEYS}
+    light['region_pack'] = pack
+    return light
@@ -0,0 +1,43 @@
+import random as _random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# The generators draw their random numbers through this module rather than calling the
+# random module directly. Normally the draws come from the random module's shared generator;
+# inside use(generator) the current thread (or asyncio task) draws from `generator` instead.
+# Seeded profiles are generated that way (see random_access.py), so they depend only on their
+# own seed even while other threads generate profiles, and they leave the shared generator
+# as they found it.
+
+_current = ContextVar('profile_rng', default=_random)
+
+@contextmanager
+def use(generator):
+    """Makes the current thread or task draw from `generator` (a random.Random) until the block ends."""
+    token = _current.set(generator)
+    try:
+        yield generator
+    finally:
+        _current.reset(token)
+
+def current():
+    """Returns the generator the current thread or task draws from."""
+    return _current.get()
+
+def random():
+    return _current.get().random()
+
+def randint(a, b):
+    return _current.get().randint(a, b)
+
+def randrange(*args):
+    return _current.get().randrange(*args)
+
+def choice(seq):
+    return _current.get().choice(seq)
+
+def choices(population, weights=None, *, cum_weights=None, k=1):
+    return _current.get().choices(population, weights, cum_weights=cum_weights, k=k)
+
+def sample(population, k):
+    return _current.get().sample(population, k)
@@ -0,0 +1,60 @@
+from .rule_engine import get_rule_set
+
+# Batch counterpart of check_profile/check_profile_logic. The compiled consistency rules are
+# evaluated column-wise: profiles are turned into columns once and each rule is mapped over
+# just the columns it reads, recording violations in one bytearray per rule.
+
+BATCH_RULE_GROUPS = ('profile', 'logic')
+
+class BatchValidationResult:
+    """
+    Per-rule violation flags for a batch. `errors[rule]` is a bytearray with one byte per
+    profile (1 = violated), so the whole matrix costs one byte per rule per profile.
+    """
+    def __init__(self, num_profiles, errors, descriptions=None):
+        self.num_profiles = num_profiles
+        self.errors = errors
+        self.descriptions = descriptions or {}
+
+    @property
+    def rule_names(self):
+        return list(self.errors)
+
+    def summary(self):
+        """Returns {rule: number of profiles violating it}."""
+        return {rule: flags.count(1) for rule, flags in self.errors.items()}
+
+    def invalid_mask(self):
+        """Returns a bytearray flagging every profile that violates at least one rule."""
+        # OR the columns together as big integers; each byte stays 0 or 1.
+        mask = 0
+        for flags in self.errors.values():
+            mask |= int.from_bytes(flags, 'little')
+        return bytearray(mask.to_bytes(self.num_profiles, 'little'))
+
+    def num_valid(self):
+        return self.num_profiles - self.invalid_mask().count(1)
+
+    def failing_indices(self):
+        return [i for i, flag in enumerate(self.invalid_mask()) if flag]
+
+    def failing_rules(self, index):
+        return [rule for rule, flags in self.errors.items() if flags[index]]
+
+def to_columns(profiles, region_data=None, groups=BATCH_RULE_GROUPS):
+    """Converts a list of profile dicts into {field: list of values} for the fields the rules read."""
+    rule_set = get_rule_set(region_data)
+    fields = {f for rule in rule_set.select(groups) for f in rule.reads}
+    return rule_set.to_columns(profiles, fields)
+
+def validate_batch(batch, region_data, reference_date=None, groups=BATCH_RULE_GROUPS):
+    """
+    Validates a batch of profiles, given either as a list of dicts or as columns
+    ({field: list}) like those produced by to_columns. Only errors are flagged.
+    Returns a BatchValidationResult.
+    """
+    rule_set = get_rule_set(region_data, reference_date)
+    n = len(next(iter(batch.values()), [])) if isinstance(batch, dict) else len(batch)
+    errors = rule_set.evaluate_batch(batch, groups=groups)
+    descriptions = {rule_id: rule_set.rules_by_id[rule_id].description for rule_id in errors}
+    return BatchValidationResult(n, errors, descriptions)
@@ -0,0 +1,528 @@
+import json
+import operator
+import os
+import re
+import string
+from collections import OrderedDict, namedtuple
+from datetime import date
+from functools import lru_cache
+
+# Declarative consistency rules. Rules are JSON (data/consistency_rules.json by default, or the
+# file named by a region's consistency_rules_file) and are compiled once per region. Each rule
+# becomes one flat Python expression over the fields it reads, which is turned into two
+# functions: a predicate over a single row tuple and a batch function over whole columns.
+#
+# Expressions:
+#   literal / list              constant
+#   {"field": "age"}            profile value (keys are matched case-insensitively, see "aliases")
+#   {"param": "a.b", "default"} rules-file param or dotted region_data path, resolved at compile time
+#   {"lt"|"le"|"gt"|"ge"|"eq"|"ne": [a, b]}
+#   {"and"|"or": [...]}, {"not": x}
+#   {"in": [x, list]}, {"contains": [container, x]}, {"overlaps": [a, b]}, {"between": [x, [lo, hi]]}
+#   {"present"|"missing"|"nonempty"|"is_int"|"valid_date": x}
+#   {"lower": x}, {"abs_diff": [a, b]}, {"age_from_dob": x}, {"matches": [x, "regex"]}
+#   {"lookup": {"table": name, "of": x, "key": k, "value": v}}
+# Comparisons involving a missing (None) or incomparable value are false.
+
+DEFAULT_RULES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))), 'data', 'consistency_rules.json'
+)
+
+SEVERITIES = ('error', 'warning', 'info')
+DEFAULT_SELECTIVITY = 0.1 # Assumed fraction of profiles violating a rule that does not say
+MAX_CACHED_RULE_SETS = 8
+MAX_CACHED_PLANS = 256 # (profile key layout, groups) combinations remembered per RuleSet
+
+Violation = namedtuple('Violation', ['rule_id', 'severity', 'message'])
+
+# A compiled expression: Python source, static cost estimate, and the value if it is a constant.
+_Expr = namedtuple('_Expr', ['code', 'cost', 'is_const', 'value'])
+
+_COMPARISONS = {'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>=', 'eq': '==', 'ne': '!='}
+_OPERATORS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge, '==': operator.eq, '!=': operator.ne}
+_NODE_COSTS = {
+    'compare': 1, 'in': 1, 'contains': 2, 'overlaps': 4, 'between': 3, 'test': 1, 'nonempty': 2,
+    'lower': 3, 'abs_diff': 3, 'lookup': 2, 'matches': 8, 'valid_date': 6, 'age_from_dob': 10,
+}
+
+@lru_cache(maxsize=65536)
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+# Helpers for the generated code; anything that may raise on odd input goes through one of these.
+def _compare(op, x, y):
+    if x is None or y is None:
+        return False
+    try:
+        return op(x, y)
+    except TypeError:
+        return False
+
+def _overlaps(x, y):
+    if not isinstance(x, (list, tuple, set, frozenset)) or not isinstance(y, (list, tuple, set, frozenset)):
+        return False
+    try:
+        return not set(x).isdisjoint(y)
+    except TypeError:
+        return False
+
+def _between(v, bounds):
+    if v is None or not isinstance(bounds, (list, tuple)) or len(bounds) != 2:
+        return False
+    try:
+        return bounds[0] <= v <= bounds[1]
+    except TypeError:
+        return False
+
+def _nonempty(v):
+    return v is not None and (len(v) > 0 if hasattr(v, '__len__') else True)
+
+def _lower(v):
+    return v.lower() if isinstance(v, str) else None
+
+def _abs_diff(x, y):
+    if x is None or y is None:
+        return None
+    try:
+        return abs(x - y)
+    except TypeError:
+        return None
+
+_HELPERS = {
+    '_compare': _compare, '_overlaps': _overlaps, '_between': _between, '_nonempty': _nonempty,
+    '_lower': _lower, '_abs_diff': _abs_diff, '_parse_date': _parse_date,
+    '_num': (int, float), '_scalar': (str, int, float), '_containers': (list, tuple, set, frozenset, str),
+}
+
+class _RuleCompiler:
+    """Compiles the expressions of one rule to Python source, giving each field it reads a slot."""
+    def __init__(self, rule_set, region_data):
+        self.rule_set = rule_set
+        self.region_data = region_data or {}
+        self.slots = {}
+        self.namespace = dict(_HELPERS)
+        self._temp_count = 0
+
+    def field_slot(self, name):
+        name = name.lower()
+        if name not in self.slots:
+            self.slots[name] = len(self.slots)
+        return self.slots[name]
+
+    def _bind(self, value):
+        """Makes `value` available to the generated code and returns its name."""
+        name = f"_k{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+    def _once(self, expr):
+        """Returns (first_use, later_use) code so a computed operand is evaluated only once."""
+        if expr.code.isidentifier():
+            return expr.code, expr.code
+        self._temp_count += 1
+        temp = f"_t{self._temp_count}"
+        return f"({temp} := {expr.code})", temp
+
+    def const(self, value):
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return _Expr(repr(value), 0, True, value)
+        return _Expr(self._bind(value), 0, True, value)
+
+    def compile(self, expr):
+        if not isinstance(expr, dict):
+            if isinstance(expr, list):
+                return self.const(frozenset(expr) if all(isinstance(v, str) for v in expr) else tuple(expr))
+            return self.const(expr)
+        op = 'param' if 'param' in expr else next(iter(expr), None)
+        if op != 'param' and len(expr) != 1:
+            raise ValueError(f"Expression must have exactly one operator: {expr!r}")
+        arg = expr[op]
+        if op in _COMPARISONS:
+            return self._compare(_COMPARISONS[op], *self._args(arg, 2))
+        builder = getattr(self, f"_op_{op}", None)
+        if builder is None:
+            raise ValueError(f"Unknown rule operator '{op}'.")
+        return builder(arg, expr)
+
+    def _args(self, arg, count):
+        if not isinstance(arg, list) or len(arg) != count:
+            raise ValueError(f"Expected {count} arguments, got {arg!r}")
+        return [self.compile(a) for a in arg]
+
+    def _unary(self, arg, template, cost_key):
+        x = self.compile(arg)
+        first, later = self._once(x)
+        return _Expr(template.format(first=first, later=later), x.cost + _NODE_COSTS[cost_key], False, None)
+
+    # --- Leaves ---
+    def _op_field(self, name, expr):
+        return _Expr(f"f{self.field_slot(name)}", 0, False, None)
+
+    def _op_param(self, path, expr):
+        return self.const(self.rule_set.resolve_param(path, self.region_data, expr.get('default')))
+
+    # --- Comparisons (numeric and string constants are inlined with a type guard) ---
+    def _compare(self, symbol, a, b):
+        cost = a.cost + b.cost + _NODE_COSTS['compare']
+        if a.is_const and b.is_const:
+            return self.const(a.value is not None and b.value is not None and _OPERATORS[symbol](a.value, b.value))
+        if b.is_const and b.value is None:
+            return self.const(False)
+        if b.is_const and isinstance(b.value, (int, float)) and not isinstance(b.value, bool):
+            first, later = self._once(a)
+            return _Expr(f"(isinstance({first}, _num) and {later} {symbol} {b.code})", cost, False, None)
+        if b.is_const and symbol == '==':
+            return _Expr(f"({a.code} == {b.code})", cost, False, None)
+        if b.is_const and symbol == '!=':
+            first, later = self._once(a)
+            return _Expr(f"({first} is not None and {later} != {b.code})", cost, False, None)
+        op = self._bind(_OPERATORS[symbol])
+        return _Expr(f"_compare({op}, {a.code}, {b.code})", cost + 2, False, None)
+
+    # --- Boolean logic (operands run in the order written so type guards stay in front) ---
+    def _op_and(self, arg, expr):
+        parts = [self.compile(a) for a in arg]
+        return _Expr("(" + " and ".join(p.code for p in parts) + ")", sum(p.cost for p in parts), False, None)
+
+    def _op_or(self, arg, expr):
+        parts = [self.compile(a) for a in arg]
+        return _Expr("(" + " or ".join(p.code for p in parts) + ")", sum(p.cost for p in parts), False, None)
+
+    def _op_not(self, arg, expr):
+        x = self.compile(arg)
+        return _Expr(f"(not {x.code})", x.cost, False, None)
+
+    # --- Membership ---
+    def _op_in(self, arg, expr):
+        x, container = self._args(arg, 2)
+        if not container.is_const:
+            raise ValueError("'in' needs a constant list as its second argument.")
+        first, later = self._once(x)
+        return _Expr(f"(isinstance({first}, _scalar) and {later} in {container.code})",
+                     x.cost + _NODE_COSTS['in'], False, None)
+
+    def _op_contains(self, arg, expr):
+        container, x = self._args(arg, 2)
+        if not (x.is_const and isinstance(x.value, str)):
+            raise ValueError("'contains' needs a constant string as its second argument.")
+        first, later = self._once(container)
+        return _Expr(f"(isinstance({first}, _containers) and {x.code} in {later})",
+                     container.cost + _NODE_COSTS['contains'], False, None)
+
+    def _op_overlaps(self, arg, expr):
+        a, b = self._args(arg, 2)
+        return _Expr(f"_overlaps({a.code}, {b.code})", a.cost + b.cost + _NODE_COSTS['overlaps'], False, None)
+
+    def _op_between(self, arg, expr):
+        x, bounds = self._args(arg, 2)
+        return _Expr(f"_between({x.code}, {bounds.code})", x.cost + bounds.cost + _NODE_COSTS['between'], False, None)
+
+    # --- Tests ---
+    def _op_present(self, arg, expr):
+        return self._unary(arg, "({first} is not None)", 'test')
+
+    def _op_missing(self, arg, expr):
+        return self._unary(arg, "({first} is None)", 'test')
+
+    def _op_nonempty(self, arg, expr):
+        return self._unary(arg, "_nonempty({first})", 'nonempty')
+
+    def _op_is_int(self, arg, expr):
+        return self._unary(arg, "(isinstance({first}, int) and not isinstance({later}, bool))", 'test')
+
+    def _op_valid_date(self, arg, expr):
+        return self._unary(arg, "(isinstance({first}, str) and _parse_date({later}) is not None)", 'valid_date')
+
+    def _op_matches(self, arg, expr):
+        if not isinstance(arg, list) or len(arg) != 2 or not isinstance(arg[1], str):
+            raise ValueError(f"'matches' expects [expression, pattern], got {arg!r}")
+        match = self._bind(re.compile(arg[1]).match)
+        return self._unary(arg[0], "(isinstance({first}, str) and " + match + "({later}) is not None)", 'matches')
+
+    # --- Transforms ---
+    def _op_lower(self, arg, expr):
+        return self._unary(arg, "_lower({first})", 'lower')
+
+    def _op_abs_diff(self, arg, expr):
+        a, b = self._args(arg, 2)
+        return _Expr(f"_abs_diff({a.code}, {b.code})", a.cost + b.cost + _NODE_COSTS['abs_diff'], False, None)
+
+    def _op_age_from_dob(self, arg, expr):
+        today = self.rule_set.reference_date
+        def age_from_dob(value):
+            d = _parse_date(value) if isinstance(value, str) else None
+            if d is None:
+                return None
+            return today.year - d.year - ((today.month, today.day) < (d.month, d.day))
+        return self._unary(arg, self._bind(age_from_dob) + "({first})", 'age_from_dob')
+
+    def _op_lookup(self, spec, expr):
+        if not isinstance(spec, dict) or 'table' not in spec or 'of' not in spec:
+            raise ValueError(f"'lookup' expects {{'table': ..., 'of': ...}}, got {spec!r}")
+        table = self._bind(self.rule_set.build_table(spec, self.region_data))
+        return self._unary(spec['of'], "(" + table + ".get({later}) if isinstance({first}, _scalar) else None)", 'lookup')
+
+    def build(self, name, params, body):
+        """Compiles `def name(params): body` in the rule's namespace and returns the function."""
+        source = f"def {name}({params}):\n    {body}\n"
+        exec(compile(source, f"<consistency rule {name}>", 'exec'), self.namespace)
+        return self.namespace[name]
+
+class CompiledRule:
+    """
+    A compiled rule. `predicate(row)` and `downgrade(row)` take a tuple of the values of
+    `reads`, in order; batch_function() returns the column-wise equivalent.
+    """
+    __slots__ = ('id', 'groups', 'severity', 'description', 'message', 'reads', 'cost',
+                 'selectivity', 'rank', 'predicate', 'downgrade', '_compiler', '_when', '_unless', '_batch_functions')
+
+    def __init__(self, rule, rule_set, region_data):
+        self.id = rule['id']
+        self.groups = frozenset(rule.get('groups', ()))
+        self.severity = rule.get('severity', 'error')
+        if self.severity not in SEVERITIES:
+            raise ValueError(f"unknown severity '{self.severity}'.")
+        self.description = rule.get('description', self.id)
+        self.message = rule.get('message', self.description)
+
+        compiler = _RuleCompiler(rule_set, region_data)
+        # `requires` guards go first, so a rule whose inputs are absent costs a None check.
+        required = [f"f{compiler.field_slot(name)} is not None" for name in rule.get('requires', ())]
+        when = compiler.compile(rule['when'])
+        self._when = "(" + " and ".join(required + [when.code]) + ")"
+        self._unless = compiler.compile(rule['downgrade_when']).code if 'downgrade_when' in rule else None
+        for _, name, _, _ in string.Formatter().parse(self.message):
+            if name:
+                compiler.field_slot(name)
+        self.reads = tuple(compiler.slots)
+        self._compiler = compiler
+        self._batch_functions = {}
+
+        unpack = f"{self._row_names()} = row; " if self.reads else ""
+        self.predicate = compiler.build('predicate', 'row', f"{unpack}return bool{self._when}")
+        self.downgrade = None
+        if self._unless is not None:
+            self.downgrade = compiler.build('downgrade', 'row', f"{unpack}return bool({self._unless})")
+
+        self.cost = rule.get('cost', len(required) + when.cost + 1)
+        self.selectivity = rule.get('selectivity', DEFAULT_SELECTIVITY)
+        # Running rules in ascending cost/selectivity order minimises the expected cost of
+        # finding the first violation when rules are treated as independent.
+        self.rank = self.cost / max(self.selectivity, 1e-9)
+
+    def _row_names(self):
+        return ", ".join(f"f{i}" for i in range(len(self.reads))) + ("," if len(self.reads) == 1 else "")
+
+    def effective_severity(self, downgraded):
+        return 'warning' if downgraded and self.severity == 'error' else self.severity
+
+    def evaluate(self, row):
+        """Returns the severity the row violates this rule with, or None."""
+        if not self.predicate(row):
+            return None
+        return self.effective_severity(self.downgrade is not None and self.downgrade(row))
+
+    def format_message(self, row):
+        return self.message.format_map(dict(zip(self.reads, row)))
+
+    def batch_function(self, severities):
+        """
+        Returns fn(*columns) -> bytearray flagging rows that violate the rule at one of
+        `severities`, or None if it never can.
+        """
+        key = frozenset(severities)
+        if key not in self._batch_functions:
+            downgraded_severity = self.effective_severity(True)
+            keep_plain = self.severity in key
+            keep_downgraded = downgraded_severity in key if self._unless is not None else keep_plain
+            if keep_plain and keep_downgraded:
+                test = self._when
+            elif keep_plain:
+                test = f"({self._when} and not ({self._unless}))"
+            elif keep_downgraded:
+                test = f"({self._when} and ({self._unless}))"
+            else:
+                test = None
+            if test is None:
+                fn = None
+            elif self.reads:
+                columns = ", ".join(f"c{i}" for i in range(len(self.reads)))
+                target, source = (self._row_names(), f"zip({columns})") if len(self.reads) > 1 else ("f0", "c0")
+                fn = self._compiler.build('batch', columns, f"return bytearray([bool{test} for {target} in {source}])")
+            else:
+                fn = self._compiler.build('batch', '*columns', f"return bytearray([bool{test}])")
+            self._batch_functions[key] = fn
+        return self._batch_functions[key]
+
+class RuleSet:
+    """The rules of one rules file compiled against one region's data."""
+    def __init__(self, rules_data, region_data=None, reference_date=None):
+        self.params = rules_data.get('params', {})
+        self.tables = rules_data.get('tables', {})
+        self.reference_date = reference_date or date.today()
+        self.aliases = {k.lower(): tuple(a.lower() for a in v) for k, v in rules_data.get('aliases', {}).items()}
+        self.rules = []
+        for rule in rules_data.get('rules', []):
+            try:
+                self.rules.append(CompiledRule(rule, self, region_data))
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"Invalid consistency rule {rule.get('id', rule)!r}: {e}") from e
+        self.rules.sort(key=lambda r: r.rank)
+        self.rules_by_id = {r.id: r for r in self.rules}
+        self._group_cache = {}
+        self._plan_cache = {}
+
+    def resolve_param(self, path, region_data, default=None):
+        if path in self.params:
+            return self.params[path]
+        value = region_data
+        for part in path.split('.'):
+            if not isinstance(value, dict) or part not in value:
+                return default
+            value = value[part]
+        return value
+
+    def build_table(self, spec, region_data):
+        """Builds the dict behind a lookup from the rules file tables or a list in region_data."""
+        name = spec['table']
+        if name in self.tables:
+            return {k: tuple(v) if isinstance(v, list) else v for k, v in self.tables[name].items()}
+        records = region_data.get(name) if region_data else None
+        if isinstance(records, dict):
+            records = records.get(name, [])
+        key, value = spec.get('key', 'name'), spec.get('value')
+        table = {}
+        for record in records or []:
+            if not isinstance(record, dict) or key not in record:
+                continue
+            if isinstance(value, list):
+                table[record[key]] = tuple(record.get(v) for v in value)
+            else:
+                table[record[key]] = record.get(value) if value else record
+        return table
+
+    def select(self, groups=None, only=None):
+        """
+        Returns the rules belonging to any of `groups` (all rules if None), cheapest-first.
+        `only` optionally restricts the result to a set of rule ids.
+        """
+        key = (frozenset(groups) if groups is not None else None, only)
+        if key not in self._group_cache:
+            wanted = key[0]
+            self._group_cache[key] = tuple(r for r in self.rules
+                                           if (wanted is None or r.groups & wanted) and (only is None or r.id in only))
+        return self._group_cache[key]
+
+    def _plan(self, profile, groups, only=None):
+        """
+        Returns ((rule, profile keys it reads), ...) for `groups`, with each field resolved to
+        the profile's actual key (None if absent). Profiles from one generator run share a key
+        layout, so plans are cached per layout.
+        """
+        cache_key = (tuple(profile), groups, only)
+        plan = self._plan_cache.get(cache_key)
+        if plan is None:
+            actual = {}
+            for key in cache_key[0]:
+                actual.setdefault(key.lower(), key)
+            def resolve(field):
+                for name in (field,) + self.aliases.get(field, ()):
+                    if name in actual:
+                        return actual[name]
+                return None
+            plan = tuple((rule, tuple(map(resolve, rule.reads))) for rule in self.select(groups, only))
+            if len(self._plan_cache) >= MAX_CACHED_PLANS:
+                self._plan_cache.clear()
+            self._plan_cache[cache_key] = plan
+        return plan
+
+    def evaluate(self, profile, groups=None, first_error=False, only=None):
+        """
+        Returns the list of Violations of `profile`. With first_error=True, stops at (and only
+        returns) the first error, which is what accept/reject decisions need.
+        `groups` should be a tuple (or None) and `only` a frozenset of rule ids (or None) so
+        they can key the plan cache.
+        """
+        get = profile.get
+        violations = []
+        for rule, keys in self._plan(profile, groups, only):
+            row = tuple(map(get, keys))
+            if not rule.predicate(row):
+                continue
+            severity = rule.effective_severity(rule.downgrade is not None and rule.downgrade(row))
+            if first_error:
+                if severity == 'error':
+                    return [Violation(rule.id, severity, rule.format_message(row))]
+                continue
+            violations.append(Violation(rule.id, severity, rule.format_message(row)))
+        return violations
+
+    def to_columns(self, profiles, fields):
+        """Extracts {field: list of values} for `fields` from a list of profile dicts."""
+        keys = set().union(*profiles) if profiles else set()
+        columns = {}
+        for field in fields:
+            names = (field,) + self.aliases.get(field, ())
+            candidates = [k for name in names for k in keys if k.lower() == name]
+            if not candidates:
+                columns[field] = [None] * len(profiles)
+            elif len(candidates) == 1:
+                key = candidates[0]
+                columns[field] = [p.get(key) for p in profiles]
+            else:
+                columns[field] = [next((p[k] for k in candidates if p.get(k) is not None), None) for p in profiles]
+        return columns
+
+    def evaluate_batch(self, batch, groups=None, severities=('error',)):
+        """
+        Evaluates a batch given as a list of profiles or as {field: list} columns.
+        Returns {rule_id: bytearray} flagging profiles that violate each rule at one of `severities`.
+        """
+        rules = self.select(groups)
+        if isinstance(batch, dict):
+            columns, n = batch, len(next(iter(batch.values()), []))
+        else:
+            fields = {f for rule in rules for f in rule.reads}
+            columns, n = self.to_columns(batch, fields), len(batch)
+        empty = [None] * n
+        flags = {}
+        for rule in rules:
+            fn = rule.batch_function(severities)
+            if fn is not None:
+                flags[rule.id] = fn(*[columns.get(f) or empty for f in rule.reads])
+        return flags
+
+_default_rules_data = None
+_rule_set_cache = OrderedDict() # (id(region_data), date) -> (region_data, RuleSet)
+
+def load_rules_data(path=DEFAULT_RULES_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def get_rule_set(region_data=None, reference_date=None):
+    """
+    Returns the RuleSet for `region_data`, compiling it on first use. The region's own rules
+    (region_data['consistency_rules']) are used when present, otherwise the default rules file.
+    """
+    global _default_rules_data
+    today = reference_date or date.today()
+    key = (id(region_data), today)
+    cached = _rule_set_cache.get(key)
+    if cached is not None and cached[0] is region_data:
+        _rule_set_cache.move_to_end(key)
+        return cached[1]
+
+    rules_data = (region_data or {}).get('consistency_rules')
+    if rules_data is None:
+        if _default_rules_data is None:
+            _default_rules_data = load_rules_data()
+        rules_data = _default_rules_data
+    rule_set = RuleSet(rules_data, region_data, today)
+    # Holding region_data in the entry keeps its id from being reused while cached.
+    _rule_set_cache[key] = (region_data, rule_set)
+    if len(_rule_set_cache) > MAX_CACHED_RULE_SETS:
+        _rule_set_cache.popitem(last=False)
+    return rule_set
@@ -0,0 +1,236 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.data_loader import load_all_regions, load_regions_config
+from utils.json_backend import JSONDecodeError, dumps_bytes, loads
+from utils.constraints import constraints_from_dict
+from profile_generator import generate_fake_personal_info, generate_profiles_slice
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+PROFILES_PER_CHUNK = 64 # Profiles buffered into each chunk of the NDJSON stream
+MAX_REQUEST_BODY_BYTES = 1024 * 1024
+MAX_PROFILES_PER_REQUEST = 100000 # Larger runs belong in --shard-rows jobs, not one open stream
+
+def _no_debug(*args, **kwargs):
+    pass
+
+class GenerationService:
+    """
+    Keeps every region loaded in memory and generates profiles on demand. Requests with a
+    seed are served from `cache` (a utils.profile_cache.ProfileCache) when one is given.
+    """
+    def __init__(self, data_dir, debug_print_func=_no_debug, cache=None, max_profiles=MAX_PROFILES_PER_REQUEST):
+        self.data_dir = data_dir
+        self.debug_print_func = debug_print_func
+        self.cache = cache
+        self.max_profiles = max_profiles
+        self.regions, self.region_aliases = load_regions_config(data_dir)
+        self.region_data = load_all_regions(data_dir, self.regions)
+        self.started_at = time.time()
+        self._metrics_lock = threading.Lock()
+        self.metrics = {
+            'requests_total': 0,
+            'request_errors_total': 0,
+            'profiles_generated_total': 0,
+            'generation_seconds_total': 0.0,
+            'active_streams': 0,
+            'cache_hits_total': 0,
+            'cache_misses_total': 0,
+        }
+
+    def count(self, name, amount=1):
+        with self._metrics_lock:
+            self.metrics[name] += amount
+
+    def build_request(self, payload):
+        """Returns (constraints, seed, start_index) for a /generate request body. Raises ValueError if it is invalid."""
+        region = payload.get('region') if isinstance(payload, dict) else None
+        if isinstance(region, str) and region.lower() in self.region_aliases:
+            payload = dict(payload, region=self.region_aliases[region.lower()])
+        constraints = constraints_from_dict(payload, self.regions)
+        if constraints['num_profiles'] > self.max_profiles:
+            raise ValueError(f"num_profiles must be at most {self.max_profiles}.")
+        seed = constraints.pop('seed', None)
+        start_index = constraints.pop('start_index', 0)
+        if (seed is not None and not isinstance(seed, int)) or not isinstance(start_index, int) or start_index < 0:
+            raise ValueError("seed and start_index must be integers (start_index not negative).")
+        if seed is None and start_index:
+            raise ValueError("start_index needs a seed.")
+        return constraints, seed, start_index
+
+    def generate(self, constraints, seed=None, start_index=0):
+        """Yields profiles one at a time for the given (complete) constraint dict, as a slice of `seed` if given."""
+        region_data = self.region_data[constraints['region']]
+        if seed is not None:
+            yield from generate_profiles_slice(region_data, constraints, seed, start_index, constraints['num_profiles'], self.debug_print_func)
+            return
+        for _ in range(constraints['num_profiles']):
+            yield generate_fake_personal_info(region_data, constraints, self.debug_print_func, False)
+
+    def generate_ndjson(self, constraints, seed=None, start_index=0):
+        """
+        Yields the response body as chunks of NDJSON. A seeded request that is in the cache
+        is streamed straight from the cached file; otherwise it is cached as it is generated.
+        """
+        if seed is not None and self.cache is not None:
+            key = self.cache.key(self.region_data[constraints['region']], constraints, seed, start_index)
+            f = self.cache.open(key)
+            if f is not None:
+                self.count('cache_hits_total')
+                yield from self.cache.read_chunks(f)
+                return
+            self.count('cache_misses_total')
+            profiles = self.cache.store(key, self.generate(constraints, seed, start_index))
+        else:
+            profiles = self.generate(constraints, seed, start_index)
+        buffer = []
+        for profile in profiles:
+            buffer.append(dumps_bytes(profile))
+            if len(buffer) >= PROFILES_PER_CHUNK:
+                yield b"\n".join(buffer) + b"\n"
+                buffer = []
+        if buffer:
+            yield b"\n".join(buffer) + b"\n"
+
+    def health(self):
+        return {
+            'status': 'ok',
+            'regions': sorted(self.region_data.keys()),
+            'uptime_seconds': round(time.time() - self.started_at, 3),
+        }
+
+    def render_metrics(self):
+        """Returns the metrics in the Prometheus text exposition format."""
+        with self._metrics_lock:
+            snapshot = dict(self.metrics)
+        snapshot['uptime_seconds'] = time.time() - self.started_at
+        lines = []
+        for name, value in snapshot.items():
+            lines.append(f"faker_maker_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+class GeneratorRequestHandler(BaseHTTPRequestHandler):
+    """Routes: GET /health, GET /metrics, POST /generate (NDJSON stream)."""
+    protocol_version = "HTTP/1.1" # Required for chunked transfer encoding
+    server_version = "FakerMaker/1.0"
+
+    @property
+    def service(self) -> GenerationService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        self.service.debug_print_func("server:", format % args)
+
+    def _send_body(self, status, body: bytes, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        self._send_body(status, dumps_bytes(payload), "application/json")
+
+    def _send_error(self, status, message):
+        self.service.count('request_errors_total')
+        self._send_json(status, {'error': message})
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+
+    def do_GET(self):
+        self.service.count('requests_total')
+        path = self.path.split('?', 1)[0]
+        if path == '/health':
+            self._send_json(200, self.service.health())
+        elif path == '/metrics':
+            self._send_body(200, self.service.render_metrics().encode('utf-8'), "text/plain; version=0.0.4")
+        else:
+            self._send_error(404, f"Unknown path: {path}")
+
+    def do_POST(self):
+        self.service.count('requests_total')
+        path = self.path.split('?', 1)[0]
+        if path != '/generate':
+            self._send_error(404, f"Unknown path: {path}")
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_REQUEST_BODY_BYTES:
+            self.close_connection = True
+            self._send_error(400, "Invalid or too large Content-Length.")
+            return
+
+        try:
+            payload = loads(self.rfile.read(length) or b"{}")
+            constraints, seed, start_index = self.service.build_request(payload)
+        except JSONDecodeError as e:
+            self._send_error(400, f"Invalid JSON: {e}")
+            return
+        except ValueError as e:
+            self._send_error(400, str(e))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        self.service.count('active_streams')
+        start_time = time.perf_counter()
+        produced = 0
+        body = self.service.generate_ndjson(constraints, seed, start_index)
+        try:
+            for data in body:
+                self._write_chunk(data)
+                produced += data.count(b"\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away mid-stream; nothing more can be sent on this connection.
+            self.close_connection = True
+            self.service.count('request_errors_total')
+        except Exception as e:
+            # The 200 status is already sent, so end the stream with an error line clients can
+            # tell apart from a profile, then close the chunked body properly.
+            self.service.count('request_errors_total')
+            self.service.debug_print_func(f"server: generation failed after {produced} profiles: {e!r}")
+            try:
+                self._write_chunk(dumps_bytes({'error': f"Generation failed: {e}"}) + b"\n")
+                self.wfile.write(b"0\r\n\r\n")
+            except OSError:
+                self.close_connection = True
+        finally:
+            body.close() # A stream cut short is not cached
+            self.service.count('active_streams', -1)
+            self.service.count('profiles_generated_total', produced)
+            self.service.count('generation_seconds_total', time.perf_counter() - start_time)
+
+class GenerationServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, server_address, service: GenerationService):
+        super().__init__(server_address, GeneratorRequestHandler)
+        self.service = service
+
+def run_server(host=DEFAULT_HOST, port=DEFAULT_PORT, data_dir=None, debug_print_func=_no_debug, cache=None):
+    """Loads all regions once and serves generation requests until interrupted."""
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+    service = GenerationService(data_dir, debug_print_func, cache)
+    httpd = GenerationServer((host, port), service)
+    print(f"Serving on http://{host}:{httpd.server_address[1]} (regions: {', '.join(service.region_data)})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+if __name__ == "__main__":
+    run_server()
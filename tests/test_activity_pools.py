@@ -0,0 +1,110 @@
+import random
+from collections import Counter
+
+import pytest
+
+from profile_generator import rng, run_pipeline
+from profile_generator.demographics.activity_pools import get_hobby_pools, get_skill_pools, weighted_sample
+from profile_generator.demographics.hobbies import generate_hobbies_interests, generate_hobbies_interests_batch
+from profile_generator.demographics.skills_interests import generate_skills_interests, generate_skills_interests_batch
+from profile_generator.unconventional.unconventional_data import NUMERICAL_HIDDEN_ATTRIBUTES
+
+# One age from every hobby and skill bracket in data/*_rules.json, plus the edges
+BRACKET_AGES = (0, 3, 5, 6, 8, 12, 13, 15, 17, 18, 25, 26, 29, 30, 40, 41, 49, 50, 60, 61, 70, 95, 120)
+TRAITS = ('Reserved', 'Energetic', None, 750)
+
+
+def _hidden_attributes(value=700):
+    return {attr: value for attr in NUMERICAL_HIDDEN_ATTRIBUTES}
+
+
+@pytest.mark.parametrize('region', ['US_GENERAL', 'VN_GENERAL', 'UK_GENERAL', 'CN_GENERAL'])
+def test_skills_and_hobbies_for_every_age_bracket(all_region_data, region):
+    region_data = all_region_data[region]
+    hobby_pools = get_hobby_pools(region_data.get('hobbies_rules'))
+    skill_pools = get_skill_pools(region_data.get('skills_interests_rules'))
+    for age in BRACKET_AGES:
+        for trait in TRAITS:
+            hobbies = generate_hobbies_interests(age, region_data, _hidden_attributes(), trait)
+            skills, interests = generate_skills_interests(age, region_data.get('skills_interests_rules'), _hidden_attributes(), trait)
+            hobby_bracket, skill_bracket = hobby_pools.bracket(age), skill_pools.bracket(age)
+            assert set(hobbies) <= set(hobby_bracket.full.names if hobby_bracket else ())
+            assert len(hobbies) == len(set(hobbies))
+            assert set(skills) <= set(skill_bracket.full.names if skill_bracket else ())
+            assert set(interests) <= set(skill_pools.interests)
+
+
+@pytest.mark.parametrize('age', BRACKET_AGES)
+def test_pipeline_generates_skills_and_hobbies_at_every_age(all_region_data, make_constraints, no_debug, age):
+    constraints = make_constraints(age_range=(age, age), hobbies=['x'])
+    profile = run_pipeline(all_region_data['US_GENERAL'], constraints, no_debug)
+    assert profile['age'] == age
+    assert isinstance(profile['skills'], list) and isinstance(profile['hobbies'], list)
+
+
+def test_batch_draws_match_single_profile_draws(all_region_data):
+    region_data = all_region_data['US_GENERAL']
+    rules = region_data.get('skills_interests_rules')
+    ages = list(BRACKET_AGES) * 3
+    hidden = [dict(_hidden_attributes(100 * (i % 10)), personality_trait='Reserved') for i in range(len(ages))]
+
+    with rng.use(random.Random(11)):
+        single_hobbies = [generate_hobbies_interests(age, region_data, h, h['personality_trait']) for age, h in zip(ages, hidden)]
+        single_skills = [generate_skills_interests(age, rules, h, h['personality_trait']) for age, h in zip(ages, hidden)]
+    with rng.use(random.Random(11)):
+        batch_hobbies = generate_hobbies_interests_batch(ages, region_data, hidden)
+        batch_skills = generate_skills_interests_batch(ages, rules, hidden)
+    assert batch_hobbies == single_hobbies
+    assert batch_skills == single_skills
+
+
+def test_numeric_trait_bias_weights_options_in_range(all_region_data):
+    pools = get_skill_pools(all_region_data['US_GENERAL'].get('skills_interests_rules'))
+    pool = pools.bracket(8).full # 'reading' is favoured for traits 500-1000, 'problem-solving' for 0-500
+    weights = dict(zip(pool.names, pool.weights({}, 750)))
+    assert weights['reading'] == 2 and weights['problem-solving'] == 1
+    assert set(pool.weights({}, 'Reserved')) == {1}
+
+
+def test_weighted_sample_never_draws_zero_weights_and_follows_weights():
+    with rng.use(random.Random(3)):
+        counts = Counter(weighted_sample(['a', 'b', 'c'], [3, 1, 0], 1)[0] for _ in range(4000))
+        assert counts['c'] == 0
+        assert 0.7 < counts['a'] / 4000 < 0.8
+        assert sorted(weighted_sample(['a', 'b', 'c'], [1, 1, 1], 5)) == ['a', 'b', 'c']
+        assert weighted_sample(['a', 'b'], [0, 0], 1)[0] in ('a', 'b')
+
+
+def test_first_covering_rule_wins_even_when_empty():
+    rules = {
+        'age_based_skills': [
+            {'age_range': [10, 20], 'skills': []},
+            {'age_range': [0, 30], 'skills': ['counting']},
+        ],
+        'interests': ['music', 'art', 'chess'],
+    }
+    pools = get_skill_pools(rules)
+    assert pools.bracket(5).full.names == ('counting',)
+    assert pools.bracket(10) is None and pools.bracket(20) is None
+    assert pools.bracket(21).full.names == ('counting',)
+    assert pools.bracket(31) is None
+    for age in (10, 15, 20):
+        skills, _ = generate_skills_interests(age, rules, {})
+        assert skills == []
+
+    hobby_rules = {'hobbies_rules': {'age_based_hobbies': [
+        {'age_range': [60, 120], 'hobbies': []},
+        {'age_range': [0, 120], 'hobbies': [{'name': 'walking'}]},
+    ]}}
+    assert generate_hobbies_interests(70, hobby_rules, {}) == []
+    assert generate_hobbies_interests(30, hobby_rules, {}) == ['walking']
+
+
+def test_interest_count_is_uniform_up_to_the_number_of_options():
+    rules = {'age_based_skills': [], 'interests': ['music', 'art', 'chess']}
+    with rng.use(random.Random(5)):
+        counts = Counter(len(generate_skills_interests(30, rules, {})[1]) for _ in range(4000))
+    assert set(counts) == {2, 3}
+    assert 0.45 < counts[2] / 4000 < 0.55
+    with pytest.raises(ValueError):
+        generate_skills_interests(30, {'age_based_skills': [], 'interests': ['music']}, {})
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from profile_generator import async_api
+from profile_generator.async_api import agenerate
+
+
+@pytest.fixture
+def numbered_chunks(monkeypatch):
+    """Makes each chunk return consecutive numbers, with later chunks often finishing first."""
+    state = {'next': 0, 'running': 0, 'max_running': 0}
+    lock = threading.Lock()
+
+    def generate_profile_chunk(region_data, constraints, count):
+        with lock:
+            start, state['next'] = state['next'], state['next'] + count
+            state['running'] += 1
+            state['max_running'] = max(state['max_running'], state['running'])
+        time.sleep(random.uniform(0, 0.01) if start else 0.03)
+        with lock:
+            state['running'] -= 1
+        return list(range(start, start + count))
+
+    monkeypatch.setattr(async_api, 'generate_profile_chunk', generate_profile_chunk)
+    return state
+
+
+async def _collect(generator, limit=None):
+    results = []
+    async for profile in generator:
+        results.append(profile)
+        if limit is not None and len(results) >= limit:
+            break
+    return results
+
+
+@pytest.mark.parametrize('num_profiles, chunk_size, max_pending_chunks', [(257, 10, 4), (5, 100, 2), (0, 10, 2), (30, 1, 1)])
+def test_profiles_come_back_in_order_and_in_full(numbered_chunks, num_profiles, chunk_size, max_pending_chunks):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = asyncio.run(_collect(agenerate({}, {}, num_profiles, chunk_size, max_pending_chunks, executor=executor)))
+    assert results == list(range(num_profiles))
+    assert numbered_chunks['max_running'] <= max_pending_chunks
+
+
+def test_num_profiles_defaults_to_the_constraint(numbered_chunks):
+    assert len(asyncio.run(_collect(agenerate({}, {'num_profiles': 7}, chunk_size=3)))) == 7
+
+
+def test_invalid_window_is_rejected():
+    with pytest.raises(ValueError):
+        asyncio.run(_collect(agenerate({}, {}, 5, chunk_size=0)))
+    with pytest.raises(ValueError):
+        asyncio.run(_collect(agenerate({}, {}, 5, max_pending_chunks=0)))
+
+
+def test_stopping_early_cancels_queued_chunks(numbered_chunks):
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        async def main():
+            generator = agenerate({}, {}, 1000, chunk_size=10, max_pending_chunks=3, executor=executor)
+            results = await _collect(generator, limit=15)
+            await generator.aclose()
+            return results
+        results = asyncio.run(main())
+    assert results == list(range(15))
+    # Two chunks consumed plus at most the window still in flight when the consumer stopped
+    assert numbered_chunks['next'] <= 10 * (2 + 3)
+
+
+def test_cancelling_the_consumer_task_stops_generation(numbered_chunks):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        async def main():
+            seen = []
+            async def consume():
+                async for profile in agenerate({}, {}, 10 ** 6, chunk_size=10, max_pending_chunks=2, executor=executor):
+                    seen.append(profile)
+            task = asyncio.create_task(consume())
+            while len(seen) < 25:
+                await asyncio.sleep(0.001)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return seen
+        seen = asyncio.run(main())
+    assert seen == list(range(len(seen)))
+    assert numbered_chunks['next'] < 200
+
+
+def _faker_maker_temp_dirs():
+    return {name for name in os.listdir(tempfile.gettempdir()) if name.startswith('faker-maker-')}
+
+
+def test_pack_dir_is_removed_when_writing_the_pack_fails(monkeypatch):
+    def failing_write_region_pack(region_data, path):
+        with open(path, 'wb') as f:
+            f.write(b'partial')
+        raise OSError('disk full')
+    monkeypatch.setattr(async_api, 'write_region_pack', failing_write_region_pack)
+    before = _faker_maker_temp_dirs()
+    with pytest.raises(OSError, match='disk full'):
+        asyncio.run(_collect(agenerate({}, {}, 5, processes=1)))
+    assert _faker_maker_temp_dirs() == before
+
+
+def test_process_pool_generates_real_profiles(all_region_data, make_constraints):
+    before = _faker_maker_temp_dirs()
+    profiles = asyncio.run(_collect(agenerate(all_region_data['US_GENERAL'], make_constraints(), 12, chunk_size=5, processes=2)))
+    assert len(profiles) == 12
+    assert all(profile['first_name'] and profile['Address'] for profile in profiles)
+    assert _faker_maker_temp_dirs() == before
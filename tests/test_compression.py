@@ -0,0 +1,126 @@
+import gzip
+import io
+import lzma
+import os
+
+import pytest
+
+from utils.compression import CODECS, CompressedWriter, CompressionReport, codec_available, get_codec, open_output
+
+def _decompress(name, data):
+    if name == 'gzip':
+        return gzip.decompress(data)
+    if name == 'lzma':
+        return lzma.decompress(data)
+    if name == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)).read()
+    if name == 'lz4':
+        import lz4.frame
+        return lz4.frame.decompress(data)
+    return data
+
+@pytest.fixture(params=[None, *CODECS])
+def codec_name(request):
+    if request.param is not None and not codec_available(request.param):
+        pytest.skip(f"{CODECS[request.param].module} is not installed")
+    return request.param
+
+def _chunks():
+    return [f'{{"id":{i},"name":"Nguyễn {i}"}}\n'.encode('utf-8') * (i % 5 + 1) for i in range(3000)] + [b'', b'tail']
+
+def test_round_trip_through_every_codec(codec_name, tmp_path):
+    path = str(tmp_path / 'out.bin')
+    chunks = _chunks()
+    with open_output(path, codec_name) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    with open(path, 'rb') as f:
+        data = f.read()
+    expected = b''.join(chunks)
+    assert _decompress(codec_name, data) == expected
+    assert writer.bytes_in == len(expected)
+    assert writer.bytes_out == os.path.getsize(path)
+    if codec_name is not None:
+        assert writer.bytes_out < writer.bytes_in
+
+def test_output_is_reproducible(codec_name):
+    outputs = []
+    for _ in range(2):
+        f = io.BytesIO()
+        writer = CompressedWriter(f, get_codec(codec_name))
+        for chunk in _chunks():
+            writer.write(chunk)
+        writer.close()
+        assert not f.closed # Only closed with close_file
+        outputs.append(f.getvalue())
+    assert outputs[0] == outputs[1]
+
+def test_written_buffers_may_be_reused(codec_name):
+    f = io.BytesIO()
+    writer = CompressedWriter(f, get_codec(codec_name), queue_chunks=1000)
+    buffer = bytearray(b'a' * 10)
+    for letter in b'bcd':
+        writer.write(buffer)
+        buffer[:] = bytes([letter]) * 10
+    writer.close()
+    assert _decompress(codec_name, f.getvalue()) == b'a' * 10 + b'b' * 10 + b'c' * 10
+
+class _FailingFile:
+    def __init__(self, after):
+        self.after = after
+        self.written = 0
+
+    def write(self, data):
+        self.written += len(data)
+        if self.written > self.after:
+            raise OSError("disk full")
+        return len(data)
+
+    def flush(self):
+        pass
+
+def test_errors_on_the_compression_thread_reach_the_writer(codec_name):
+    writer = CompressedWriter(_FailingFile(after=100), get_codec(codec_name), queue_chunks=2)
+    with pytest.raises(OSError, match='disk full'):
+        for _ in range(1000):
+            writer.write(os.urandom(1024)) # Incompressible, so every codec writes through
+    with pytest.raises(OSError, match='disk full'):
+        writer.close()
+
+def test_close_reraises_a_late_error():
+    writer = CompressedWriter(_FailingFile(after=10), None)
+    writer.write(b'x' * 64) # Fails on the thread after write() has returned
+    with pytest.raises(OSError, match='disk full'):
+        writer.close()
+    assert writer.closed
+    writer.close() # Closing again is a no-op
+
+def test_unknown_and_missing_codecs():
+    assert get_codec(None) is None and get_codec('none') is None
+    with pytest.raises(ValueError, match='Unknown compression'):
+        get_codec('brotli')
+    assert not codec_available('brotli')
+    for name, codec in CODECS.items():
+        if codec_available(name):
+            assert get_codec(name) is codec
+        else:
+            with pytest.raises(ValueError, match=f'needs the {codec.module} package'):
+                get_codec(name)
+
+def test_unusable_codec_leaves_no_file(tmp_path):
+    path = str(tmp_path / 'out.bin')
+    with pytest.raises(ValueError):
+        open_output(path, 'brotli')
+    assert not os.path.exists(path)
+
+def test_report_totals_its_writers():
+    report = CompressionReport('gzip')
+    for _ in range(3):
+        writer = CompressedWriter(io.BytesIO(), get_codec('gzip'))
+        writer.write(b'abc' * 1000)
+        writer.close()
+        report.add(writer)
+    assert report.bytes_in == 9000 and 0 < report.bytes_out < 9000
+    assert report.summary().startswith('gzip: 0.0 MB -> 0.0 MB (')
+    assert CompressionReport().compression == 'none'
@@ -0,0 +1,83 @@
+import csv
+import io
+import itertools
+import json
+
+import pytest
+
+from profile_generator import generate_profiles_slice
+from utils.csv_writer import HIDDEN_COLUMNS, ProfileCsvWriter, encode_value, profile_columns, write_profiles_csv
+from utils.output_formatter import HIDDEN_ATTRIBUTES
+
+ALL_UNCONVENTIONAL = ['personality_traits', 'life_events', 'online_behaviors', 'texting_typing_style', 'digital_footprint', 'device_habits']
+
+def _option_sets():
+    for hidden, family, physical, unconventional, skills in itertools.product((False, True), repeat=5):
+        overrides = {'include_hidden_attributes': hidden, 'family_details': family, 'physical_details': physical}
+        if unconventional:
+            overrides['unconventional_data_selection'] = ALL_UNCONVENTIONAL
+        if skills:
+            overrides.update(skills=['Python'], hobbies=['Chess'])
+        yield overrides
+    for category in ALL_UNCONVENTIONAL:
+        yield {'unconventional_data_selection': [category]}
+
+OPTION_SETS = list(_option_sets())
+
+def _expected_columns(profile, constraints):
+    """The profile's own keys, less the hidden attributes when they were not asked for (as in JSON output)."""
+    if constraints.get('include_hidden_attributes'):
+        return list(profile)
+    return [key for key in profile if key not in HIDDEN_ATTRIBUTES]
+
+@pytest.mark.parametrize('overrides', OPTION_SETS, ids=lambda o: ','.join(sorted(k for k, v in o.items() if v)) or 'defaults')
+def test_header_matches_the_generated_profile_keys(all_region_data, make_constraints, overrides):
+    for region_id, region_data in all_region_data.items():
+        constraints = make_constraints(region=region_id, num_profiles=10, **overrides)
+        columns = profile_columns(constraints)
+        for profile in generate_profiles_slice(region_data, constraints, 11, 0, 10, lambda *a, **k: None):
+            assert columns == _expected_columns(profile, constraints), (region_id, overrides)
+
+def test_hidden_columns_are_the_generated_hidden_attributes(all_region_data, make_constraints):
+    constraints = make_constraints(include_hidden_attributes=True)
+    profile = next(generate_profiles_slice(all_region_data['US_GENERAL'], constraints, 1, 0, 1, lambda *a, **k: None))
+    assert set(HIDDEN_COLUMNS) <= set(profile)
+    assert set(HIDDEN_COLUMNS) <= set(HIDDEN_ATTRIBUTES) # So CSV and JSON output drop the same keys
+
+def test_written_file_round_trips(all_region_data, make_constraints, tmp_path):
+    constraints = make_constraints(num_profiles=25, family_details=True, unconventional_data_selection=ALL_UNCONVENTIONAL, skills=['Python'])
+    profiles = list(generate_profiles_slice(all_region_data['VN_GENERAL'], constraints, 5, 0, 25, lambda *a, **k: None))
+    path = str(tmp_path / 'out.csv')
+    assert write_profiles_csv(iter(profiles), path, constraints) == 25
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+    assert header == profile_columns(constraints)
+    assert len(rows) == 25
+    for profile, row in zip(profiles, rows):
+        for column, cell in zip(header, row):
+            value = profile.get(column)
+            if isinstance(value, (list, dict)):
+                assert json.loads(cell) == value
+            else:
+                assert cell == ('' if value is None else str(value))
+
+def test_rows_are_flushed_in_chunks():
+    f = io.StringIO()
+    writer = ProfileCsvWriter(f, ['a', 'b'], chunk_rows=3)
+    assert f.getvalue() == ''
+    writer.write_many({'a': i, 'b': [i], 'extra': 'x'} for i in range(7))
+    assert f.getvalue().count('\n') == 7 # header + two full chunks
+    writer.write({'a': 7})
+    writer.flush()
+    assert writer.rows_written == 8
+    lines = f.getvalue().splitlines()
+    assert lines[0] == 'a,b' and lines[1] == '0,[0]' and lines[-1] == '7,'
+    assert len(lines) == 9
+
+def test_encode_value():
+    assert encode_value(None) == ''
+    assert encode_value(['a', 'é']) == '["a","é"]'
+    assert encode_value({'k': 1}) == '{"k":1}'
+    assert encode_value(3) == 3
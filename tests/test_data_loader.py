@@ -0,0 +1,137 @@
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import DATA_DIR
+from utils import data_loader
+from utils.data_loader import iter_region_data, load_all_regions, load_region_data, load_regions_config
+from utils.region_schema import RegionDataError
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """A writable copy of data/."""
+    path = tmp_path / 'data'
+    shutil.copytree(DATA_DIR, path)
+    return str(path)
+
+
+def _edit_json(path, edit):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    edit(data)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def test_regions_config_and_aliases(regions_config):
+    regions, aliases = load_regions_config(DATA_DIR)
+    assert [region['id'] for region in regions] == ['US_GENERAL', 'VN_GENERAL', 'UK_GENERAL', 'CN_GENERAL']
+    assert regions == regions_config
+    assert set(aliases.values()) <= {region['id'] for region in regions}
+
+
+@pytest.fixture
+def fresh_region_data(regions_config):
+    """Freshly loaded regions (generation adds keys to the session-wide all_region_data)."""
+    return load_all_regions(DATA_DIR, regions_config)
+
+
+def test_concurrent_loading_matches_one_file_at_a_time(regions_config, fresh_region_data):
+    assert list(fresh_region_data) == [region['id'] for region in regions_config]
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        for region in regions_config:
+            sequential = load_region_data(os.path.join(DATA_DIR, region['file']), DATA_DIR, executor)
+            assert sequential == fresh_region_data[region['id']], region['id']
+
+
+def test_parsing_in_processes_gives_the_same_data(regions_config, fresh_region_data, monkeypatch):
+    monkeypatch.setattr(data_loader, 'LARGE_FILE_BYTES', 0) # Send every file to the process pool
+    assert load_all_regions(DATA_DIR, regions_config, parse_processes=2) == fresh_region_data
+
+
+def test_iter_region_data_yields_every_region_once(regions_config):
+    ids = [region_id for region_id, region_data in iter_region_data(DATA_DIR, regions_config, threads=2)]
+    assert sorted(ids) == sorted(region['id'] for region in regions_config)
+
+
+def test_referenced_files_are_merged_and_their_keys_removed(fresh_region_data):
+    region_data = fresh_region_data['US_GENERAL']
+    assert not [key for key in region_data if key.endswith('_file')]
+    for key in ('first_names_male', 'occupations', 'address_data', 'nicknames', 'phone_number_formats', 'street_types',
+                'sub_commune_units', 'unconventional_data_rules', 'consistency_rules', 'validation_data'):
+        assert key in region_data, key
+    assert isinstance(region_data['occupations'], list)
+    assert 'phone_number_data' not in region_data and 'street_data_content' not in region_data
+
+
+def test_region_email_rules_are_merged_over_the_defaults(data_dir):
+    def edit(rules):
+        rules['age_limits'] = {'min_email_age': 14}
+        rules['custom_rule'] = True
+    _edit_json(os.path.join(data_dir, 'usa', 'us_email_rules.json'), edit)
+    with open(os.path.join(data_dir, 'email_rules.json'), encoding='utf-8') as f:
+        defaults = json.load(f)
+    region_data = load_region_data(os.path.join(data_dir, 'usa', 'us_general.json'), data_dir)
+    limits = region_data['email_rules']['age_limits']
+    assert limits['min_email_age'] == 14
+    assert {key: value for key, value in limits.items() if key != 'min_email_age'} == \
+        {key: value for key, value in defaults['age_limits'].items() if key != 'min_email_age'}
+    assert region_data['email_rules']['custom_rule'] is True
+
+
+CORRUPTIBLE_FILES = [
+    'email_rules.json',
+    'skills_interests_rules.json',
+    os.path.join('usa', 'us_general.json'),
+    os.path.join('usa', 'us_names.json'),
+    os.path.join('usa', 'us_nicknames.json'),
+    os.path.join('usa', 'us_email_rules.json'),
+]
+
+
+@pytest.mark.parametrize('relative_path', CORRUPTIBLE_FILES)
+def test_invalid_json_fails_naming_the_file(data_dir, capsys, relative_path):
+    path = os.path.join(data_dir, relative_path)
+    with open(path, 'w') as f:
+        f.write('{"broken": ')
+    with pytest.raises(RegionDataError) as excinfo:
+        load_region_data(os.path.join(data_dir, 'usa', 'us_general.json'), data_dir)
+    assert excinfo.value.source == path
+    [problem] = excinfo.value.problems
+    assert problem.startswith('invalid JSON: ')
+    assert path in str(excinfo.value)
+    assert capsys.readouterr().out == ''
+
+
+@pytest.mark.parametrize('relative_path', CORRUPTIBLE_FILES)
+def test_a_missing_file_fails_naming_the_file(data_dir, relative_path):
+    path = os.path.join(data_dir, relative_path)
+    os.remove(path)
+    with pytest.raises(RegionDataError) as excinfo:
+        load_region_data(os.path.join(data_dir, 'usa', 'us_general.json'), data_dir)
+    assert excinfo.value.source == path
+    assert excinfo.value.problems == ['file not found']
+
+
+def test_loading_every_region_fails_on_a_bad_file(data_dir):
+    path = os.path.join(data_dir, 'skills_interests_rules.json')
+    with open(path, 'w') as f:
+        f.write('[1, 2')
+    regions, _ = load_regions_config(data_dir)
+    with pytest.raises(RegionDataError) as excinfo:
+        load_all_regions(data_dir, regions)
+    assert excinfo.value.source == path
+
+
+def test_missing_config_files(data_dir, capsys):
+    os.remove(os.path.join(data_dir, 'region_aliases.json'))
+    regions, aliases = load_regions_config(data_dir)
+    assert regions and aliases == {}
+    assert 'No region aliases will be available' in capsys.readouterr().out
+    os.remove(os.path.join(data_dir, 'regions.json'))
+    assert load_regions_config(data_dir) == ([], {})
+    assert list(iter_region_data(data_dir)) == []
@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+import signal
+import time
+
+import distributed
+from conftest import DATA_DIR
+from distributed import WorkQueue, create_job, run_coordinator
+from utils.generation_job import GenerationJob
+from utils.json_backend import load_path
+
+UNIT_SIZE = 40
+
+
+def _job(tmp_path, make_constraints, claim_timeout=1.0, units=5):
+    job_dir = str(tmp_path / 'job')
+    constraints = make_constraints(num_profiles=UNIT_SIZE * units, output_format='json')
+    create_job(job_dir, constraints, seed=99, unit_size=UNIT_SIZE, compression='gzip', claim_timeout=claim_timeout)
+    return job_dir, constraints
+
+
+def _claim_and_hang(job_dir):
+    # A worker that claims a unit, writes part of it and then stops responding
+    queue = WorkQueue(job_dir)
+    unit = queue.claim('doomed-worker')
+    with open(os.path.join(job_dir, 'output', f"{distributed.attempt_prefix(unit)}-00001.ndjson.gz.part"), 'wb') as f:
+        f.write(b'half a shard')
+    time.sleep(3600)
+
+
+def test_a_stale_worker_cannot_finish_or_fail_a_reassigned_unit(tmp_path, make_constraints):
+    job_dir, _ = _job(tmp_path, make_constraints, units=1)
+    queue = WorkQueue(job_dir)
+    stale = queue.claim('worker-a')
+    assert queue.heartbeat(stale)
+    assert queue.expire_claims(timeout=0) == [stale['name']]
+    assert queue.requeue_failed(max_attempts=3) == []
+    fresh = queue.claim('worker-b')
+    assert fresh['claim'] != stale['claim']
+    assert distributed.attempt_prefix(fresh) != distributed.attempt_prefix(stale)
+
+    assert not queue.heartbeat(stale)
+    assert not queue.finish(stale, {'rows': 0})
+    queue.fail(stale, 'late error')
+    assert queue.counts() == {'pending': 0, 'claimed': 1, 'done': 0, 'failed': 0}
+    assert queue.holds(fresh)
+
+    assert queue.finish(fresh, {'rows': UNIT_SIZE})
+    assert queue.counts() == {'pending': 0, 'claimed': 0, 'done': 1, 'failed': 0}
+    assert load_path(queue.path('done', fresh['name']))['worker'] == 'worker-b'
+
+
+def test_units_exhausting_their_attempts_fail_the_job(tmp_path, make_constraints):
+    job_dir, _ = _job(tmp_path, make_constraints, units=1)
+    queue = WorkQueue(job_dir)
+    for attempt in range(3):
+        unit = queue.claim(f"worker-{attempt}")
+        queue.fail(unit, 'boom')
+        exhausted = queue.requeue_failed(max_attempts=3)
+    assert [unit['error'] for unit in exhausted] == ['boom']
+
+
+def test_local_workers_survive_a_killed_worker_and_match_a_single_process_run(tmp_path, all_region_data, make_constraints):
+    job_dir, constraints = _job(tmp_path, make_constraints)
+    doomed = multiprocessing.Process(target=_claim_and_hang, args=(job_dir,), daemon=True)
+    doomed.start()
+    queue = WorkQueue(job_dir)
+    while queue.counts()['claimed'] == 0:
+        time.sleep(0.01)
+    os.kill(doomed.pid, signal.SIGKILL)
+    doomed.join()
+
+    manifest = run_coordinator(job_dir, DATA_DIR, local_workers=2, log_func=lambda message: None, poll_seconds=0.1)
+
+    done = [load_path(queue.path('done', distributed.unit_name(unit_id))) for unit_id in range(5)]
+    assert done[0]['attempts'] == 1 and done[0]['prefix'] == 'unit000000-a2' # The killed worker's unit was retried
+    assert {unit['worker'] for unit in done} <= {f"{distributed.socket.gethostname()}-local{n}" for n in range(2)}
+    output_files = os.listdir(os.path.join(job_dir, 'output'))
+    assert not [name for name in output_files if name.startswith('unit000000-a1')] # The abandoned attempt is cleaned up
+
+    single_dir = str(tmp_path / 'single')
+    GenerationJob(single_dir, all_region_data['US_GENERAL'], constraints, max_rows=UNIT_SIZE, compression='gzip', seed=99).run()
+    single = load_path(os.path.join(single_dir, 'profiles-manifest.json'))
+    assert manifest['total_rows'] == single['total_rows'] == UNIT_SIZE * 5
+    assert [shard['sha256'] for shard in manifest['shards']] == [shard['sha256'] for shard in single['shards']]
+    assert load_path(os.path.join(job_dir, 'status.json'))['state'] == 'complete'
@@ -0,0 +1,88 @@
+import random
+from collections import Counter
+
+import pytest
+
+from profile_generator import rng
+from profile_generator.demographics.family_details import (
+    MIN_PARENT_AGE, generate_family_details, generate_family_details_batch, get_family_tables,
+)
+
+REGIONS = ['US_GENERAL', 'VN_GENERAL', 'UK_GENERAL', 'CN_GENERAL']
+AGES = list(range(0, 121))
+
+
+def _education_levels(region_data):
+    levels = {occ.get('typical_education_level', 'None') for occ in region_data.get('occupations', [])}
+    return sorted(levels) + ['None']
+
+
+def _allowed(tables, age, education_level, constraints):
+    """The marital statuses and children counts generate_family_details can return for these inputs."""
+    if age < tables.legal_marriage_age:
+        statuses = {'Single'}
+    else:
+        sampler = tables.marital_status_sampler(age)
+        statuses = set(sampler.values) if sampler is not None else {'Single'}
+    children = {}
+    for status in statuses:
+        counts = {0}
+        if age >= MIN_PARENT_AGE and (status != 'Single' or constraints.get('allow_unconventional')):
+            sampler = tables.children_sampler(age, status, education_level)
+            counts |= set(sampler.values) if sampler is not None else set()
+            if status == 'Single':
+                counts.add(1)
+        children[status] = counts
+    return children
+
+
+@pytest.mark.parametrize('region', REGIONS)
+@pytest.mark.parametrize('allow_unconventional', [False, True])
+def test_batch_stays_within_the_single_profile_outcomes(all_region_data, no_debug, region, allow_unconventional):
+    region_data = all_region_data[region]
+    tables = get_family_tables(region_data)
+    constraints = {'allow_unconventional': allow_unconventional}
+    levels = _education_levels(region_data)
+    ages = [age for age in AGES for _ in levels]
+    education_levels = levels * len(AGES)
+    with rng.use(random.Random(5)):
+        batch = generate_family_details_batch(ages, education_levels, constraints, region_data, no_debug)
+    assert len(batch) == len(ages)
+    for age, education_level, details in zip(ages, education_levels, batch):
+        allowed = _allowed(tables, age, education_level, constraints)
+        assert details['marital_status'] in allowed, (age, details)
+        assert details['children'] in allowed[details['marital_status']], (age, education_level, details)
+        with rng.use(random.Random(age)):
+            single = generate_family_details(age, education_level, constraints, region_data, no_debug)
+        assert single['marital_status'] in allowed
+        assert single['children'] in allowed[single['marital_status']]
+
+
+@pytest.mark.parametrize('age', [17, 18, 25, 35, 50, 70, 95])
+def test_batch_matches_the_single_profile_distribution(all_region_data, no_debug, age):
+    region_data = all_region_data['US_GENERAL']
+    education_level = _education_levels(region_data)[0]
+    n = 4000
+    with rng.use(random.Random(1)):
+        singles = [generate_family_details(age, education_level, {}, region_data, no_debug) for _ in range(n)]
+    with rng.use(random.Random(2)):
+        batch = generate_family_details_batch([age] * n, [education_level] * n, {}, region_data, no_debug)
+    for field in ('marital_status', 'children'):
+        single_counts = Counter(d[field] for d in singles)
+        batch_counts = Counter(d[field] for d in batch)
+        for value in single_counts | batch_counts:
+            assert abs(single_counts[value] - batch_counts[value]) / n < 0.05, (field, value, single_counts, batch_counts)
+
+
+def test_batch_honours_requested_status_and_children(all_region_data, no_debug):
+    region_data = all_region_data['US_GENERAL']
+    tables = get_family_tables(region_data)
+    constraints = {'marital_status': 'married', 'num_children': '1-3'}
+    batch = generate_family_details_batch(AGES, ['None'] * len(AGES), constraints, region_data, no_debug)
+    for age, details in zip(AGES, batch):
+        single = generate_family_details(age, 'None', constraints, region_data, no_debug)
+        assert details['marital_status'] == single['marital_status'] == ('Married' if age >= tables.legal_marriage_age else 'Single')
+        if details['marital_status'] == 'Married' and age >= MIN_PARENT_AGE:
+            assert 1 <= details['children'] <= 3
+        else:
+            assert details['children'] == 0
@@ -0,0 +1,106 @@
+import os
+import threading
+
+import pytest
+
+from utils import generation_job
+from utils.generation_job import GenerationJob, JobCancelled
+
+NUM_PROFILES = 57
+
+def _files(output_dir):
+    contents = {}
+    for name in sorted(os.listdir(output_dir)):
+        with open(os.path.join(output_dir, name), 'rb') as f:
+            contents[name] = f.read()
+    return contents
+
+def _job(output_dir, region_data, make_constraints, seed=1234, debug_print_func=None, **settings):
+    settings.setdefault('max_rows', 10)
+    constraints = make_constraints(num_profiles=NUM_PROFILES, family_details=True)
+    return GenerationJob(str(output_dir), region_data, constraints, seed=seed, debug_print_func=debug_print_func, **settings)
+
+def _cancel_after_shards(shards):
+    """Returns (stop_event, debug_print_func) that stops the job once it checkpoints `shards` shards."""
+    stop_event = threading.Event()
+    def debug_print_func(message, *args, **kwargs):
+        if message.startswith(f"Checkpoint: {shards} shards"):
+            stop_event.set()
+    return stop_event, debug_print_func
+
+SETTINGS = [
+    {'max_rows': 10},
+    {'max_rows': 10, 'compression': None, 'output_format': 'csv'},
+    {'max_rows': None, 'max_bytes': 4000},
+    {'max_rows': 8, 'max_bytes': 3000, 'compression': 'lzma', 'start_index': 100},
+]
+
+@pytest.mark.parametrize('settings', SETTINGS, ids=['rows', 'csv', 'bytes', 'both'])
+def test_cancelled_and_resumed_job_matches_an_uninterrupted_run(tmp_path, all_region_data, make_constraints, settings):
+    region_data = all_region_data['US_GENERAL']
+    whole = _job(tmp_path / 'whole', region_data, make_constraints, **settings)
+    assert whole.run() == NUM_PROFILES
+    expected = _files(tmp_path / 'whole')
+    assert len([name for name in expected if '-0000' in name]) > 4
+
+    stop_event, debug_print_func = _cancel_after_shards(3)
+    interrupted = _job(tmp_path / 'resumed', region_data, make_constraints, debug_print_func=debug_print_func, **settings)
+    with pytest.raises(JobCancelled):
+        interrupted.run(stop_event=stop_event)
+    state = interrupted.load_state()
+    assert not state['complete'] and len(state['shards']) >= 3 # One chunk can fill more than one shard
+    assert _files(tmp_path / 'resumed') != expected
+
+    resumed = _job(tmp_path / 'resumed', region_data, make_constraints, seed=None, **settings)
+    assert resumed.run(resume=True) == NUM_PROFILES - state['rows']
+    assert resumed.seed == 1234
+    assert _files(tmp_path / 'resumed') == expected
+
+def test_resume_mid_shard_discards_the_partial_shard(tmp_path, all_region_data, make_constraints, monkeypatch):
+    region_data = all_region_data['VN_GENERAL']
+    _job(tmp_path / 'whole', region_data, make_constraints).run()
+    expected = _files(tmp_path / 'whole')
+
+    stop_event = threading.Event()
+    generated = []
+    generate_profile_at = generation_job.generate_profile_at
+    def counting_generate(*args, **kwargs):
+        generated.append(args[3])
+        if len(generated) == 34: # Four rows into the fourth shard
+            stop_event.set()
+        return generate_profile_at(*args, **kwargs)
+    monkeypatch.setattr(generation_job, 'generate_profile_at', counting_generate)
+    with pytest.raises(JobCancelled, match='stopped at profile 34'):
+        _job(tmp_path / 'resumed', region_data, make_constraints).run(stop_event=stop_event)
+    # As if the process had died while writing the next shard
+    with open(os.path.join(tmp_path / 'resumed', 'profiles-00005.ndjson.gz.part'), 'wb') as f:
+        f.write(b'partial')
+
+    generated.clear()
+    assert _job(tmp_path / 'resumed', region_data, make_constraints).run(resume=True) == NUM_PROFILES - 30
+    assert generated == list(range(30, NUM_PROFILES))
+    assert _files(tmp_path / 'resumed') == expected
+
+def test_resuming_a_complete_job_does_nothing(tmp_path, all_region_data, make_constraints):
+    job = _job(tmp_path, all_region_data['UK_GENERAL'], make_constraints)
+    job.run()
+    expected = _files(tmp_path)
+    assert _job(tmp_path, all_region_data['UK_GENERAL'], make_constraints).run(resume=True) == 0
+    assert _files(tmp_path) == expected
+
+def test_resume_checks(tmp_path, all_region_data, make_constraints):
+    region_data = all_region_data['US_GENERAL']
+    with pytest.raises(ValueError, match='No job to resume'):
+        _job(tmp_path, region_data, make_constraints).run(resume=True)
+    stop_event, debug_print_func = _cancel_after_shards(1)
+    with pytest.raises(JobCancelled):
+        _job(tmp_path, region_data, make_constraints, debug_print_func=debug_print_func).run(stop_event=stop_event)
+    with pytest.raises(ValueError, match='already holds a job'):
+        _job(tmp_path, region_data, make_constraints).run()
+    with pytest.raises(ValueError, match='does not match'):
+        _job(tmp_path, region_data, make_constraints, seed=99).run(resume=True)
+    with pytest.raises(ValueError, match='max_rows'):
+        _job(tmp_path, region_data, make_constraints, max_rows=20).run(resume=True)
+    with pytest.raises(ValueError, match='constraints.gender'):
+        GenerationJob(str(tmp_path), region_data, make_constraints(num_profiles=NUM_PROFILES, family_details=True, gender='female'),
+                      max_rows=10).run(resume=True)
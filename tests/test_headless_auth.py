@@ -0,0 +1,122 @@
+import json
+
+import pytest
+
+from auth import headless
+from auth.headless import API_KEY_ENV, API_KEY_FILE_ENV, API_KEY_SHA256_ENV, check_headless_auth, create_api_key, hash_api_key
+
+@pytest.fixture(autouse=True)
+def auth_file(tmp_path, monkeypatch):
+    """Points auth.json at a temporary file and starts every test without a cached verdict or key variables."""
+    path = tmp_path / 'auth.json'
+    monkeypatch.setattr(headless, 'AUTH_FILE', str(path))
+    monkeypatch.setattr(headless, '_cached_verdict', None)
+    for name in (API_KEY_ENV, API_KEY_FILE_ENV, API_KEY_SHA256_ENV):
+        monkeypatch.delenv(name, raising=False)
+    return path
+
+def _write_auth(path, **credentials):
+    path.write_text(json.dumps(credentials))
+
+def _check(key_file=None):
+    messages = []
+    verdict = check_headless_auth(messages.append, key_file)
+    assert messages == [f"Headless auth: {verdict[1]}"]
+    return verdict
+
+def test_valid_key_in_the_environment(auth_file, monkeypatch):
+    _write_auth(auth_file, api_key_sha256=hash_api_key('secret'))
+    monkeypatch.setenv(API_KEY_ENV, 'secret')
+    assert _check() == (True, "API key accepted.")
+
+def test_key_file_argument(auth_file, tmp_path):
+    _write_auth(auth_file, api_key_sha256=hash_api_key('secret'))
+    key_file = tmp_path / 'key.txt'
+    key_file.write_text('secret\n')
+    assert _check(str(key_file)) == (True, "API key accepted.")
+
+def test_key_file_from_the_environment(auth_file, tmp_path, monkeypatch):
+    _write_auth(auth_file, api_key_sha256=hash_api_key('secret'))
+    key_file = tmp_path / 'key.txt'
+    key_file.write_text('  secret  ')
+    monkeypatch.setenv(API_KEY_FILE_ENV, str(key_file))
+    assert _check() == (True, "API key accepted.")
+
+def test_unreadable_key_file(auth_file, tmp_path):
+    _write_auth(auth_file, api_key_sha256=hash_api_key('secret'), stay_logged_in=True)
+    missing = tmp_path / 'missing.txt'
+    allowed, reason = _check(str(missing))
+    assert not allowed
+    assert reason.startswith(f"Could not read API key file {missing}: ")
+
+def test_wrong_key(auth_file, monkeypatch):
+    _write_auth(auth_file, api_key_sha256=hash_api_key('secret'), stay_logged_in=True)
+    monkeypatch.setenv(API_KEY_ENV, 'guess')
+    assert _check() == (False, "Invalid API key.")
+
+@pytest.mark.parametrize('credentials', [None, {}, {'stay_logged_in': True}])
+def test_key_without_a_registered_digest(auth_file, monkeypatch, credentials):
+    if credentials is not None:
+        _write_auth(auth_file, **credentials)
+    monkeypatch.setenv(API_KEY_ENV, 'secret')
+    allowed, reason = _check()
+    assert not allowed
+    assert reason.startswith("An API key was provided but no key is registered")
+
+def test_digest_in_the_environment_overrides_auth_json(auth_file, monkeypatch):
+    _write_auth(auth_file, api_key_sha256=hash_api_key('old'))
+    monkeypatch.setenv(API_KEY_SHA256_ENV, hash_api_key('new').upper())
+    monkeypatch.setenv(API_KEY_ENV, 'new')
+    assert _check() == (True, "API key accepted.")
+    monkeypatch.setattr(headless, '_cached_verdict', None)
+    monkeypatch.setenv(API_KEY_ENV, 'old')
+    assert _check() == (False, "Invalid API key.")
+
+def test_digest_in_the_environment_needs_no_auth_json(auth_file, monkeypatch):
+    monkeypatch.setenv(API_KEY_SHA256_ENV, hash_api_key('secret'))
+    monkeypatch.setenv(API_KEY_ENV, 'secret')
+    assert _check() == (True, "API key accepted.")
+    assert not auth_file.exists()
+
+@pytest.mark.parametrize('contents, allowed', [
+    ({'stay_logged_in': True}, True),
+    ({'stay_logged_in': False}, False),
+    ({}, False),
+    (None, False),
+    ('{not json', False),
+])
+def test_stay_logged_in_fallback_without_a_key(auth_file, contents, allowed):
+    if isinstance(contents, dict):
+        _write_auth(auth_file, api_key_sha256=hash_api_key('secret'), **contents)
+    elif contents is not None:
+        auth_file.write_text(contents)
+    verdict = _check()
+    if allowed:
+        assert verdict == (True, "Using saved login session.")
+    else:
+        assert verdict[0] is False and verdict[1].startswith("No credentials for headless mode.")
+
+def test_verdict_is_cached(auth_file, monkeypatch):
+    _write_auth(auth_file, api_key_sha256=hash_api_key('secret'))
+    monkeypatch.setenv(API_KEY_ENV, 'secret')
+    assert _check() == (True, "API key accepted.")
+    monkeypatch.setenv(API_KEY_ENV, 'guess')
+    auth_file.unlink()
+    messages = []
+    assert check_headless_auth(messages.append) == (True, "API key accepted.")
+    assert messages == [] # Not evaluated again
+
+def test_create_api_key_keeps_the_other_fields(auth_file, monkeypatch):
+    _write_auth(auth_file, stay_logged_in=True, username='someone', api_key_sha256=hash_api_key('old'))
+    api_key = create_api_key()
+    saved = json.loads(auth_file.read_text())
+    assert saved == {'stay_logged_in': True, 'username': 'someone', 'api_key_sha256': hash_api_key(api_key)}
+    assert create_api_key() != api_key
+    monkeypatch.setenv(API_KEY_ENV, api_key)
+    assert _check() == (False, "Invalid API key.") # Replaced by the second key
+
+def test_create_api_key_without_auth_json(auth_file, monkeypatch):
+    api_key = create_api_key()
+    assert json.loads(auth_file.read_text()) == {'api_key_sha256': hash_api_key(api_key)}
+    monkeypatch.setenv(API_KEY_ENV, api_key)
+    assert _check() == (True, "API key accepted.")
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# Cold-start budget for `import main`, in microseconds. It currently sits well under
+# 100 ms; the slack absorbs slow CI machines while still catching a UI library
+# (rich/questionary/textual add several hundred ms together) creeping back in.
+MAIN_IMPORT_BUDGET_US = 250_000
+
+# Modules the batch (--non-interactive) path must not load at import time.
+UI_MODULES = ('questionary', 'rich', 'textual', 'auth', 'user_input', 'tui_app')
+
+
+def parse_importtime(stderr):
+    """Parses `python -X importtime` output into {module: cumulative_us}."""
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = int(cumulative_us.strip())
+    return timings
+
+
+def run_importtime(code):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def test_main_does_not_import_ui_libraries():
+    timings = run_importtime('import main')
+    loaded = [name for name in timings if name.split('.')[0] in UI_MODULES]
+    assert loaded == [], f"UI modules imported by `import main`: {loaded}"
+
+
+def test_main_import_within_budget():
+    timings = run_importtime('import main')
+    assert timings['main'] <= MAIN_IMPORT_BUDGET_US, (
+        f"`import main` took {timings['main']} us (budget {MAIN_IMPORT_BUDGET_US} us)"
+    )
@@ -0,0 +1,46 @@
+import itertools
+
+from profile_generator import inference
+from profile_generator.demographics.occupation import occupation_index
+from profile_generator.inference import INFERENCE_RULES, run_inference_engine
+
+
+def _fixed_point_reference(constraints, region_data, debug_print_func):
+    # The engine before rules declared their reads/writes: apply every rule until a full pass changes nothing
+    while True:
+        previous = constraints.copy()
+        for rule in INFERENCE_RULES:
+            constraints = rule.func(constraints, region_data, debug_print_func)
+        if constraints == previous:
+            return constraints
+
+
+def _constraint_sets(region_data):
+    occupations = list(occupation_index(region_data))[:5]
+    options = {
+        'occupation': [None] + occupations + ['Not an occupation'],
+        'age_range': [None, (10, 15), (17, 17), (30, 40)],
+        'marital_status': [None, 'Married'],
+        'skills': [None, ['programming']],
+    }
+    for values in itertools.product(*options.values()):
+        yield {key: value for key, value in zip(options, values) if value is not None}
+
+
+def test_worklist_scheduler_matches_the_fixed_point_loop(all_region_data, no_debug):
+    for region_data in all_region_data.values():
+        for constraints in _constraint_sets(region_data):
+            inference._inference_cache.clear()
+            expected = _fixed_point_reference(dict(constraints), region_data, no_debug)
+            assert run_inference_engine(dict(constraints), region_data, no_debug) == expected, constraints
+            # A second run is served from the memo cache and must agree too
+            assert run_inference_engine(dict(constraints), region_data, no_debug) == expected, constraints
+
+
+def test_inference_fills_in_age_and_marital_status(all_region_data, no_debug):
+    region_data = all_region_data['US_GENERAL']
+    name, occupation = next(iter(occupation_index(region_data).items()))
+    inferred = run_inference_engine({'occupation': name}, region_data, no_debug)
+    assert inferred['age_range'] == (occupation.get('min_age', 18), occupation.get('max_age', 65))
+    assert run_inference_engine({'age_range': (10, 15)}, region_data, no_debug)['marital_status'] == 'Single'
+
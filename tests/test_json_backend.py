@@ -0,0 +1,80 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+from conftest import REPO_ROOT
+from profile_generator import generate_profiles_slice
+from utils import json_backend
+from utils.constraints import constraints_from_dict
+
+def _load_backend(name, monkeypatch):
+    """Imports a separate copy of utils/json_backend.py with `name` selected."""
+    if json_backend._import_backend(name) is None:
+        pytest.skip(f"{name} is not installed")
+    monkeypatch.setenv(json_backend.BACKEND_ENV_VAR, name)
+    spec = importlib.util.spec_from_file_location(f'json_backend_{name}', os.path.join(REPO_ROOT, 'utils', 'json_backend.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    assert module.BACKEND == name
+    return module
+
+@pytest.fixture(params=json_backend.BACKENDS)
+def backend(request, monkeypatch):
+    return _load_backend(request.param, monkeypatch)
+
+@pytest.fixture(scope='module')
+def documents(all_region_data, regions_config):
+    docs = [
+        {'name': 'Nguyễn Thị Hồng', 'city': '北京', 'note': 'a "quoted" / slashed\\ line\n', 'emoji': '😀'},
+        {'nested': {'list': [1, -2, 0, 3.5, 0.1, True, False, None], 'empty': {}, 'none': []}},
+        [], 'plain', 12345678901234,
+    ]
+    for region_id, region_data in all_region_data.items():
+        constraints = constraints_from_dict({'region': region_id, 'num_profiles': 5}, regions_config)
+        docs.extend(generate_profiles_slice(region_data, constraints, 7, 0, 5, lambda *a, **k: None))
+    return docs
+
+def test_compact_output_matches_the_stdlib(backend, documents):
+    for doc in documents:
+        expected = json.dumps(doc, ensure_ascii=False, separators=(',', ':'))
+        assert backend.dumps(doc) == expected
+        assert backend.dumps_bytes(doc) == expected.encode('utf-8')
+
+def test_indented_output_matches_the_stdlib(backend, documents):
+    for doc in documents:
+        assert backend.dumps(doc, indent=2) == json.dumps(doc, ensure_ascii=False, indent=2)
+
+def test_round_trip(backend, documents, tmp_path):
+    path = str(tmp_path / 'doc.json')
+    for doc in documents:
+        assert backend.loads(backend.dumps(doc)) == doc
+        assert backend.loads(backend.dumps_bytes(doc)) == doc
+        backend.dump_path(doc, path, indent=2)
+        assert backend.load_path(path) == doc
+
+def test_every_backend_writes_the_same_bytes(monkeypatch, documents):
+    outputs = {}
+    for name in json_backend.BACKENDS:
+        if json_backend._import_backend(name) is not None:
+            module = _load_backend(name, monkeypatch)
+            outputs[name] = [module.dumps_bytes(doc) for doc in documents]
+    assert len(set(map(tuple, outputs.values()))) == 1, sorted(outputs)
+
+@pytest.mark.parametrize('text', ['{"broken": ', '[1, 2', '', 'nope'])
+def test_decode_errors_are_the_stdlib_type(backend, text):
+    with pytest.raises(json.JSONDecodeError):
+        backend.loads(text)
+    with pytest.raises(json_backend.JSONDecodeError):
+        backend.loads(text.encode('utf-8'))
+
+def test_unknown_or_missing_backend_is_rejected(monkeypatch):
+    monkeypatch.setenv(json_backend.BACKEND_ENV_VAR, 'simplejson')
+    with pytest.raises(ValueError, match='must be one of'):
+        json_backend._select_backend()
+    for name in ('orjson', 'ujson'):
+        if json_backend._import_backend(name) is None:
+            monkeypatch.setenv(json_backend.BACKEND_ENV_VAR, name)
+            with pytest.raises(ValueError, match='is not installed'):
+                json_backend._select_backend()
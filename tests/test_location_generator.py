@@ -0,0 +1,120 @@
+import random
+from collections import Counter
+
+import pytest
+
+from profile_generator import rng
+from profile_generator.location_generator import (
+    LocationSampler, _AliasTable, find_province, generate_addresses, get_location_sampler, normalize_place_name, strip_unit_type,
+)
+
+REGIONS = ['US_GENERAL', 'VN_GENERAL', 'UK_GENERAL', 'CN_GENERAL']
+
+
+def _implied_distribution(table):
+    """The probability of each outcome: kept from its own column, plus the columns aliased to it."""
+    distribution = [0.0] * table.n
+    for i in range(table.n):
+        distribution[i] += table.probability[i] / table.n
+        distribution[table.alias[i]] += (1.0 - table.probability[i]) / table.n
+    return distribution
+
+
+@pytest.mark.parametrize('weights', [
+    [1.0], [3.0, 1.0], [0.0, 1.0, 0.0, 2.0], [5.0] * 7, [0.0, 0.0, 0.0],
+    [random.Random(seed).expovariate(1.0) for seed in range(200)],
+    [10.0 ** -random.Random(seed).randint(0, 6) for seed in range(50)],
+])
+def test_alias_table_reproduces_the_masses(weights):
+    table = _AliasTable(weights)
+    total = sum(weights)
+    expected = [w / total for w in weights] if total > 0 else [1.0 / len(weights)] * len(weights)
+    assert _implied_distribution(table) == pytest.approx(expected, abs=1e-12)
+    assert all(0.0 <= p <= 1.0 + 1e-12 for p in table.probability)
+
+
+def test_alias_table_draw_frequencies_match_the_masses():
+    weights = [1, 2, 3, 4, 0, 10]
+    table = _AliasTable(weights)
+    n = 60000
+    with rng.use(random.Random(1)):
+        many = Counter(table.sample_many(n))
+        single = Counter(table.sample() for _ in range(n))
+    for counts in (many, single):
+        assert counts[4] == 0
+        for i, weight in enumerate(weights):
+            assert abs(counts[i] / n - weight / sum(weights)) < 0.01, (i, counts)
+
+
+def test_packed_arrays_sample_like_the_table():
+    table = _AliasTable([2, 1, 1])
+    packed = _AliasTable.from_arrays(tuple(table.probability), tuple(table.alias))
+    with rng.use(random.Random(4)):
+        expected = table.sample_many(500)
+    with rng.use(random.Random(4)):
+        assert packed.sample_many(500) == expected
+
+
+@pytest.mark.parametrize('region', REGIONS)
+def test_region_masses_form_a_distribution(all_region_data, region):
+    sampler = get_location_sampler(all_region_data[region])
+    assert sum(sampler.masses) == pytest.approx(1.0)
+    assert _implied_distribution(sampler.table) == pytest.approx(sampler.masses, abs=1e-12)
+
+
+def test_place_names_match_without_case_accents_or_unit_type(all_region_data):
+    assert normalize_place_name('Hà Nội') == normalize_place_name('HA  NOI') == 'ha noi'
+    assert normalize_place_name('Đà Nẵng') == 'da nang'
+    assert strip_unit_type('ha noi city') == 'ha noi'
+    assert strip_unit_type('city') == 'city'
+    region_data = all_region_data['VN_GENERAL']
+    for name in ('ha noi', 'Hà Nội', 'HA NOI', 'Hà Nội City', 'ha noi province'):
+        assert find_province(region_data, name)['name'] == 'Hà Nội City', name
+    assert find_province(region_data, 'bac giang')['name'] == 'Bắc Giang Province'
+    assert find_province(region_data, 'Atlantis') is None
+    assert find_province(all_region_data['US_GENERAL'], 'MAINE')['name'] == 'Maine'
+
+
+def test_exact_names_win_over_names_without_the_unit_type():
+    address_data = {'regions': [{'name': 'North', 'provinces': [
+        {'name': 'Springfield', 'administrative_units': [{'name': 'Old Town'}]},
+        {'name': 'Springfield City', 'administrative_units': [{'name': 'New Town'}]},
+    ]}]}
+    sampler = LocationSampler(address_data)
+    assert sampler.find('province', 'springfield')['name'] == 'Springfield'
+    assert sampler.find('province', 'Springfield City')['name'] == 'Springfield City'
+    assert sampler.find('province', 'springfield province')['name'] == 'Springfield'
+
+
+def _province_range(sampler, name):
+    node = sampler._nodes(1, name)[0]
+    return node.start, node.end
+
+
+def test_constraints_narrow_to_the_named_unit(all_region_data):
+    region_data = all_region_data['VN_GENERAL']
+    sampler = get_location_sampler(region_data)
+    start, end = _province_range(sampler, 'ha noi')
+    ranges, _ = sampler._ranges_for(('Northern Region', 'ha noi', None, None))
+    assert ranges == [(start, end)]
+    with rng.use(random.Random(2)):
+        addresses = [address['Address'] for address in generate_addresses(region_data, 300, {'location': {'province': 'ha noi'}})]
+    assert all(address.endswith('Hà Nội City, Northern Region') for address in addresses)
+    district = next(iter(sampler._nodes(1, 'ha noi')[0].unit['administrative_units']))
+    ranges, _ = sampler._ranges_for((None, 'ha noi', district['name'], None))
+    assert len(ranges) == 1 and start <= ranges[0][0] < ranges[0][1] <= end and ranges[0] != (start, end)
+
+
+def test_an_unmatched_level_leaves_that_level_unconstrained(all_region_data):
+    sampler = get_location_sampler(all_region_data['VN_GENERAL'])
+    everything = [(0, len(sampler.masses))]
+    province = _province_range(sampler, 'ha noi')
+    assert sampler._ranges_for((None, 'Atlantis', None, None))[0] == everything
+    assert sampler._ranges_for(('Atlantis', None, None, None))[0] == everything
+    assert sampler._ranges_for((None, 'ha noi', 'Nowhere District', None))[0] == [province]
+    assert sampler._ranges_for((None, 'ha noi', None, 'Nowhere Ward'))[0] == [province]
+    # A district that exists, but in another province, does not match inside Hà Nội either
+    other = sampler._nodes(1, 'hai phong')[0].unit['administrative_units'][0]['name']
+    assert sampler._ranges_for((None, 'ha noi', other, None))[0] == [province]
+    # A level that matches still narrows below an unmatched one
+    assert sampler._ranges_for(('Atlantis', 'ha noi', None, None))[0] == [province]
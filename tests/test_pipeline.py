@@ -0,0 +1,155 @@
+import datetime
+import glob
+import gzip
+import hashlib
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import REPO_ROOT
+from profile_generator import generate_fake_personal_info, generate_profiles_slice
+from profile_generator.pipeline import (
+    MAX_PROFILE_ATTEMPTS, MAX_STAGE_RETRIES, PROFILE_STAGES, ProfileStage, RejectionStats, generate_valid_profile, stage_rule_ids,
+)
+from profile_generator.validation import validate_profile
+from profile_generator.validation_checks.profile_checker import check_profile
+from profile_generator.validation_checks.profile_logic_checker import check_profile_logic
+from profile_generator.validation_checks.rule_engine import get_rule_set
+
+REGIONS = ['US_GENERAL', 'VN_GENERAL', 'UK_GENERAL', 'CN_GENERAL']
+
+
+def _rule_groups(constraints):
+    return ('profile', 'logic') if constraints.get('allow_unconventional') else ('profile', 'logic', 'strict')
+
+
+def _assert_consistent(profile, region_data, constraints, no_debug):
+    errors = [v for v in get_rule_set(region_data).evaluate(profile, _rule_groups(constraints)) if v.severity == 'error']
+    assert errors == [], profile
+    assert check_profile(profile, region_data, constraints, no_debug)[0]
+    assert not any(message.startswith('Error:') for message in check_profile_logic(profile, no_debug, region_data))
+    assert validate_profile(profile, region_data, constraints, no_debug)[0]
+
+
+@pytest.mark.parametrize('region', REGIONS)
+@pytest.mark.parametrize('overrides', [{}, {'allow_unconventional': True}, {'age_range': '10-20'}, {'age_range': '80-100'}])
+def test_valid_only_profiles_pass_every_rule(all_region_data, make_constraints, no_debug, region, overrides):
+    region_data = all_region_data[region]
+    constraints = make_constraints(region=region, valid_only=True, **overrides)
+    stats = RejectionStats()
+    profiles = list(generate_profiles_slice(region_data, constraints, 9, 0, 60, no_debug, stats=stats))
+    profiles += [generate_fake_personal_info(region_data, constraints, no_debug, True, stats) for _ in range(20)]
+    for profile in profiles:
+        _assert_consistent(profile, region_data, constraints, no_debug)
+    assert stats.accepted == len(profiles)
+    # Every stage runs at least once per accepted profile, plus once per rejection it caused
+    rejections_by_stage = {}
+    for rule_id, count in stats.rejections.items():
+        rejections_by_stage[stats.rule_stage[rule_id]] = rejections_by_stage.get(stats.rule_stage[rule_id], 0) + count
+    for stage in PROFILE_STAGES:
+        assert stats.stage_runs[stage.name] >= stats.accepted + rejections_by_stage.get(stage.name, 0)
+
+
+def test_rules_are_checked_after_the_stage_completing_their_inputs(all_region_data):
+    rule_set = get_rule_set(all_region_data['US_GENERAL'])
+    assigned = stage_rule_ids(rule_set, ('profile', 'logic', 'strict'))
+    assert set().union(*assigned) == {rule.id for rule in rule_set.select(('profile', 'logic', 'strict'))}
+    names = [stage.name for stage in PROFILE_STAGES]
+    stage_of = {rule_id: names[i] for i, ids in enumerate(assigned) for rule_id in ids}
+    assert stage_of['single_with_children'] == 'family'
+    assert stage_of['age_dob_mismatch'] == 'core'
+    assert stage_of['invalid_email'] == 'contact'
+
+
+def _scripted_stages(family_outputs):
+    """A core, family and contact pipeline whose family stage returns `family_outputs` in turn."""
+    dob = datetime.date.today().replace(year=datetime.date.today().year - 41, month=1, day=1)
+    fixed = {'first_name': 'Ann', 'last_name': 'Lee', 'age': 41, 'dob': dob.isoformat(), 'gender': 'female'}
+    outputs = iter(family_outputs)
+    return (
+        ProfileStage('core', tuple(fixed), lambda *args: dict(fixed)),
+        ProfileStage('family', ('marital_status', 'children'), lambda *args: dict(next(outputs))),
+        ProfileStage('contact', ('email', 'phone_number'), lambda *args: {'email': 'ann@example.com', 'phone_number': '555 0100'}),
+    )
+
+
+SINGLE_PARENT = {'marital_status': 'Single', 'children': 2} # Rejected by single_with_children in strict mode
+MARRIED = {'marital_status': 'Married', 'children': 1}
+
+
+def test_stats_add_up_for_stage_retries(all_region_data, no_debug):
+    region_data = all_region_data['US_GENERAL']
+    stages = _scripted_stages([SINGLE_PARENT, SINGLE_PARENT, MARRIED] * 4)
+    stats = RejectionStats()
+    for _ in range(4):
+        profile = generate_valid_profile(region_data, {}, no_debug, stats, stages)
+        assert profile['marital_status'] == 'Married'
+    assert stats.accepted == 4 and stats.restarts == 0
+    assert stats.stage_runs == {'core': 4, 'family': 12, 'contact': 4}
+    assert stats.rejections == {'single_with_children': 8}
+    assert stats.rule_stage == {'single_with_children': 'family'}
+    assert stats.rejection_rates() == {'single_with_children': 8 / 12}
+    assert stats.summary_lines() == [
+        'Accepted profiles: 4, full restarts: 0',
+        'single_with_children (family): rejected 8 times, 66.67% of runs',
+    ]
+
+
+def test_a_stage_failing_every_retry_restarts_the_profile(all_region_data, no_debug):
+    region_data = all_region_data['US_GENERAL']
+    stages = _scripted_stages([SINGLE_PARENT] * (MAX_STAGE_RETRIES + 1) + [MARRIED])
+    stats = RejectionStats()
+    generate_valid_profile(region_data, {}, no_debug, stats, stages)
+    assert stats.accepted == 1 and stats.restarts == 1
+    assert stats.stage_runs == {'core': 2, 'family': MAX_STAGE_RETRIES + 2, 'contact': 1}
+    assert stats.rejections == {'single_with_children': MAX_STAGE_RETRIES + 1}
+
+
+def test_contradictory_constraints_give_up_after_max_attempts(all_region_data, no_debug):
+    region_data = all_region_data['US_GENERAL']
+    attempts = MAX_PROFILE_ATTEMPTS * (MAX_STAGE_RETRIES + 1)
+    stages = _scripted_stages([SINGLE_PARENT] * attempts)
+    stats = RejectionStats()
+    with pytest.raises(ValueError, match='single_with_children'):
+        generate_valid_profile(region_data, {}, no_debug, stats, stages)
+    assert stats.accepted == 0 and stats.restarts == MAX_PROFILE_ATTEMPTS
+    assert stats.stage_runs == {'core': MAX_PROFILE_ATTEMPTS, 'family': attempts}
+    assert stats.rejections == {'single_with_children': attempts}
+    # allow_unconventional drops the strict rules, so the same output is accepted
+    stats = RejectionStats()
+    generate_valid_profile(region_data, {'allow_unconventional': True}, no_debug, stats, _scripted_stages([SINGLE_PARENT]))
+    assert stats.accepted == 1 and stats.rejections == {}
+
+
+def test_merged_stats_are_the_sum_of_their_parts(all_region_data, no_debug):
+    region_data = all_region_data['US_GENERAL']
+    first, second = RejectionStats(), RejectionStats()
+    generate_valid_profile(region_data, {}, no_debug, first, _scripted_stages([SINGLE_PARENT, MARRIED]))
+    generate_valid_profile(region_data, {}, no_debug, second, _scripted_stages([SINGLE_PARENT] * (MAX_STAGE_RETRIES + 1) + [MARRIED]))
+    first.merge(second)
+    assert first.accepted == 2 and first.restarts == 1
+    assert first.stage_runs == {'core': 3, 'family': MAX_STAGE_RETRIES + 4, 'contact': 2}
+    assert first.rejections == {'single_with_children': MAX_STAGE_RETRIES + 2}
+
+
+def test_valid_only_cli_output_passes_every_rule(tmp_path, all_region_data, make_constraints, no_debug):
+    env = dict(os.environ, FAKER_MAKER_API_KEY='k', FAKER_MAKER_API_KEY_SHA256=hashlib.sha256(b'k').hexdigest())
+    result = subprocess.run(
+        [sys.executable, 'main.py', '--non-interactive', '--valid-only', '--region', 'VN_GENERAL', '--num-profiles', '150',
+         '--output-format', 'json', '--output-dir', str(tmp_path), '--shard-rows', '100', '--seed', '4'],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert 'Accepted profiles: 150' in result.stdout
+    profiles = []
+    for path in sorted(glob.glob(os.path.join(str(tmp_path), '*.ndjson.gz'))):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            profiles.extend(json.loads(line) for line in f)
+    assert len(profiles) == 150
+    region_data = all_region_data['VN_GENERAL']
+    constraints = make_constraints(region='VN_GENERAL')
+    for profile in profiles:
+        _assert_consistent(profile, region_data, constraints, no_debug)
@@ -0,0 +1,110 @@
+import copy
+import datetime
+import os
+
+import pytest
+
+from profile_generator import generate_profiles_slice
+from utils import profile_cache
+from utils.profile_cache import ProfileCache
+
+
+@pytest.fixture
+def region_data(all_region_data):
+    return all_region_data['US_GENERAL']
+
+
+def _entry_files(cache):
+    return [path for _, _, path in cache._entries()]
+
+
+def test_miss_then_hit_returns_the_generated_profiles(tmp_path, region_data, make_constraints, no_debug):
+    cache = ProfileCache(str(tmp_path))
+    constraints = make_constraints(num_profiles=20)
+    expected = list(generate_profiles_slice(region_data, constraints, 3, 5, 20, no_debug))
+
+    profiles, hit = cache.profiles_slice(region_data, constraints, 3, 5, 20, no_debug)
+    assert not hit and list(profiles) == expected
+    profiles, hit = cache.profiles_slice(region_data, constraints, 3, 5, 20, no_debug)
+    assert hit and list(profiles) == expected
+
+    stats = cache.stats()
+    assert (stats['entries'], stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 1, 0.5)
+
+
+def test_key_ignores_output_format_but_not_generation_settings(region_data, make_constraints, tmp_path):
+    cache = ProfileCache(str(tmp_path))
+    base = cache.key(region_data, make_constraints(num_profiles=5), 1)
+    assert cache.key(region_data, make_constraints(num_profiles=5, output_format='csv'), 1) == base
+    assert cache.key(region_data, make_constraints(num_profiles=6), 1) != base
+    assert cache.key(region_data, make_constraints(num_profiles=5, valid_only=True), 1) != base
+    assert cache.key(region_data, make_constraints(num_profiles=5), 2) != base
+    assert cache.key(region_data, make_constraints(num_profiles=5), 1, start_index=1) != base
+
+
+def test_key_changes_with_code_data_and_year(region_data, make_constraints, tmp_path, monkeypatch):
+    cache = ProfileCache(str(tmp_path))
+    constraints = make_constraints(num_profiles=5)
+    base = cache.key(region_data, constraints, 1)
+
+    changed_data = copy.deepcopy(region_data)
+    changed_data['region_name'] = 'Somewhere else'
+    assert cache.key(changed_data, constraints, 1) != base
+
+    monkeypatch.setattr(profile_cache, '_code_version', 'another build')
+    assert cache.key(region_data, constraints, 1) != base
+    monkeypatch.undo()
+    assert cache.key(region_data, constraints, 1) == base
+
+    next_new_year = datetime.date(datetime.date.today().year + 1, 1, 1)
+    class NextYear(datetime.date):
+        @classmethod
+        def today(cls):
+            return next_new_year
+    monkeypatch.setattr(profile_cache.datetime, 'date', NextYear)
+    assert cache.key(region_data, constraints, 1) != base
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, region_data, make_constraints, no_debug):
+    cache = ProfileCache(str(tmp_path))
+    constraints = make_constraints(num_profiles=10)
+    for seed in (1, 2, 3):
+        list(cache.profiles_slice(region_data, constraints, seed, 0, 10, no_debug)[0])
+    first, second, third = (cache.path(cache.key(region_data, constraints, seed)) for seed in (1, 2, 3))
+    for age, path in enumerate((third, second, first)): # seed 1 oldest, then 2, then 3
+        os.utime(path, (1_000_000 - age * 100, 1_000_000 - age * 100))
+
+    list(cache.profiles_slice(region_data, constraints, 1, 0, 10, no_debug)[0]) # A hit makes seed 1 the newest
+    cache.max_bytes = os.path.getsize(first) + os.path.getsize(third) + 1
+    assert cache.evict() == 1
+    assert sorted(_entry_files(cache)) == sorted([first, third])
+    assert cache.stats()['evictions'] == 1
+
+
+def test_an_entry_is_only_added_once_complete(tmp_path, region_data, make_constraints, no_debug):
+    cache = ProfileCache(str(tmp_path))
+    constraints = make_constraints(num_profiles=10)
+    profiles, hit = cache.profiles_slice(region_data, constraints, 9, 0, 10, no_debug)
+    next(profiles)
+    next(profiles)
+    profiles.close() # The consumer went away after two profiles
+    assert _entry_files(cache) == []
+    assert [name for _, _, names in os.walk(str(tmp_path)) for name in names if name.endswith('.tmp')] == []
+    assert not cache.profiles_slice(region_data, constraints, 9, 0, 10, no_debug)[1]
+
+
+def test_server_streams_hits_from_the_cache_and_drops_cut_short_streams(tmp_path, no_debug):
+    from server import GenerationService
+    from conftest import DATA_DIR
+    service = GenerationService(DATA_DIR, no_debug, ProfileCache(str(tmp_path)))
+    constraints, seed, start_index = service.build_request({'region': 'US_GENERAL', 'num_profiles': 100, 'seed': 4})
+
+    body = service.generate_ndjson(constraints, seed, start_index)
+    next(body)
+    body.close() # Client disconnected mid-stream
+    assert _entry_files(service.cache) == []
+
+    generated = b''.join(service.generate_ndjson(constraints, seed, start_index))
+    cached = b''.join(service.generate_ndjson(constraints, seed, start_index))
+    assert cached == generated and generated.count(b'\n') == 100
+    assert (service.metrics['cache_hits_total'], service.metrics['cache_misses_total']) == (1, 2)
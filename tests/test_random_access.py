@@ -0,0 +1,58 @@
+import random
+import sys
+import threading
+
+from profile_generator import generate_profile_at, generate_profiles_slice, profile_seed
+
+
+def _slice(region_data, constraints, seed, start, count, no_debug):
+    return list(generate_profiles_slice(region_data, constraints, seed, start, count, no_debug))
+
+
+def test_profile_seed_depends_on_seed_region_and_index():
+    seeds = {profile_seed(1, 'US_GENERAL', 0), profile_seed(2, 'US_GENERAL', 0),
+             profile_seed(1, 'VN_GENERAL', 0), profile_seed(1, 'US_GENERAL', 1)}
+    assert len(seeds) == 4
+    assert profile_seed(1, 'US_GENERAL', 0) == profile_seed(1, 'US_GENERAL', 0)
+
+
+def test_slice_matches_the_same_range_of_a_full_run(all_region_data, make_constraints, no_debug):
+    constraints = make_constraints(num_profiles=60)
+    region_data = all_region_data['US_GENERAL']
+    full = _slice(region_data, constraints, 42, 0, 60, no_debug)
+    assert _slice(region_data, constraints, 42, 25, 20, no_debug) == full[25:45]
+    assert generate_profile_at(region_data, constraints, 42, 59, no_debug) == full[59]
+    assert _slice(region_data, constraints, 43, 0, 60, no_debug) != full
+
+
+def test_seeded_generation_is_deterministic_across_threads(all_region_data, make_constraints, no_debug):
+    constraints = make_constraints(num_profiles=150, include_unconventional=True,
+                                   unconventional_data_selection=['personality_traits', 'life_events'])
+    region_data = all_region_data['US_GENERAL']
+    expected = {seed: _slice(region_data, constraints, seed, 0, 150, no_debug) for seed in (1, 2)}
+
+    results = {}
+    def run(seed):
+        results[seed] = _slice(region_data, constraints, seed, 0, 150, no_debug)
+    def unseeded():
+        from profile_generator import generate_fake_personal_info
+        for _ in range(150):
+            generate_fake_personal_info(region_data, constraints, no_debug)
+    threads = [threading.Thread(target=run, args=(seed,)) for seed in (1, 2)] + [threading.Thread(target=unseeded)]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5) # Switch threads often, so the generators interleave mid-profile
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert results == expected
+
+
+def test_seeded_generation_leaves_the_shared_generator_alone(all_region_data, make_constraints, no_debug):
+    random.seed(1234)
+    state = random.getstate()
+    generate_profile_at(all_region_data['US_GENERAL'], make_constraints(), 7, 0, no_debug)
+    assert random.getstate() == state
@@ -0,0 +1,104 @@
+import pickle
+import struct
+
+import pytest
+
+from profile_generator.core.name import build_name_tables, get_name_tables
+from profile_generator.location_generator import get_location_sampler
+from profile_generator.random_access import generate_profiles_slice
+from profile_generator.region_pack import (
+    PACK_VERSION, PACKED_KEYS, RegionPack, open_region_pack, packed_region_data, write_region_pack,
+)
+
+REGIONS = ['US_GENERAL', 'VN_GENERAL', 'UK_GENERAL', 'CN_GENERAL']
+
+
+@pytest.fixture(params=REGIONS)
+def packed(request, all_region_data, tmp_path):
+    region_data = all_region_data[request.param]
+    path = tmp_path / 'region.pack'
+    write_region_pack(region_data, str(path))
+    pack = RegionPack(str(path))
+    yield region_data, packed_region_data(region_data, pack)
+    pack.close()
+
+
+def _without_subtree(province):
+    return None if province is None else {k: v for k, v in province.items() if k != 'administrative_units'}
+
+
+def test_name_tables_round_trip(packed):
+    region_data, light = packed
+    expected = build_name_tables(region_data)
+    tables = get_name_tables(light)
+    assert tables.keys() == expected.keys()
+    for key, sampler in expected.items():
+        if sampler is None:
+            assert tables[key] is None
+        else:
+            assert list(tables[key].names[i] for i in range(len(tables[key]))) == list(sampler.names)
+            assert list(tables[key].cum_weights) == list(sampler.cum_weights)
+
+
+def test_address_tables_round_trip(packed):
+    region_data, light = packed
+    expected, sampler = get_location_sampler(region_data), get_location_sampler(light)
+    n = len(expected.addresses)
+    assert [sampler.addresses[i] for i in range(n)] == expected.addresses
+    assert [sampler.streets[i] for i in range(n)] == expected.streets
+    assert [sampler.cities[i] for i in range(n)] == expected.cities
+    assert [sampler.provinces[i] for i in range(n)] == [_without_subtree(p) for p in expected.provinces]
+    assert list(sampler.cum_masses) == expected.cum_masses
+    assert sampler.masses == pytest.approx(expected.masses, abs=1e-15)
+    assert list(sampler.table.probability) == expected.table.probability
+    assert list(sampler.table.alias) == expected.table.alias
+    for level_index, expected_index in zip(sampler.index, expected.index):
+        assert level_index.keys() == expected_index.keys()
+        for key, nodes in expected_index.items():
+            assert [(n.unit['name'], n.start, n.end) for n in level_index[key]] == [(n.unit['name'], n.start, n.end) for n in nodes]
+
+
+def test_packed_region_data_drops_the_packed_tables(packed):
+    region_data, light = packed
+    assert not set(PACKED_KEYS) & set(light)
+    assert set(region_data) - set(PACKED_KEYS) <= set(light)
+
+
+@pytest.mark.parametrize('location', [{}, {'province': 'ha noi'}, {'region': 'The West'}])
+def test_seeded_profiles_are_the_same_with_and_without_the_pack(packed, make_constraints, no_debug, location):
+    region_data, light = packed
+    constraints = make_constraints(region=region_data['region_id'], location=location)
+    assert list(generate_profiles_slice(light, constraints, 21, 0, 40, no_debug)) == \
+        list(generate_profiles_slice(region_data, constraints, 21, 0, 40, no_debug))
+
+
+def test_packs_pickle_as_their_path(all_region_data, tmp_path):
+    path = str(tmp_path / 'region.pack')
+    write_region_pack(all_region_data['UK_GENERAL'], path)
+    pack = open_region_pack(path)
+    assert open_region_pack(path) is pack
+    assert len(pickle.dumps(pack)) < 1024
+    assert pickle.loads(pickle.dumps(pack)) is pack
+
+
+def _write_bytes(tmp_path, data):
+    path = tmp_path / 'bad.pack'
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_files_that_are_not_packs_are_rejected(all_region_data, tmp_path):
+    with pytest.raises(ValueError, match='not a region pack'):
+        RegionPack(_write_bytes(tmp_path, b'{"regions": []}' + b' ' * 64))
+    with pytest.raises(ValueError, match='not a region pack'):
+        RegionPack(_write_bytes(tmp_path, b'FMR'))
+    path = str(tmp_path / 'region.pack')
+    write_region_pack(all_region_data['CN_GENERAL'], path)
+    with open(path, 'rb') as f:
+        data = bytearray(f.read())
+    struct.pack_into('<H', data, 8, PACK_VERSION + 1)
+    with pytest.raises(ValueError, match=f'version {PACK_VERSION + 1}'):
+        RegionPack(_write_bytes(tmp_path, bytes(data)))
+    struct.pack_into('<HB', data, 8, PACK_VERSION, data[10] ^ 1)
+    with pytest.raises(ValueError, match='byte order'):
+        RegionPack(_write_bytes(tmp_path, bytes(data)))
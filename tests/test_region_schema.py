@@ -0,0 +1,101 @@
+import copy
+
+import pytest
+
+from utils.region_schema import DEFAULT_LEGAL_MARRIAGE_AGE, DEFAULT_MARK_PROBABILITIES, RegionDataError, validate_region_data
+
+REGIONS = ['US_GENERAL', 'VN_GENERAL', 'UK_GENERAL', 'CN_GENERAL']
+
+
+@pytest.fixture
+def region_data(all_region_data):
+    return copy.deepcopy(all_region_data['US_GENERAL'])
+
+
+@pytest.mark.parametrize('region', REGIONS)
+def test_shipped_regions_are_valid_and_already_normalized(all_region_data, region):
+    loaded = all_region_data[region]
+    again = copy.deepcopy(loaded)
+    assert validate_region_data(again) is again
+    assert again == loaded
+
+
+def test_optional_sections_and_shapes_are_normalized(region_data):
+    for key in ('middle_names', 'hobbies_rules', 'skills_interests_rules', 'family_details_rules',
+                'physical_characteristics_rules', 'email_rules', 'phone_number_formats', 'legal_marriage_age'):
+        region_data.pop(key, None)
+    occupations = region_data['occupations']
+    region_data['occupations'] = {'occupations': occupations}
+    for occupation in occupations:
+        occupation.pop('gender_bias', None)
+    region_data['hobbies_rules'] = {'age_based_hobbies': [{'age_range': [5, 12], 'hobbies': ['Drawing', {'name': 'Chess'}]}]}
+    region_data['skills_interests_rules'] = {'age_based_skills': [{'age_range': [18, 65], 'skills': ['Welding']}], 'interests': ['Jazz']}
+
+    validate_region_data(region_data)
+
+    assert region_data['occupations'] is occupations and all(occ['gender_bias'] == {} for occ in occupations)
+    assert region_data['middle_names'] == [] and region_data['phone_number_formats'] == []
+    assert region_data['email_rules'] == {} and region_data['legal_marriage_age'] == DEFAULT_LEGAL_MARRIAGE_AGE
+    assert region_data['family_details_rules'] == {'marital_status_rules': [], 'children_info_rules': []}
+    assert region_data['hobbies_rules']['age_based_hobbies'][0]['hobbies'] == [{'name': 'Drawing'}, {'name': 'Chess'}]
+    assert region_data['skills_interests_rules']['age_based_skills'][0]['skills'] == [{'name': 'Welding'}]
+    assert region_data['physical_characteristics_rules']['distinguishing_mark_probabilities'] == DEFAULT_MARK_PROBABILITIES
+
+
+def _set(data, path, value):
+    *parents, last = path
+    for key in parents:
+        data = data[key]
+    if value is _DELETE:
+        del data[last]
+    else:
+        data[last] = value
+
+
+_DELETE = object()
+
+
+@pytest.mark.parametrize('path, value, problem', [
+    (('first_names_male',), _DELETE, 'first_names_male: missing'),
+    (('last_names',), [], 'last_names: must not be empty'),
+    (('first_names_female',), 'Ann', 'first_names_female: expected a list, got str'),
+    (('first_names_female', 0, 'weight'), 'heavy', 'first_names_female[0].weight: unexpected type str'),
+    (('first_names_female', 0, 'weight'), True, 'first_names_female[0].weight: unexpected type bool'),
+    (('middle_names', 0), 'Lee', 'middle_names[0]: expected an object, got str'),
+    (('occupations', 0, 'min_age'), _DELETE, "occupations[0]: missing 'min_age'"),
+    (('occupations',), [], 'occupations: must not be empty'),
+    (('physical_characteristics',), _DELETE, 'physical_characteristics: missing'),
+    (('physical_characteristics', 'eye_colors'), [], 'physical_characteristics.eye_colors: must not be empty'),
+    (('physical_characteristics', 'height_ranges_cm', 'male'), {'min': 190, 'max': 150}, 'physical_characteristics.height_ranges_cm.male: expected'),
+    (('physical_characteristics_rules', 'hair_color_rules'), [{'age_range': [60, 20]}], 'physical_characteristics_rules.hair_color_rules[0].age_range'),
+    (('hobbies_rules', 'age_based_hobbies'), [{'age_range': 'adult', 'hobbies': []}], 'hobbies_rules.age_based_hobbies[0].age_range'),
+    (('hobbies_rules', 'age_based_hobbies'), [{'age_range': [5, 9], 'hobbies': [3]}], 'hobbies_rules.age_based_hobbies[0].hobbies[0]: expected an object, got int'),
+    (('skills_interests_rules', 'interests'), ['Jazz', 7], 'skills_interests_rules.interests[1]: expected a string, got int'),
+    (('legal_marriage_age',), '18', 'legal_marriage_age: expected an integer'),
+    (('family_details_rules', 'marital_status_rules'), [{'age_range': [18, 30]}], "family_details_rules.marital_status_rules[0]: missing 'status_weights'"),
+    (('unconventional_data_rules',), _DELETE, 'unconventional_data_rules: missing'),
+    (('unconventional_data_rules', 'personality_traits'), [], 'unconventional_data_rules.personality_traits: must not be empty'),
+    (('unconventional_data_rules', 'life_events'), [{'age_range': [1, 2]}], "unconventional_data_rules.life_events[0]: missing 'event'"),
+    (('phone_number_formats',), ['###', None], 'phone_number_formats[1]: expected a string, got NoneType'),
+    (('email_rules',), ['gmail.com'], 'email_rules: expected an object, got list'),
+    (('address_data',), _DELETE, 'address_data: missing'),
+    (('address_data', 'regions'), [], 'address_data.regions: must not be empty'),
+    (('address_data', 'regions', 0, 'name'), 5, 'address_data.regions[0].name: unexpected type int'),
+])
+def test_malformed_sections_are_reported(region_data, path, value, problem):
+    _set(region_data, path, value)
+    with pytest.raises(RegionDataError) as excinfo:
+        validate_region_data(region_data, 'us_general.json')
+    assert any(p.startswith(problem) for p in excinfo.value.problems), excinfo.value.problems
+    assert isinstance(excinfo.value, ValueError)
+    assert excinfo.value.source == 'us_general.json'
+    assert str(excinfo.value).startswith('Invalid region data in us_general.json:\n  - ')
+
+
+def test_every_problem_is_listed_at_once(region_data):
+    del region_data['last_names']
+    region_data['occupations'] = []
+    region_data['legal_marriage_age'] = 'adult'
+    with pytest.raises(RegionDataError) as excinfo:
+        validate_region_data(region_data)
+    assert excinfo.value.problems == ['last_names: missing', 'occupations: must not be empty', 'legal_marriage_age: expected an integer']
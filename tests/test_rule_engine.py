@@ -0,0 +1,157 @@
+import copy
+import json
+import os
+import random
+
+import pytest
+
+import legacy_consistency_checks as legacy
+from conftest import DATA_DIR
+from profile_generator import generate_profiles_slice
+from profile_generator.validation import validate_profile
+from profile_generator.validation_checks.batch_validator import to_columns, validate_batch
+from profile_generator.validation_checks.profile_checker import check_profile
+from profile_generator.validation_checks.profile_logic_checker import check_profile_logic
+from profile_generator.validation_checks.rule_engine import get_rule_set
+
+REGIONS = ['US_GENERAL', 'VN_GENERAL', 'UK_GENERAL', 'CN_GENERAL']
+with open(os.path.join(DATA_DIR, 'consistency_rules.json'), encoding='utf-8') as f:
+    ALIASES = json.load(f)['aliases']
+
+_DELETE = object()
+
+# Single-field corruptions; each profile gets a few random combinations of them. Values have
+# the types the generator produces: the old checks raised or misreported on e.g. a string age.
+CORRUPTIONS = [
+    ('age', _DELETE), ('first_name', None), ('gender', _DELETE), ('age', 5), ('age', 10), ('age', 14), ('age', 90),
+    ('dob', '1990-13-40'), ('dob', None), ('dob', '2020-01-01'),
+    ('email', _DELETE), ('email', 'not-an-email'), ('phone_number', _DELETE), ('phone_number', 'call me'),
+    ('marital_status', 'married'), ('marital_status', 'divorced'), ('marital_status', 'Single'), ('children', 2),
+    ('education_index', 5), ('education_index', 14), ('education_index', 20), ('education_level', 'Masters'),
+    ('life_events', ['Started a business', 'Had first child', 'Became a grandparent']),
+    ('personality_trait', 'Reserved'), ('personality_trait', 'Energetic'),
+    ('online_behavior', 'Content creator'), ('online_behavior', 'Lurker'),
+    ('digital_native_score', 10), ('digital_native_score', 90), ('texting_typing_style', 'Uses emojis heavily'),
+    ('internal_consistency', 5), ('culture_exposure_level', 90), ('geo_mobility_index', 10),
+    ('occupation', 'Doctor'), ('occupation', 'CEO'), ('occupation', 'Student'), ('skills', ['knitting']),
+    ('hair_color', 'Grey'), ('exceptionality_score', 95), ('self_memory_accuracy', 10),
+]
+
+
+def _set(profile, field, value):
+    for key in [key for key in profile if key.lower() == field]:
+        del profile[key]
+    if value is not _DELETE:
+        profile[field] = value
+
+
+def _legacy_view(profile):
+    """
+    The profile as the old checks expected to read it. They looked fields up by spellings the
+    generator never produced (personalitytrait, lifeevents, 'physical description' ...), so on
+    generated profiles most of them never fired; the rule set reads the generator's own keys
+    through its aliases. They also matched marital statuses in lower case only.
+    """
+    view = copy.deepcopy(profile)
+    for field, spellings in ALIASES.items():
+        if field == 'email':
+            continue # check_profile read 'Email' case-insensitively already
+        for key in [key for key in view if key.lower() == field]:
+            view[spellings[-1]] = view.pop(key)
+    if 'hair_color' in view:
+        view['physical description'] = {'hair_color': view['hair_color']}
+    if isinstance(view.get('marital_status'), str):
+        view['marital_status'] = view['marital_status'].lower()
+    return view
+
+
+def _profiles(region_data, constraints, no_debug, seed):
+    generator = random.Random(seed)
+    profiles = []
+    for profile in generate_profiles_slice(region_data, constraints, seed, 0, 40, no_debug):
+        profiles.append(profile)
+        for _ in range(6):
+            corrupted = copy.deepcopy(profile)
+            for field, value in generator.sample(CORRUPTIONS, generator.randint(1, 4)):
+                _set(corrupted, field, value)
+            profiles.append(corrupted)
+    return profiles
+
+
+@pytest.fixture(params=[(region, allow) for region in REGIONS for allow in (False, True)], ids=lambda p: f"{p[0]}-{p[1]}")
+def case(request, all_region_data, make_constraints, no_debug):
+    region, allow_unconventional = request.param
+    region_data = all_region_data[region]
+    constraints = make_constraints(region=region, allow_unconventional=allow_unconventional)
+    return region_data, constraints, _profiles(region_data, constraints, no_debug, seed=len(region) + allow_unconventional)
+
+
+def _legacy_logic_has_errors(profile, no_debug):
+    return any(message.startswith('Error:') for message in legacy.check_profile_logic(_legacy_view(profile), no_debug))
+
+
+def test_check_profile_accepts_and_rejects_like_the_old_checks(case, no_debug):
+    region_data, constraints, profiles = case
+    rejected = 0
+    for profile in profiles:
+        expected = legacy.check_profile(_legacy_view(profile), region_data, constraints, no_debug)[0]
+        assert check_profile(profile, region_data, constraints, no_debug)[0] == expected, profile
+        rejected += not expected
+    assert 0 < rejected < len(profiles)
+
+
+def test_check_profile_logic_reports_errors_like_the_old_checks(case, no_debug):
+    region_data, _, profiles = case
+    flagged = 0
+    for profile in profiles:
+        expected = _legacy_logic_has_errors(profile, no_debug)
+        messages = check_profile_logic(profile, no_debug, region_data)
+        assert any(message.startswith('Error:') for message in messages) == expected, (profile, messages)
+        flagged += expected
+    assert 0 < flagged < len(profiles)
+
+
+def test_validate_profile_accepts_and_rejects_like_the_old_checks(case, no_debug):
+    region_data, constraints, profiles = case
+    for profile in profiles:
+        try:
+            expected = legacy.validate_profile(profile, region_data, constraints, no_debug)[0]
+        except (KeyError, TypeError):
+            continue # The old check crashed on profiles without an age
+        assert validate_profile(profile, region_data, constraints, no_debug)[0] == expected, profile
+
+
+def test_validate_batch_agrees_with_the_single_profile_checks(case, no_debug):
+    region_data, constraints, profiles = case
+    rule_set = get_rule_set(region_data)
+    result = validate_batch(profiles, region_data)
+    from_columns = validate_batch(to_columns(profiles, region_data), region_data)
+    assert result.num_profiles == from_columns.num_profiles == len(profiles)
+    assert result.errors == from_columns.errors
+    invalid = result.invalid_mask()
+    for i, profile in enumerate(profiles):
+        valid = check_profile(profile, region_data, constraints, no_debug)[0]
+        logic_errors = any(message.startswith('Error:') for message in check_profile_logic(profile, no_debug, region_data))
+        assert bool(invalid[i]) == (not valid or logic_errors), profile
+        error_rules = {v.rule_id for v in rule_set.evaluate(profile, groups=('profile', 'logic')) if v.severity == 'error'}
+        assert set(result.failing_rules(i)) == error_rules
+    assert result.num_valid() == len(profiles) - len(result.failing_indices())
+    assert sum(result.summary().values()) >= len(result.failing_indices())
+
+
+def test_marriage_age_is_a_logic_check_only(all_region_data, make_constraints, no_debug):
+    region_data = all_region_data['US_GENERAL']
+    constraints = make_constraints()
+    profile = next(iter(generate_profiles_slice(region_data, constraints, 1, 0, 1, no_debug)))
+    _set(profile, 'age', 14)
+    _set(profile, 'dob', None)
+    _set(profile, 'marital_status', 'Married')
+    assert check_profile(profile, region_data, constraints, no_debug)[0]
+    assert any(message.startswith('Error: Marital status') for message in check_profile_logic(profile, no_debug, region_data))
+
+
+def test_invalid_dob_needs_an_age_in_the_logic_checks(all_region_data, no_debug):
+    region_data = all_region_data['US_GENERAL']
+    assert check_profile_logic({'dob': 'soon'}, no_debug, region_data) == []
+    assert legacy.check_profile_logic({'dob': 'soon'}, no_debug) == []
+    assert check_profile_logic({'dob': 'soon', 'age': 30}, no_debug, region_data) == ['Error: Invalid DOB format: soon. Must be YYYY-MM-DD.']
@@ -0,0 +1,124 @@
+import hashlib
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from conftest import DATA_DIR, REPO_ROOT
+from profile_generator import generate_profiles_slice
+from server import PROFILES_PER_CHUNK, GenerationServer, GenerationService
+
+
+@pytest.fixture(scope='module')
+def server():
+    service = GenerationService(DATA_DIR, max_profiles=500)
+    httpd = GenerationServer(('127.0.0.1', 0), service)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _request(server, method, path, body=None):
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=30)
+    try:
+        connection.request(method, path, body=json.dumps(body) if isinstance(body, dict) else body)
+        response = connection.getresponse()
+        return response.status, response.getheader('Content-Type'), response.getheader('Transfer-Encoding'), response.read()
+    finally:
+        connection.close()
+
+
+def _ndjson(data):
+    return [json.loads(line) for line in data.splitlines()]
+
+
+def test_health_and_metrics(server):
+    status, content_type, _, body = _request(server, 'GET', '/health')
+    assert (status, content_type) == (200, 'application/json')
+    assert 'US_GENERAL' in json.loads(body)['regions']
+    status, content_type, _, body = _request(server, 'GET', '/metrics')
+    assert status == 200 and content_type.startswith('text/plain')
+    assert b'faker_maker_requests_total ' in body
+
+
+@pytest.mark.parametrize('method, path, body, status', [
+    ('GET', '/nope', None, 404),
+    ('POST', '/nope', {}, 404),
+    ('POST', '/generate', b'{not json', 400),
+    ('POST', '/generate', {'region': 'ATLANTIS'}, 400),
+    ('POST', '/generate', {'region': 'US_GENERAL', 'num_profiles': 'many'}, 400),
+    ('POST', '/generate', {'region': 'US_GENERAL', 'num_profiles': -1}, 400),
+    ('POST', '/generate', {'region': 'US_GENERAL', 'num_profiles': 501}, 400),
+    ('POST', '/generate', {'region': 'US_GENERAL', 'seed': 'x'}, 400),
+    ('POST', '/generate', {'region': 'US_GENERAL', 'start_index': 5}, 400),
+])
+def test_error_status_codes(server, method, path, body, status):
+    response_status, content_type, _, response_body = _request(server, method, path, body)
+    assert (response_status, content_type) == (status, 'application/json')
+    assert 'error' in json.loads(response_body)
+
+
+def test_streams_seeded_profiles(server, make_constraints, no_debug):
+    count = PROFILES_PER_CHUNK * 2 + 5 # Several chunks plus a partial one
+    status, content_type, transfer_encoding, body = _request(
+        server, 'POST', '/generate', {'region': 'us', 'num_profiles': count, 'seed': 7, 'start_index': 3})
+    assert (status, content_type, transfer_encoding) == (200, 'application/x-ndjson', 'chunked')
+    expected = generate_profiles_slice(server.service.region_data['US_GENERAL'], make_constraints(num_profiles=count), 7, 3, count, no_debug)
+    assert _ndjson(body) == json.loads(json.dumps(list(expected)))
+
+
+def test_streams_unseeded_profiles_up_to_the_cap(server):
+    status, _, _, body = _request(server, 'POST', '/generate', {'region': 'VN_GENERAL', 'num_profiles': 500})
+    profiles = _ndjson(body)
+    assert status == 200 and len(profiles) == 500
+    assert all('error' not in profile for profile in profiles)
+
+
+def test_failure_mid_stream_ends_the_body_with_an_error_line(server, monkeypatch):
+    def failing_generate(constraints, seed=None, start_index=0):
+        for _ in range(PROFILES_PER_CHUNK + 1):
+            yield {'name': 'x'}
+        raise RuntimeError('region data went missing')
+    monkeypatch.setattr(server.service, 'generate', failing_generate)
+    status, _, _, body = _request(server, 'POST', '/generate', {'region': 'US_GENERAL', 'num_profiles': 100})
+    lines = _ndjson(body) # http.client raises IncompleteRead if the terminating chunk is missing
+    assert status == 200
+    assert lines[:PROFILES_PER_CHUNK] == [{'name': 'x'}] * PROFILES_PER_CHUNK
+    assert lines[-1] == {'error': 'Generation failed: region data went missing'}
+    # The connection is still usable afterwards
+    assert _request(server, 'GET', '/health')[0] == 200
+
+
+def _serve(env_overrides):
+    env = dict(os.environ, FAKER_MAKER_API_KEY_SHA256=hashlib.sha256(b'k').hexdigest(), **env_overrides)
+    env.pop('FAKER_MAKER_API_KEY_FILE', None)
+    return subprocess.Popen([sys.executable, 'main.py', '--serve', '--port', '0'], cwd=REPO_ROOT, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+
+def test_serve_refuses_to_start_with_a_wrong_api_key():
+    process = _serve({'FAKER_MAKER_API_KEY': 'wrong'})
+    output, _ = process.communicate(timeout=60)
+    assert process.returncode == 1
+    assert 'Invalid API key' in output
+
+
+def test_serve_starts_with_the_api_key():
+    process = _serve({'FAKER_MAKER_API_KEY': 'k'})
+    try:
+        line = process.stdout.readline()
+        assert line.startswith('Serving on http://127.0.0.1:'), line
+        port = int(line.split('http://127.0.0.1:', 1)[1].split(' ', 1)[0])
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        connection.request('GET', '/health')
+        assert connection.getresponse().status == 200
+        connection.close()
+    finally:
+        process.kill()
+        process.communicate()
@@ -0,0 +1,185 @@
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+
+import pytest
+
+from utils.sharded_output import FIRST_SIZED_CHUNK_ROWS, ShardedWriter, merge_manifests
+
+def _rows(count, width=20):
+    """Profiles whose NDJSON lines are all the same length."""
+    return [{'id': f"{i:06d}", 'text': 'x' * width} for i in range(count)]
+
+def _read(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    return gzip.decompress(data) if path.endswith('.gz') else data
+
+def _check_manifest(output_dir, manifest, manifest_name='profiles-manifest.json'):
+    """Checks the manifest on disk matches `manifest` and every shard, and returns the shards' uncompressed bytes."""
+    with open(os.path.join(output_dir, manifest_name), encoding='utf-8') as f:
+        assert json.load(f) == manifest
+    assert manifest['total_rows'] == sum(shard['rows'] for shard in manifest['shards'])
+    contents = []
+    for shard in manifest['shards']:
+        path = os.path.join(output_dir, shard['file'])
+        with open(path, 'rb') as f:
+            raw = f.read()
+        assert shard['bytes'] == len(raw)
+        assert shard['sha256'] == hashlib.sha256(raw).hexdigest()
+        data = _read(path)
+        assert shard['uncompressed_bytes'] == len(data)
+        contents.append(data)
+    assert not [name for name in os.listdir(output_dir) if name.endswith(('.part', '.tmp'))]
+    return contents
+
+def test_rotation_by_rows(tmp_path):
+    rows = _rows(35)
+    with ShardedWriter(str(tmp_path), max_rows=10) as writer:
+        writer.write_many(rows)
+    manifest = writer.manifest(complete=True)
+    assert [shard['file'] for shard in manifest['shards']] == [f"profiles-{n:05d}.ndjson.gz" for n in range(1, 5)]
+    assert [shard['rows'] for shard in manifest['shards']] == [10, 10, 10, 5]
+    assert manifest['format'] == 'ndjson' and manifest['compression'] == 'gzip' and manifest['complete']
+    contents = _check_manifest(str(tmp_path), manifest)
+    assert [json.loads(line) for data in contents for line in data.splitlines()] == rows
+    assert writer.rows_written == 35
+
+def test_rows_that_fill_the_last_shard_exactly(tmp_path):
+    with ShardedWriter(str(tmp_path), max_rows=5, compression=None) as writer:
+        writer.write_many(_rows(10))
+    manifest = writer.manifest(complete=True)
+    assert [shard['rows'] for shard in manifest['shards']] == [5, 5]
+    assert [shard['file'] for shard in manifest['shards']] == ['profiles-00001.ndjson', 'profiles-00002.ndjson']
+    _check_manifest(str(tmp_path), manifest)
+
+def test_rotation_by_bytes(tmp_path):
+    rows = _rows(500)
+    row_bytes = len(json.dumps(rows[0], separators=(',', ':'))) + 1
+    max_bytes = row_bytes * FIRST_SIZED_CHUNK_ROWS * 4 + row_bytes // 2
+    with ShardedWriter(str(tmp_path), max_bytes=max_bytes) as writer:
+        writer.write_many(rows)
+    manifest = writer.manifest(complete=True)
+    contents = _check_manifest(str(tmp_path), manifest)
+    assert [json.loads(line) for data in contents for line in data.splitlines()] == rows
+    *full, last = manifest['shards']
+    assert full
+    for shard in full:
+        # Closed at the first row that reaches max_bytes
+        assert max_bytes <= shard['uncompressed_bytes'] < max_bytes + row_bytes
+    assert 0 < last['uncompressed_bytes'] < max_bytes + row_bytes
+
+def test_rotation_by_bytes_with_uneven_rows(tmp_path):
+    rows = [{'id': i, 'text': 'y' * (i % 97)} for i in range(2000)]
+    with ShardedWriter(str(tmp_path), max_bytes=8000) as writer:
+        writer.write_many(rows)
+    manifest = writer.manifest(complete=True)
+    contents = _check_manifest(str(tmp_path), manifest)
+    assert [json.loads(line) for data in contents for line in data.splitlines()] == rows
+    for shard, data in zip(manifest['shards'][:-1], contents):
+        assert shard['uncompressed_bytes'] >= 8000
+        all_but_last_row = data.rstrip(b'\n').rsplit(b'\n', 1)[0] + b'\n'
+        assert len(all_but_last_row) < 8000
+
+def test_whichever_limit_is_reached_first(tmp_path):
+    with ShardedWriter(str(tmp_path / 'rows'), max_rows=7, max_bytes=10 ** 6) as writer:
+        writer.write_many(_rows(20))
+    assert [shard['rows'] for shard in writer.shards] == [7, 7, 6]
+    with ShardedWriter(str(tmp_path / 'bytes'), max_rows=10 ** 6, max_bytes=1000) as writer:
+        writer.write_many(_rows(100))
+    assert len(writer.shards) > 1 and all(shard['uncompressed_bytes'] >= 1000 for shard in writer.shards[:-1])
+
+def test_rotation_by_bytes_splits_csv_rows_with_newlines(tmp_path):
+    rows = [{'id': i, 'note': 'line\n' * (i % 7)} for i in range(300)]
+    with ShardedWriter(str(tmp_path), output_format='csv', columns=['id', 'note'], max_bytes=500, compression=None) as writer:
+        writer.write_many(rows)
+    manifest = writer.manifest(complete=True)
+    read_rows = []
+    for shard, data in zip(manifest['shards'], _check_manifest(str(tmp_path), manifest)):
+        shard_rows = list(csv.reader(io.StringIO(data.decode('utf-8'), newline='')))
+        assert shard_rows[0] == ['id', 'note'] and len(shard_rows) - 1 == shard['rows']
+        read_rows.extend(shard_rows[1:])
+    assert read_rows == [[str(i), 'line\n' * (i % 7)] for i in range(300)]
+    assert all(500 <= shard['uncompressed_bytes'] < 500 + 60 for shard in manifest['shards'][:-1])
+
+def test_csv_shards_each_have_the_header(tmp_path):
+    rows = [{'a': i, 'b': [i, 'é'], 'ignored': True} for i in range(12)]
+    with ShardedWriter(str(tmp_path), output_format='csv', max_rows=5, columns=['a', 'b', 'c'], compression='gzip') as writer:
+        writer.write_many(rows)
+    manifest = writer.manifest(complete=True)
+    assert manifest['format'] == 'csv' and manifest['columns'] == ['a', 'b', 'c']
+    assert [shard['file'] for shard in manifest['shards']][0] == 'profiles-00001.csv.gz'
+    read_rows = []
+    for data in _check_manifest(str(tmp_path), manifest):
+        reader = csv.reader(io.StringIO(data.decode('utf-8')))
+        assert next(reader) == ['a', 'b', 'c']
+        read_rows.extend(reader)
+    assert read_rows == [[str(i), json.dumps([i, 'é'], ensure_ascii=False, separators=(',', ':')), ''] for i in range(12)]
+
+def test_manifest_is_rewritten_after_every_shard(tmp_path):
+    seen = []
+    def on_shard_closed(writer):
+        with open(writer.manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        seen.append((manifest['complete'], manifest['total_rows'], len(manifest['shards'])))
+    writer = ShardedWriter(str(tmp_path), max_rows=4, on_shard_closed=on_shard_closed)
+    writer.write_many(_rows(10))
+    assert seen == [(False, 4, 1), (False, 8, 2)]
+    writer.close()
+    assert seen == [(False, 4, 1), (False, 8, 2)] # Not called for the final partial shard
+    _check_manifest(str(tmp_path), writer.manifest(complete=True))
+
+def test_failed_run_keeps_whole_shards(tmp_path):
+    with pytest.raises(RuntimeError):
+        with ShardedWriter(str(tmp_path), max_rows=4) as writer:
+            writer.write_many(_rows(9))
+            raise RuntimeError("generation failed")
+    manifest = writer.manifest(complete=False)
+    assert not manifest['complete']
+    assert [shard['rows'] for shard in manifest['shards']] == [4, 4, 1]
+    _check_manifest(str(tmp_path), manifest)
+
+def test_completed_shards_continue_the_numbering(tmp_path):
+    with ShardedWriter(str(tmp_path), max_rows=3) as first:
+        first.write_many(_rows(6))
+    with ShardedWriter(str(tmp_path), max_rows=3, completed_shards=first.shards) as second:
+        second.write_many(_rows(4))
+    manifest = second.manifest(complete=True)
+    assert [shard['file'] for shard in manifest['shards']] == [f"profiles-{n:05d}.ndjson.gz" for n in range(1, 5)]
+    assert manifest['total_rows'] == 10
+    _check_manifest(str(tmp_path), manifest)
+
+def test_worker_manifests_merge(tmp_path):
+    paths = []
+    for worker in range(3):
+        with ShardedWriter(str(tmp_path), max_rows=4, worker=worker) as writer:
+            writer.write_many(_rows(5 + worker))
+        paths.append(writer.manifest_path)
+    assert sorted(os.path.basename(path) for path in paths) == [f"profiles-w{w:02d}-manifest.json" for w in range(3)]
+    merged_path = str(tmp_path / 'profiles-manifest.json')
+    merged = merge_manifests(paths, merged_path)
+    assert merged['complete'] and merged['total_rows'] == 5 + 6 + 7
+    assert [shard['file'] for shard in merged['shards']][:2] == ['profiles-w00-00001.ndjson.gz', 'profiles-w00-00002.ndjson.gz']
+    _check_manifest(str(tmp_path), merged)
+
+def test_merge_rejects_mismatched_or_missing_manifests(tmp_path):
+    with ShardedWriter(str(tmp_path), max_rows=4, worker=0) as json_writer:
+        json_writer.write_many(_rows(2))
+    with ShardedWriter(str(tmp_path), output_format='csv', columns=['id'], max_rows=4, worker=1) as csv_writer:
+        csv_writer.write_many(_rows(2))
+    with pytest.raises(ValueError, match='differently formatted'):
+        merge_manifests([json_writer.manifest_path, csv_writer.manifest_path], str(tmp_path / 'merged.json'))
+    with pytest.raises(ValueError, match='No manifests'):
+        merge_manifests([], str(tmp_path / 'merged.json'))
+
+@pytest.mark.parametrize('kwargs, message', [
+    ({'output_format': 'console', 'max_rows': 1}, 'supports'),
+    ({}, 'maximum number of rows or bytes'),
+    ({'max_rows': 1, 'compression': 'brotli'}, 'Unknown compression'),
+])
+def test_invalid_settings(tmp_path, kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        ShardedWriter(str(tmp_path), **kwargs)
@@ -0,0 +1,136 @@
+import json
+import os
+import random
+from itertools import accumulate
+
+import pytest
+
+from conftest import DATA_DIR
+from profile_generator import rng
+from profile_generator.unconventional.unconventional_data import (
+    MAX_LIFE_EVENTS, NUMERICAL_HIDDEN_ATTRIBUTES, UNCONVENTIONAL_CATEGORIES, BiasedSampler,
+    generate_unconventional_data, generate_unconventional_data_batch, get_unconventional_tables,
+)
+
+with open(os.path.join(DATA_DIR, 'unconventional_data.json'), encoding='utf-8') as f:
+    RULES = json.load(f)
+CATEGORY_KEYS = ['personality_traits'] + [rules_key for _, rules_key in UNCONVENTIONAL_CATEGORIES.values()]
+
+
+def _hidden_attributes(seed):
+    generator = random.Random(seed)
+    return {attr: generator.randint(0, 1000) for attr in NUMERICAL_HIDDEN_ATTRIBUTES}
+
+
+HIDDEN_ATTRIBUTES = [_hidden_attributes(seed) for seed in range(40)] + [
+    {attr: value for attr in NUMERICAL_HIDDEN_ATTRIBUTES} for value in (0, 300, 500, 1000)
+] + [{}, None]
+
+
+def _reference_weights(options, hidden_attributes):
+    """The option weights written out directly from the rules: every matching bias multiplies in."""
+    weights = []
+    for option in options:
+        weight = 1
+        biases = option.get('hidden_attribute_biases', {}) if isinstance(option, dict) else {}
+        for attr, bias in biases.items():
+            value = (hidden_attributes or {}).get(attr)
+            if value is not None and bias['min'] <= value <= bias['max']:
+                weight *= bias['weight']
+        weights.append(weight)
+    return weights if sum(weights) > 0 else [1] * len(weights)
+
+
+def _names(options):
+    return [option['name'] if isinstance(option, dict) else option for option in options]
+
+
+class _RecordingRandom(random.Random):
+    def __init__(self):
+        super().__init__(0)
+        self.cum_weights = []
+
+    def choices(self, population, weights=None, *, cum_weights=None, k=1):
+        self.cum_weights.append((list(cum_weights), k))
+        return super().choices(population, weights, cum_weights=cum_weights, k=k)
+
+
+class _FixedRandom(random.Random):
+    """Returns `value` from random(), so sample() picks the option whose interval contains it."""
+    value = 0.0
+
+    def random(self):
+        return self.value
+
+
+@pytest.mark.parametrize('category', CATEGORY_KEYS)
+def test_sample_many_draws_from_the_same_bucket_weights_as_sample(category):
+    options = RULES[category]
+    sampler = BiasedSampler(options)
+    names = _names(options)
+    for hidden_attributes in HIDDEN_ATTRIBUTES:
+        weights = _reference_weights(options, hidden_attributes)
+        total = sum(weights)
+
+        recorder = _RecordingRandom()
+        with rng.use(recorder):
+            choices = sampler.sample_many([hidden_attributes] * 3)
+        assert recorder.cum_weights == [(list(accumulate(weights)), 3)]
+        assert set(choices) <= set(names)
+
+        fixed = _FixedRandom()
+        with rng.use(fixed):
+            low = 0
+            for name, weight in zip(names, weights):
+                if weight:
+                    fixed.value = (low + weight / 2) / total
+                    assert sampler.sample(hidden_attributes) == name
+                low += weight
+
+
+def test_sample_many_groups_profiles_by_bucket():
+    options = RULES['online_behaviors']
+    sampler = BiasedSampler(options)
+    recorder = _RecordingRandom()
+    with rng.use(recorder):
+        choices = sampler.sample_many(HIDDEN_ATTRIBUTES)
+    assert len(choices) == len(HIDDEN_ATTRIBUTES)
+    buckets = {sampler.bucket(hidden_attributes) for hidden_attributes in HIDDEN_ATTRIBUTES}
+    assert len(recorder.cum_weights) == len(buckets)
+    assert sum(k for _, k in recorder.cum_weights) == len(HIDDEN_ATTRIBUTES)
+    for hidden_attributes, choice in zip(HIDDEN_ATTRIBUTES, choices):
+        weights = _reference_weights(options, hidden_attributes)
+        assert weights[_names(options).index(choice)] > 0
+
+
+def test_empty_and_zero_weight_samplers():
+    assert BiasedSampler([]).sample({}) is None
+    assert BiasedSampler([]).sample_many([{}, {}]) == [None, None]
+    zero = BiasedSampler([{'name': name, 'hidden_attribute_biases': {'curiosity_drive': {'min': 0, 'max': 1000, 'weight': 0}}} for name in 'ab'])
+    assert {zero.sample({'curiosity_drive': 5}) for _ in range(50)} == {'a', 'b'}
+    assert set(zero.sample_many([{'curiosity_drive': 5}] * 50)) == {'a', 'b'}
+
+
+@pytest.mark.parametrize('selection', [
+    {key: True for key in ['life_events', *UNCONVENTIONAL_CATEGORIES]},
+    {'life_events': True},
+    {'device_habits': True, 'online_behaviors': False},
+    {},
+])
+def test_batch_matches_the_single_profile_fields(no_debug, selection):
+    tables = get_unconventional_tables(RULES)
+    ages = [0, 12, 18, 25, 40, 65, 90, 120, 150] * 5
+    hidden_attributes_list = HIDDEN_ATTRIBUTES[:len(ages)]
+    with rng.use(random.Random(3)):
+        batch = generate_unconventional_data_batch(RULES, ages, selection, hidden_attributes_list, no_debug)
+    assert len(batch) == len(ages)
+    for age, hidden_attributes, data in zip(ages, hidden_attributes_list, batch):
+        single = generate_unconventional_data(RULES, age, selection, hidden_attributes, no_debug)
+        assert data.keys() == single.keys()
+        if 'life_events' in data:
+            assert len(data['life_events']) <= MAX_LIFE_EVENTS
+            assert len(set(data['life_events'])) == len(data['life_events'])
+            assert set(data['life_events']) <= set(tables.life_events_at(age))
+        for selection_key, (field, _) in UNCONVENTIONAL_CATEGORIES.items():
+            if field in data:
+                assert data[field] in tables.samplers[selection_key].names
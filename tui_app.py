@@ -2,18 +2,20 @@ from textual.app import App, ComposeResult
 from textual.binding import Binding
 from textual.screen import Screen, ModalScreen
 from textual.containers import ScrollableContainer, Container, Vertical
-from textual.widgets import Button, Footer, Header, Log, Input, Select, Static
+from textual.widgets import Button, Footer, Header, Log, Input, ProgressBar, Select, Static
 from textual.events import Focus, Blur
 
 from utils.data_loader import load_regions_config
 from utils.system_checker import check_system_requirements
-from profile_generator import generate_fake_personal_info
+from profile_generator import agenerate
 from utils.data_loader import load_region_data
-import json
-import csv
+from utils.json_backend import dump_path
+from utils.csv_writer import write_profiles_csv
+import asyncio
 import os
 import io
 import contextlib
+import time
 
 # --- Screens --- #
 
@@ -31,6 +33,26 @@ class InfoModal(ModalScreen):
     def on_button_pressed(self, event: Button.Pressed) -> None:
         self.app.pop_screen()
 
+MAX_LOG_PROFILES = 200 # Profiles shown in the Log widget; larger runs are written to a file instead
+GENERATION_CHUNK_SIZE = 100 # Profiles generated (and written to the log) per batch
+
+def format_profile_lines(index, profile):
+    """Formats a profile as the lines shown in the results Log."""
+    lines = [f"--- Profile {index} ---"]
+    lines.extend(f"{key}: {value}" for key, value in profile.items())
+    lines.append("")
+    return lines
+
+def save_profiles(profiles, output_format, constraints):
+    """Writes profiles to generated_profiles/profiles.<format> and returns the file path."""
+    file_path = f"generated_profiles/profiles.{output_format}"
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    if output_format == 'json':
+        dump_path(profiles, file_path)
+    elif output_format == 'csv':
+        write_profiles_csv(profiles, file_path, constraints)
+    return file_path
+
 class GeneratorScreen(Screen):
     """The main screen for generating profiles."""
     def __init__(self, *args, **kwargs):
@@ -39,6 +61,7 @@ class GeneratorScreen(Screen):
         self.region_options = [(r['name'], r['id']) for r in self.regions]
         self.gender_options = [("Any", "any"), ("Male", "male"), ("Female", "female")]
         self.output_options = [("Console", "console"), ("JSON", "json"), ("CSV", "csv")]
+        self.generation_worker = None
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -61,23 +84,28 @@ class GeneratorScreen(Screen):
                 yield Select(self.output_options, id="output_format", value="console")
 
                 yield Button("Generate Profile(s)", id="generate", variant="primary")
+                yield Button("Cancel", id="cancel", variant="error", disabled=True)
                 yield Button("Back to Main Menu", id="back", variant="default")
 
             with ScrollableContainer(id="output-pane", can_focus=True):
                 yield Static("Generated Output")
+                yield ProgressBar(id="progress", show_eta=True)
+                yield Static("", id="throughput")
                 yield Log(id="results")
         yield Footer()
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "generate":
             self.action_generate()
+        elif event.button.id == "cancel":
+            self.action_cancel_generation()
         elif event.button.id == "back":
+            self.action_cancel_generation()
             self.app.pop_screen()
 
     def action_generate(self) -> None:
         results_log = self.query_one("#results", Log)
         results_log.clear()
-        results_log.write("Processing...")
         try:
             constraints = {
                 'num_profiles': int(self.query_one("#num_profiles", Input).value),
@@ -87,40 +115,78 @@ class GeneratorScreen(Screen):
                 'output_format': self.query_one("#output_format", Select).value,
                 'mode': '2',
             }
-            if constraints['region'] is None:
-                results_log.write("Error: Please select a region.")
-                return
+        except ValueError:
+            results_log.write("Error: Number of profiles must be a whole number.")
+            return
+        if constraints['region'] is None or constraints['region'] == Select.BLANK:
+            results_log.write("Error: Please select a region.")
+            return
+
+        results_log.write("Processing...")
+        self.generation_worker = self.run_worker(
+            self.run_generation(constraints), group="generate", exclusive=True, exit_on_error=False
+        )
 
+    def action_cancel_generation(self) -> None:
+        if self.generation_worker is not None and not self.generation_worker.is_finished:
+            self.generation_worker.cancel()
+
+    def set_generating(self, generating: bool) -> None:
+        self.query_one("#generate", Button).disabled = generating
+        self.query_one("#cancel", Button).disabled = not generating
+
+    async def run_generation(self, constraints) -> None:
+        """Worker body: streams profiles into the log in batches while the UI stays live."""
+        results_log = self.query_one("#results", Log)
+        progress_bar = self.query_one("#progress", ProgressBar)
+        throughput = self.query_one("#throughput", Static)
+        total = constraints['num_profiles']
+        profiles = []
+        pending_lines = []
+        start_time = time.perf_counter()
+
+        def report_progress():
+            elapsed = time.perf_counter() - start_time
+            rate = len(profiles) / elapsed if elapsed > 0 else 0.0
+            progress_bar.update(progress=len(profiles))
+            throughput.update(f"{len(profiles)}/{total} profiles | {rate:,.0f} profiles/s | {elapsed:.1f}s")
+            if pending_lines:
+                results_log.write_lines(pending_lines)
+                pending_lines.clear()
+
+        self.set_generating(True)
+        progress_bar.update(total=total, progress=0)
+        try:
             selected_region_config = next((r for r in self.regions if r['id'] == constraints['region']), None)
             region_data_path = f"data/{selected_region_config['file']}"
-            region_data = load_region_data(region_data_path, 'data')
-            profiles = [generate_fake_personal_info(region_data, constraints, lambda *a, **kw: None, False) for _ in range(constraints['num_profiles'])]
-            
-            # Format output for Log widget
-            output_str = ""
-            for i, profile in enumerate(profiles):
-                output_str += f"--- Profile {i+1} ---\n"
-                for key, value in profile.items():
-                    output_str += f"{key}: {value}\n"
-                output_str += "\n"
-            results_log.write(output_str)
-
-            if constraints['output_format'] in ['json', 'csv']:
-                file_path = f"generated_profiles/profiles.{constraints['output_format']}"
-                os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                if constraints['output_format'] == 'json':
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        json.dump(profiles, f, indent=4)
-                elif constraints['output_format'] == 'csv':
-                    with open(file_path, 'w', newline='', encoding='utf-8') as f:
-                        if profiles:
-                            writer = csv.DictWriter(f, fieldnames=profiles[0].keys())
-                            writer.writeheader()
-                            writer.writerows(profiles)
-                results_log.write(f"Profiles saved to {file_path}")
+            region_data = await asyncio.to_thread(load_region_data, region_data_path, 'data')
+            results_log.clear()
+
+            async for profile in agenerate(region_data, constraints, chunk_size=GENERATION_CHUNK_SIZE):
+                profiles.append(profile)
+                if len(profiles) <= MAX_LOG_PROFILES:
+                    pending_lines.extend(format_profile_lines(len(profiles), profile))
+                if len(profiles) % GENERATION_CHUNK_SIZE == 0:
+                    report_progress()
+            report_progress()
 
+            output_format = constraints['output_format']
+            if output_format == 'console' and len(profiles) > MAX_LOG_PROFILES:
+                output_format = 'json' # Too many to show; keep the full set on disk instead
+            if output_format in ['json', 'csv']:
+                file_path = await asyncio.to_thread(save_profiles, profiles, output_format, constraints)
+                if len(profiles) > MAX_LOG_PROFILES:
+                    results_log.write_line(f"... {len(profiles) - MAX_LOG_PROFILES} more profiles not shown. All {len(profiles)} profiles written to {file_path}")
+                else:
+                    results_log.write_line(f"Profiles saved to {file_path}")
+        except asyncio.CancelledError:
+            report_progress()
+            results_log.write_line(f"Generation cancelled after {len(profiles)} of {total} profiles.")
+            raise
         except Exception as e:
-            results_log.write(f"An unexpected error occurred: {e}")
+            results_log.write_line(f"An unexpected error occurred: {e}")
+        finally:
+            self.set_generating(False)
 
 class MainMenuScreen(Screen):
     
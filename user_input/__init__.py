@@ -1,10 +1,10 @@
 import os
 import questionary
 from rich.console import Console
-import random
 
 from utils.custom_styles import custom_style
 from utils.data_loader import load_region_data
+from utils.constraints import constraints_from_args
 from .generation_mode import select_generation_mode, get_random_constraints
 from .region_selection import select_region, select_detailed_location, select_address_input_method, get_manual_address, get_random_detailed_location
 from .profile_details import select_num_profiles, select_age_range, select_gender, select_hidden_attributes_inclusion
@@ -27,61 +27,7 @@ def get_user_input_generator(regions_config, data_dir, console: Console, debug_p
     # --- Non-Interactive Mode ---
     if args.non_interactive or is_cli_direct_mode:
         debug_print_func("Running in non-interactive mode.")
-        
-        # (The non-interactive logic remains unchanged)
-        constraints = {
-            'mode': '2', 'num_profiles': 1, 'region': None, 'age_range': 'any', 'gender': 'any',
-            'occupation': 'any', 'marital_status': 'any', 'desired_education_level': 'any',
-            'hobbies': [], 'skills': [], 'unconventional_data_selection': [], 'include_unconventional': False,
-            'custom_first_name': None, 'custom_last_name': None, 'output_format': 'console',
-            'family_details': False, 'physical_details': False, 'include_hidden_attributes': False,
-            'name_generation_method': 'existing',
-        }
-        if args.num_profiles is not None:
-            try: constraints['num_profiles'] = int(args.num_profiles)
-            except ValueError: debug_print_func(f"Warning: Could not parse num_profiles '{args.num_profiles}'. Using default.")
-        if args.region is not None: constraints['region'] = args.region
-        if args.age is not None:
-            value = args.age
-            if isinstance(value, str):
-                if '-' in value: parts = value.split('-'); constraints['age_range'] = (int(parts[0]), int(parts[1]))
-                elif '+' in value: constraints['age_range'] = (int(value.replace('+', '')), 1000)
-                elif value.lower() == 'any': constraints['age_range'] = 'any'
-                else:
-                    try: age = int(value); constraints['age_range'] = (age, age)
-                    except ValueError: debug_print_func(f"Warning: Could not parse age '{value}'. Using default.")
-        if args.gender is not None: constraints['gender'] = args.gender
-        if args.occupation is not None: constraints['occupation'] = args.occupation
-        if args.marital_status is not None: constraints['marital_status'] = args.marital_status; constraints['family_details'] = True
-        if args.num_children is not None: constraints['num_children'] = args.num_children; constraints['family_details'] = True
-        if args.education_level is not None: constraints['desired_education_level'] = args.education_level
-        if args.hobbies is not None: constraints['hobbies'] = [h.strip() for h in args.hobbies.split(',') if h.strip()]; constraints['include_skills_interests'] = True
-        if args.skills is not None: constraints['skills'] = [s.strip() for s in args.skills.split(',') if s.strip()]; constraints['include_skills_interests'] = True
-        if args.include_unconventional:
-            constraints['include_unconventional'] = True
-            constraints['unconventional_data_selection'] = ["personality_traits", "life_events", "online_behaviors", "texting_typing_style", "digital_footprint", "device_habits"]
-        if args.include_hidden_attributes: constraints['include_hidden_attributes'] = True
-        if args.physical_details: constraints['physical_details'] = True
-        if args.address_manual_input: constraints['address_input_method'] = 'manual'; constraints['address_manual_input'] = args.address_manual_input
-        elif args.location: constraints['address_input_method'] = 'detailed'; constraints['location'] = args.location
-        if args.personality_trait is not None:
-            constraints['personality_trait'] = args.personality_trait; constraints['include_unconventional'] = True
-            if 'personality_traits' not in constraints['unconventional_data_selection']: constraints['unconventional_data_selection'].append('personality_traits')
-        if args.exceptionality_score is not None:
-            try:
-                constraints['exceptionality_score'] = int(args.exceptionality_score); constraints['include_unconventional'] = True
-                if 'personality_traits' not in constraints['unconventional_data_selection']: constraints['unconventional_data_selection'].append('personality_traits')
-            except ValueError: debug_print_func(f"Warning: Could not parse exceptionality_score '{args.exceptionality_score}'. Ignoring.")
-        if args.name is not None:
-            if not constraints['custom_first_name'] and not constraints['custom_last_name']:
-                name_parts = args.name.split(' ', 1)
-                if len(name_parts) > 0: constraints['custom_first_name'] = name_parts[0]
-                if len(name_parts) > 1: constraints['custom_last_name'] = name_parts[1]
-                constraints['name_generation_method'] = 'custom'
-        if args.custom_first_name is not None: constraints['custom_first_name'] = args.custom_first_name; constraints['name_generation_method'] = 'custom'
-        if args.custom_last_name is not None: constraints['custom_last_name'] = args.custom_last_name; constraints['name_generation_method'] = 'custom'
-        if constraints['custom_first_name'] or constraints['custom_last_name']: constraints['name_generation_method'] = 'custom'
-        if constraints['region'] is None: constraints['region'] = random.choice(regions_config)['id']
+        constraints = constraints_from_args(args, regions_config, debug_print_func)
         debug_print_func(f"Constraints from args (non-interactive): {constraints}")
         return constraints
 
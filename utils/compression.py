@@ -0,0 +1,165 @@
+import gzip
+import importlib.util
+import io
+import lzma
+import queue
+import threading
+import time
+from collections import namedtuple
+
+# Streaming compression for output files. Writers hand chunks of bytes to a CompressedWriter,
+# which compresses and writes them on a background thread behind a bounded queue, so
+# generation and encoding overlap with compression and disk I/O (zlib, lzma, zstd and lz4
+# all release the GIL while compressing). gzip and lzma are always available; zstd and lz4
+# are used when the zstandard / lz4 packages are installed.
+
+COMPRESSION_QUEUE_CHUNKS = 16 # Chunks waiting to be compressed before write() blocks
+GZIP_LEVEL = 6 # 9 is several times slower for a few percent smaller files
+LZMA_PRESET = 3
+ZSTD_LEVEL = 3
+
+def _open_gzip(f):
+    return gzip.GzipFile(fileobj=f, mode='wb', compresslevel=GZIP_LEVEL, mtime=0)
+
+def _open_lzma(f):
+    return lzma.LZMAFile(f, 'wb', preset=LZMA_PRESET)
+
+def _open_zstd(f):
+    import zstandard
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(f, closefd=False)
+
+def _open_lz4(f):
+    import lz4.frame
+    return lz4.frame.LZ4FrameFile(f, mode='wb')
+
+# module: the package the codec needs; open: fn(binary file) -> stream whose close() ends the frame
+Codec = namedtuple('Codec', ['name', 'extension', 'module', 'open'])
+
+CODECS = {
+    'gzip': Codec('gzip', '.gz', 'gzip', _open_gzip),
+    'lzma': Codec('lzma', '.xz', 'lzma', _open_lzma),
+    'zstd': Codec('zstd', '.zst', 'zstandard', _open_zstd),
+    'lz4': Codec('lz4', '.lz4', 'lz4', _open_lz4),
+}
+
+def codec_available(name):
+    return name in CODECS and importlib.util.find_spec(CODECS[name].module) is not None
+
+def get_codec(name):
+    """Returns the Codec called `name`, or None for None/'none'. Raises ValueError if it cannot be used."""
+    if name is None or name == 'none':
+        return None
+    if name not in CODECS:
+        raise ValueError(f"Unknown compression {name!r}; expected one of {', '.join(CODECS)} or none")
+    if not codec_available(name):
+        raise ValueError(f"Compression {name!r} needs the {CODECS[name].module} package, which is not installed")
+    return CODECS[name]
+
+class _CountingFile:
+    def __init__(self, f):
+        self._file = f
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        return self._file.write(data)
+
+    def flush(self):
+        self._file.flush()
+
+class CompressedWriter(io.RawIOBase):
+    """
+    Binary writer that compresses into `f` with `codec` (or passes bytes through if None) on
+    a background thread. write() returns immediately unless the queue is full. close()
+    finishes the stream and re-raises any error from the thread; it closes `f` only when
+    close_file is set.
+    """
+    def __init__(self, f, codec=None, queue_chunks=COMPRESSION_QUEUE_CHUNKS, close_file=False):
+        super().__init__()
+        self.codec = codec
+        self.bytes_in = 0
+        self.busy_seconds = 0.0 # time the thread spent compressing and writing
+        self._file = f
+        self._close_file = close_file
+        self._counter = _CountingFile(f)
+        self._stream = codec.open(self._counter) if codec is not None else self._counter
+        self._queue = queue.Queue(maxsize=queue_chunks)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='output-compressor', daemon=True)
+        self._thread.start()
+
+    @property
+    def bytes_out(self):
+        return self._counter.size
+
+    def _run(self):
+        while True:
+            data = self._queue.get()
+            if data is None:
+                break
+            if self._error is not None:
+                continue # Keep draining so writers never block on a dead thread
+            started = time.perf_counter()
+            try:
+                self._stream.write(data)
+            except BaseException as e:
+                self._error = e
+            self.busy_seconds += time.perf_counter() - started
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self._error is not None:
+            raise self._error
+        data = bytes(data) # The caller may reuse its buffer once write() returns
+        self.bytes_in += len(data)
+        self._queue.put(data)
+        return len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self._queue.put(None)
+            self._thread.join()
+            if self._error is None and self._stream is not self._counter:
+                started = time.perf_counter()
+                self._stream.close()
+                self.busy_seconds += time.perf_counter() - started
+            if self._close_file:
+                self._file.close()
+        finally:
+            super().close()
+        if self._error is not None:
+            raise self._error
+
+def open_output(path, compression=None):
+    """Opens `path` for binary writing through a CompressedWriter that owns the file."""
+    codec = get_codec(compression) # Before opening, so an unusable codec leaves no empty file behind
+    return CompressedWriter(open(path, 'wb'), codec, close_file=True)
+
+def _mb(size):
+    return size / (1024 * 1024)
+
+class CompressionReport:
+    """Totals the CompressedWriters of one run, for a ratio and throughput summary."""
+    def __init__(self, compression=None):
+        self.compression = compression or 'none'
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.busy_seconds = 0.0
+        self.started_at = time.perf_counter()
+
+    def add(self, writer):
+        self.bytes_in += writer.bytes_in
+        self.bytes_out += writer.bytes_out
+        self.busy_seconds += writer.busy_seconds
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started_at
+        ratio = self.bytes_in / self.bytes_out if self.bytes_out else 0.0
+        compress_rate = _mb(self.bytes_in) / self.busy_seconds if self.busy_seconds else 0.0
+        overall_rate = _mb(self.bytes_in) / elapsed if elapsed else 0.0
+        return (f"{self.compression}: {_mb(self.bytes_in):.1f} MB -> {_mb(self.bytes_out):.1f} MB ({ratio:.1f}x), "
+                f"compressed at {compress_rate:.0f} MB/s, {overall_rate:.0f} MB/s overall")
@@ -0,0 +1,121 @@
+import random
+
+# Default constraint set used by the non-interactive CLI and the generation server.
+DEFAULT_CONSTRAINTS = {
+    'mode': '2', 'num_profiles': 1, 'region': None, 'age_range': 'any', 'gender': 'any',
+    'occupation': 'any', 'marital_status': 'any', 'desired_education_level': 'any',
+    'hobbies': [], 'skills': [], 'unconventional_data_selection': [], 'include_unconventional': False,
+    'custom_first_name': None, 'custom_last_name': None, 'output_format': 'console',
+    'family_details': False, 'physical_details': False, 'include_hidden_attributes': False,
+    'name_generation_method': 'existing',
+}
+
+def default_constraints():
+    """Returns a fresh copy of the default constraint dict (lists are not shared)."""
+    return {k: list(v) if isinstance(v, list) else v for k, v in DEFAULT_CONSTRAINTS.items()}
+
+def parse_age_range(value):
+    """Parses '25', '18-30', '60+' or 'any' into the tuple form used by the generators."""
+    if isinstance(value, (list, tuple)) and len(value) == 2:
+        return (int(value[0]), int(value[1]))
+    if isinstance(value, int):
+        return (value, value)
+    if not isinstance(value, str) or value.lower() == 'any':
+        return 'any'
+    if '-' in value:
+        parts = value.split('-')
+        return (int(parts[0]), int(parts[1]))
+    if '+' in value:
+        return (int(value.replace('+', '')), 1000)
+    age = int(value)
+    return (age, age)
+
+def constraints_from_dict(data, regions_config):
+    """
+    Builds a complete constraint dict from a (possibly partial) dict such as a JSON request body.
+    Unknown keys are passed through untouched; a missing region is picked at random.
+    Raises ValueError if a value cannot be interpreted.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Constraints must be a JSON object.")
+    constraints = default_constraints()
+    constraints.update(data)
+
+    try:
+        constraints['num_profiles'] = int(constraints['num_profiles'])
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid num_profiles: {constraints['num_profiles']!r}")
+    if constraints['num_profiles'] < 0:
+        raise ValueError("num_profiles must not be negative.")
+
+    try:
+        constraints['age_range'] = parse_age_range(constraints['age_range'])
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid age_range: {constraints['age_range']!r}")
+
+    if constraints.get('hobbies') or constraints.get('skills'):
+        constraints['include_skills_interests'] = True
+    if constraints.get('unconventional_data_selection'):
+        constraints['include_unconventional'] = True
+    if constraints['custom_first_name'] or constraints['custom_last_name']:
+        constraints['name_generation_method'] = 'custom'
+
+    if constraints['region'] is None:
+        if not regions_config:
+            raise ValueError("No regions are configured.")
+        constraints['region'] = random.choice(regions_config)['id']
+    elif not any(r['id'] == constraints['region'] for r in regions_config):
+        raise ValueError(f"Invalid region ID '{constraints['region']}'.")
+    return constraints
+
+def constraints_from_args(args, regions_config, debug_print_func):
+    """Builds the constraint dict for non-interactive mode from parsed command-line arguments."""
+    constraints = default_constraints()
+    if args.num_profiles is not None:
+        try: constraints['num_profiles'] = int(args.num_profiles)
+        except ValueError: debug_print_func(f"Warning: Could not parse num_profiles '{args.num_profiles}'. Using default.")
+    if args.region is not None: constraints['region'] = args.region
+    if args.age is not None:
+        value = args.age
+        if isinstance(value, str):
+            if '-' in value: parts = value.split('-'); constraints['age_range'] = (int(parts[0]), int(parts[1]))
+            elif '+' in value: constraints['age_range'] = (int(value.replace('+', '')), 1000)
+            elif value.lower() == 'any': constraints['age_range'] = 'any'
+            else:
+                try: age = int(value); constraints['age_range'] = (age, age)
+                except ValueError: debug_print_func(f"Warning: Could not parse age '{value}'. Using default.")
+    if args.gender is not None: constraints['gender'] = args.gender
+    if args.occupation is not None: constraints['occupation'] = args.occupation
+    if args.marital_status is not None: constraints['marital_status'] = args.marital_status; constraints['family_details'] = True
+    if args.num_children is not None: constraints['num_children'] = args.num_children; constraints['family_details'] = True
+    if args.education_level is not None: constraints['desired_education_level'] = args.education_level
+    if args.hobbies is not None: constraints['hobbies'] = [h.strip() for h in args.hobbies.split(',') if h.strip()]; constraints['include_skills_interests'] = True
+    if args.skills is not None: constraints['skills'] = [s.strip() for s in args.skills.split(',') if s.strip()]; constraints['include_skills_interests'] = True
+    if args.include_unconventional:
+        constraints['include_unconventional'] = True
+        constraints['unconventional_data_selection'] = ["personality_traits", "life_events", "online_behaviors", "texting_typing_style", "digital_footprint", "device_habits"]
+    if args.include_hidden_attributes: constraints['include_hidden_attributes'] = True
+    if args.physical_details: constraints['physical_details'] = True
+    if args.address_manual_input: constraints['address_input_method'] = 'manual'; constraints['address_manual_input'] = args.address_manual_input
+    elif args.location: constraints['address_input_method'] = 'detailed'; constraints['location'] = args.location
+    if args.personality_trait is not None:
+        constraints['personality_trait'] = args.personality_trait; constraints['include_unconventional'] = True
+        if 'personality_traits' not in constraints['unconventional_data_selection']: constraints['unconventional_data_selection'].append('personality_traits')
+    if args.exceptionality_score is not None:
+        try:
+            constraints['exceptionality_score'] = int(args.exceptionality_score); constraints['include_unconventional'] = True
+            if 'personality_traits' not in constraints['unconventional_data_selection']: constraints['unconventional_data_selection'].append('personality_traits')
+        except ValueError: debug_print_func(f"Warning: Could not parse exceptionality_score '{args.exceptionality_score}'. Ignoring.")
+    if args.name is not None:
+        if not constraints['custom_first_name'] and not constraints['custom_last_name']:
+            name_parts = args.name.split(' ', 1)
+            if len(name_parts) > 0: constraints['custom_first_name'] = name_parts[0]
+            if len(name_parts) > 1: constraints['custom_last_name'] = name_parts[1]
+            constraints['name_generation_method'] = 'custom'
+    if args.custom_first_name is not None: constraints['custom_first_name'] = args.custom_first_name; constraints['name_generation_method'] = 'custom'
+    if args.custom_last_name is not None: constraints['custom_last_name'] = args.custom_last_name; constraints['name_generation_method'] = 'custom'
+    if constraints['custom_first_name'] or constraints['custom_last_name']: constraints['name_generation_method'] = 'custom'
+    if args.output_format is not None: constraints['output_format'] = args.output_format
+    if args.valid_only: constraints['valid_only'] = True
+    if constraints['region'] is None: constraints['region'] = random.choice(regions_config)['id']
+    return constraints
@@ -0,0 +1,100 @@
+import csv
+import io
+from itertools import islice
+
+from profile_generator.unconventional.unconventional_data import NUMERICAL_HIDDEN_ATTRIBUTES, UNCONVENTIONAL_CATEGORIES
+from utils.json_backend import dumps
+
+# Profiles are written to CSV against a header fixed up front from the constraints, so rows
+# can be streamed out without first scanning the batch for its keys. Rows are encoded into
+# an in-memory buffer and written to the file CSV_CHUNK_ROWS at a time.
+
+CSV_CHUNK_ROWS = 1000
+
+CORE_COLUMNS = ('first_name', 'middle_name', 'last_name', 'age', 'dob', 'gender', 'Address')
+HIDDEN_COLUMNS = tuple(NUMERICAL_HIDDEN_ATTRIBUTES) + ('personality_trait', 'exceptionality_score')
+PHYSICAL_COLUMNS = ('eye_color', 'hair_color', 'hair_style', 'height_cm', 'build', 'distinguishing_marks')
+SKILLS_COLUMNS = ('skills', 'interests', 'hobbies')
+
+def profile_columns(constraints):
+    """Returns the columns of profiles generated with `constraints`, in the order the pipeline adds them."""
+    columns = list(CORE_COLUMNS)
+    if constraints.get('include_hidden_attributes'):
+        columns += HIDDEN_COLUMNS
+    columns.append('Occupation')
+    if constraints.get('family_details'):
+        columns += ('marital_status', 'children')
+    columns += ('Email', 'phone_number')
+    columns += PHYSICAL_COLUMNS
+    if constraints.get('include_unconventional'):
+        selection = constraints.get('unconventional_data_selection') or []
+        if 'life_events' in selection:
+            columns.append('life_events')
+        columns += (field for key, (field, _) in UNCONVENTIONAL_CATEGORIES.items() if key in selection)
+    if constraints.get('include_skills_interests'):
+        columns += SKILLS_COLUMNS
+    return columns
+
+def encode_value(value):
+    """Encodes a profile value for a CSV cell: lists and dicts as compact JSON, None as empty."""
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple, dict)):
+        return dumps(value)
+    return value
+
+class ProfileCsvWriter:
+    """
+    Writes profiles to an open text file (opened with newline='') under a fixed header.
+    Profile keys outside `columns` are not written; missing ones are left empty.
+    """
+    def __init__(self, f, columns, chunk_rows=CSV_CHUNK_ROWS):
+        self.columns = tuple(columns)
+        self.chunk_rows = chunk_rows
+        self.rows_written = 0
+        self._file = f
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._pending = 0
+        self._writer.writerow(self.columns)
+
+    def _row(self, profile):
+        get = profile.get
+        return [encode_value(get(column)) for column in self.columns]
+
+    def write(self, profile):
+        self._writer.writerow(self._row(profile))
+        self._pending += 1
+        if self._pending >= self.chunk_rows:
+            self.flush()
+
+    def write_many(self, profiles):
+        """Writes an iterable of profiles, consuming it one chunk at a time."""
+        profiles = iter(profiles)
+        while True:
+            chunk = list(islice(profiles, self.chunk_rows - self._pending))
+            if not chunk:
+                break
+            self._writer.writerows([self._row(profile) for profile in chunk])
+            self._pending += len(chunk)
+            if self._pending >= self.chunk_rows:
+                self.flush()
+
+    def flush(self):
+        """Writes the buffered rows (and the header, the first time) to the file."""
+        self._file.write(self._buffer.getvalue())
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self.rows_written += self._pending
+        self._pending = 0
+
+def write_profiles_csv(profiles, file_path, constraints, columns=None):
+    """
+    Writes an iterable of profiles to `file_path` as UTF-8 CSV, with the columns implied by
+    `constraints` unless `columns` is given. Returns the number of profiles written.
+    """
+    with open(file_path, 'w', newline='', encoding='utf-8') as f:
+        writer = ProfileCsvWriter(f, columns if columns is not None else profile_columns(constraints))
+        writer.write_many(profiles)
+        writer.flush()
+    return writer.rows_written
@@ -1,96 +1,103 @@
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
-def load_region_data(region_data_path, data_dir):
-    """Loads the data for the specified region and its associated files."""
-    with open(region_data_path, 'r', encoding='utf-8') as f:
-        region_data = json.load(f)
+from utils.json_backend import load_path
+from utils.region_schema import RegionDataError, validate_region_data
 
-    # Load default email rules first
-    default_email_rules_path = os.path.join(data_dir, 'email_rules.json')
+# Region files are read through a thread pool: a region's referenced files are all requested
+# up front and merged once they arrive, and several regions load side by side, so startup
+# costs roughly the slowest file rather than the sum of them. Files of at least
+# LARGE_FILE_BYTES can optionally be parsed in a process pool, since json parsing holds the GIL.
+LOADER_THREADS = 8
+LARGE_FILE_BYTES = 1024 * 1024
+
+# Define how each file should be loaded
+# 'merge': content of the file is merged directly into region_data
+# 'assign': content of the file is assigned to a new key in region_data
+FILES_CONFIG = {
+    "names_file": {"type": "merge"},
+
+    "occupations_file": {"type": "assign", "key": "occupations"},
+    "physical_characteristics_file": {"type": "merge"},
+    "email_rules_file": {"type": "update_email_rules"},
+    "occupation_rules_file": {"type": "assign", "key": "occupation_rules"},
+    "physical_characteristics_rules_file": {"type": "assign", "key": "physical_characteristics_rules"},
+    "family_details_rules_file": {"type": "assign", "key": "family_details_rules"},
+    "hobbies_rules_file": {"type": "assign", "key": "hobbies_rules"},
+    "addresses_file": {"type": "assign", "key": "address_data"},
+    "emails_file": {"type": "merge"},
+    "phone_numbers_file": {"type": "assign", "key": "phone_number_data"},
+    "street_data_file": {"type": "assign", "key": "street_data_content"},
+    "nicknames_file": {"type": "assign", "key": "nicknames"},
+    "unconventional_data_file": {"type": "assign", "key": "unconventional_data_rules"},
+    "skills_interests_rules_file": {"type": "assign", "key": "skills_interests_rules"},
+    "validation_data_file": {"type": "assign", "key": "validation_data"},
+    "consistency_rules_file": {"type": "assign", "key": "consistency_rules"},
+    "location_biases_file": {"type": "assign", "key": "location_biases"}
+}
+
+def _submit_reads(paths, executor, process_pool=None):
+    """Starts reading every path; returns {path: future of the parsed JSON}."""
+    reads = {}
+    for path in paths:
+        pool = executor
+        if process_pool is not None:
+            try:
+                if os.path.getsize(path) >= LARGE_FILE_BYTES:
+                    pool = process_pool
+            except OSError:
+                pass # Let the read itself report the missing file
+        reads[path] = pool.submit(load_path, path)
+    return reads
+
+def _deep_update(target, source):
+    for k, v in source.items():
+        if isinstance(v, dict) and k in target and isinstance(target[k], dict):
+            target[k] = _deep_update(target[k], v)
+        else:
+            target[k] = v
+    return target
+
+def _parsed(path, read):
+    """Returns read(), the parsed contents of `path`; raises RegionDataError naming the file if it could not be read."""
     try:
-        with open(default_email_rules_path, 'r', encoding='utf-8') as f:
-            region_data['email_rules'] = json.load(f)
+        return read()
     except FileNotFoundError:
-        print(f"Error: Default email_rules.json not found at {default_email_rules_path}. Email generation may be affected.")
-        region_data['email_rules'] = {}
+        raise RegionDataError(path, ["file not found"]) from None
     except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON in {default_email_rules_path}: {e}. Email generation may be affected.")
-        region_data['email_rules'] = {}
-
-    # Define how each file should be loaded
-    # 'merge': content of the file is merged directly into region_data
-    # 'assign': content of the file is assigned to a new key in region_data
-    files_config = {
-        "names_file": {"type": "merge"},
-        
-        "occupations_file": {"type": "assign", "key": "occupations"},
-        "physical_characteristics_file": {"type": "merge"},
-        "email_rules_file": {"type": "update_email_rules"},
-        "occupation_rules_file": {"type": "assign", "key": "occupation_rules"},
-        "physical_characteristics_rules_file": {"type": "assign", "key": "physical_characteristics_rules"},
-        "family_details_rules_file": {"type": "assign", "key": "family_details_rules"},
-        "hobbies_rules_file": {"type": "assign", "key": "hobbies_rules"},
-        "addresses_file": {"type": "assign", "key": "address_data"},
-        "emails_file": {"type": "merge"},
-        "phone_numbers_file": {"type": "assign", "key": "phone_number_data"},
-        "street_data_file": {"type": "assign", "key": "street_data_content"},
-        "nicknames_file": {"type": "assign", "key": "nicknames"},
-        "unconventional_data_file": {"type": "assign", "key": "unconventional_data_rules"},
-        "skills_interests_rules_file": {"type": "assign", "key": "skills_interests_rules"},
-        "validation_data_file": {"type": "assign", "key": "validation_data"},
-        "location_biases_file": {"type": "assign", "key": "location_biases"}
-    }
+        raise RegionDataError(path, [f"invalid JSON: {e}"]) from None
+    except OSError as e:
+        raise RegionDataError(path, [f"could not be read: {e}"]) from None
+
+def _assemble_region(region_data, region_data_path, data_dir, reads):
+    """Merges the files read for a region into region_data, in the order load_region_data documents."""
+    # Load default email rules first
+    default_email_rules_path = os.path.join(data_dir, 'email_rules.json')
+    region_data['email_rules'] = _parsed(default_email_rules_path, reads[default_email_rules_path].result)
 
     # Load and integrate referenced files
-    for file_key, config in files_config.items():
+    for file_key, config in FILES_CONFIG.items():
         if file_key in region_data: # Check if the file reference exists in region_data
-            relative_path = region_data[file_key]
-            full_path = os.path.join(data_dir, relative_path)
-            try:
-                with open(full_path, 'r', encoding='utf-8') as f:
-                    loaded_data = json.load(f)
-            except FileNotFoundError:
-                print(f"Error: File not found at {full_path}. Skipping this data.")
-                continue
-            except json.JSONDecodeError as e:
-                print(f"Error: Invalid JSON in {full_path}: {e}. Skipping this data.")
-                continue
+            full_path = os.path.join(data_dir, region_data[file_key])
+            loaded_data = _parsed(full_path, reads[full_path].result)
 
             if config["type"] == "merge":
                 region_data.update(loaded_data)
             elif config["type"] == "assign":
-                if file_key == "addresses_file":
-                    region_data[config["key"]] = loaded_data
-                elif file_key == "occupations_file":
+                if file_key == "occupations_file":
                     region_data[config["key"]] = loaded_data.get('occupations', [])
                 else:
                     region_data[config["key"]] = loaded_data
             elif config["type"] == "update_email_rules":
-                # Merge specific email rules on top of default ones
-                # This handles nested dictionaries by updating them recursively
-                def deep_update(target, source):
-                    for k, v in source.items():
-                        if isinstance(v, dict) and k in target and isinstance(target[k], dict):
-                            target[k] = deep_update(target[k], v)
-                        else:
-                            target[k] = v
-                    return target
-                region_data['email_rules'] = deep_update(region_data.get('email_rules', {}), loaded_data)
+                # Merge specific email rules on top of default ones, recursing into nested dicts
+                region_data['email_rules'] = _deep_update(region_data.get('email_rules', {}), loaded_data)
             del region_data[file_key] # Delete the file reference key after processing
 
     # Always load skills_interests_rules.json
     skills_interests_rules_path = os.path.join(data_dir, 'skills_interests_rules.json')
-    try:
-        with open(skills_interests_rules_path, 'r', encoding='utf-8') as f:
-            skills_interests_data = json.load(f)
-            if 'skills_interests_rules' not in region_data:
-                region_data['skills_interests_rules'] = {}
-            region_data['skills_interests_rules'].update(skills_interests_data)
-    except FileNotFoundError:
-        print(f"Error: skills_interests_rules.json not found at {skills_interests_rules_path}. Skipping this data.")
-    except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON in {skills_interests_rules_path}: {e}. Skipping this data.")
+    skills_interests_data = _parsed(skills_interests_rules_path, reads[skills_interests_rules_path].result)
+    region_data.setdefault('skills_interests_rules', {}).update(skills_interests_data)
 
     # Extract phone_number_formats, street_types, and sub_commune_units
     if 'phone_number_data' in region_data:
@@ -101,7 +108,30 @@ def load_region_data(region_data_path, data_dir):
         region_data['sub_commune_units'] = region_data['street_data_content']['sub_commune_units']
         del region_data['street_data_content'] # Clean up the intermediate key
 
-    return region_data
+    # Fail here, with every problem listed, rather than with a KeyError mid-generation
+    return validate_region_data(region_data, region_data_path)
+
+def load_region_data(region_data_path, data_dir, executor=None, process_pool=None):
+    """
+    Loads the data for the specified region and its associated files, then validates and
+    normalizes it. Raises utils.region_schema.RegionDataError if a file is missing or is not
+    valid JSON, or if the bundle is malformed.
+    The referenced files are read concurrently through `executor` (a thread pool of its
+    own if not given); files of at least LARGE_FILE_BYTES go to `process_pool` if given.
+    """
+    region_data = _parsed(region_data_path, lambda: load_path(region_data_path))
+
+    # Shared files are read once per region, since each region's bundle is updated in place
+    paths = [os.path.join(data_dir, 'email_rules.json')]
+    paths += [os.path.join(data_dir, region_data[file_key]) for file_key in FILES_CONFIG if file_key in region_data]
+    paths.append(os.path.join(data_dir, 'skills_interests_rules.json'))
+
+    if executor is None:
+        with ThreadPoolExecutor(max_workers=LOADER_THREADS) as own_executor:
+            reads = _submit_reads(paths, own_executor, process_pool)
+            return _assemble_region(region_data, region_data_path, data_dir, reads)
+    reads = _submit_reads(paths, executor, process_pool)
+    return _assemble_region(region_data, region_data_path, data_dir, reads)
 
 def load_regions_config(data_dir):
     """Loads the regions configuration and region aliases."""
@@ -110,8 +140,7 @@ def load_regions_config(data_dir):
     
     regions_data = []
     try:
-        with open(regions_file_path, 'r', encoding='utf-8') as f:
-            regions_data = json.load(f)['regions']
+        regions_data = load_path(regions_file_path)['regions']
     except FileNotFoundError:
         print(f"Error: regions.json not found at {regions_file_path}.")
         return [], {}
@@ -121,11 +150,43 @@ def load_regions_config(data_dir):
 
     aliases_data = {}
     try:
-        with open(aliases_file_path, 'r', encoding='utf-8') as f:
-            aliases_data = json.load(f)
+        aliases_data = load_path(aliases_file_path)
     except FileNotFoundError:
         print(f"Warning: region_aliases.json not found at {aliases_file_path}. No region aliases will be available.")
     except json.JSONDecodeError as e:
         print(f"Error: Invalid JSON in {aliases_file_path}: {e}. No region aliases will be available.")
 
     return regions_data, aliases_data
+
+def iter_region_data(data_dir, regions_config=None, threads=LOADER_THREADS, parse_processes=0):
+    """
+    Loads every configured region concurrently and yields (region ID, region data) as each
+    one finishes, so callers can start using a region before the slower ones are done.
+    With parse_processes > 0, large files are parsed in a pool of that many processes.
+    """
+    if regions_config is None:
+        regions_config, _ = load_regions_config(data_dir)
+    if not regions_config:
+        return
+    process_pool = ProcessPoolExecutor(max_workers=parse_processes) if parse_processes else None
+    # Regions wait on their file reads, so they get their own pool; the file pool never blocks.
+    region_pool = ThreadPoolExecutor(max_workers=len(regions_config))
+    file_pool = ThreadPoolExecutor(max_workers=threads)
+    try:
+        futures = {
+            region_pool.submit(load_region_data, os.path.join(data_dir, region['file']), data_dir, file_pool, process_pool): region['id']
+            for region in regions_config
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        for pool in (region_pool, file_pool, process_pool):
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+def load_all_regions(data_dir, regions_config=None, parse_processes=0):
+    """Loads the data for every configured region concurrently. Returns a dict keyed by region ID, in config order."""
+    if regions_config is None:
+        regions_config, _ = load_regions_config(data_dir)
+    loaded = dict(iter_region_data(data_dir, regions_config, parse_processes=parse_processes))
+    return {region['id']: loaded[region['id']] for region in regions_config}
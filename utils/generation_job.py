@@ -0,0 +1,119 @@
+import glob
+import os
+import random
+
+from profile_generator import generate_profile_at
+from utils.json_backend import dumps, load_path, loads
+from utils.sharded_output import PART_SUFFIX, ShardedWriter, write_json_atomic
+
+# A generation job writes sharded output (see sharded_output.py) and checkpoints after every
+# shard: the job's parameters and the shards finished so far go to <prefix>-job.json. Each
+# profile is generated from (seed, region, index) (see profile_generator/random_access.py)
+# and shards only rotate between profiles, so resuming just continues at the first index
+# not yet in a finished shard and produces the same shards as an uninterrupted run.
+
+JOB_STATE_VERSION = 2
+SEED_BITS = 63
+
+class JobCancelled(Exception):
+    """Raised by GenerationJob.run when its stop_event is set."""
+
+class GenerationJob:
+    """
+    A resumable run of profiles start_index .. start_index + constraints['num_profiles'] - 1
+    of `seed` into shards in `output_dir`. `seed` is picked at random (and recorded) when not given.
+    """
+    def __init__(self, output_dir, region_data, constraints, output_format='json', max_rows=None, max_bytes=None,
+                 compression='gzip', seed=None, start_index=0, prefix='profiles', debug_print_func=None):
+        self.output_dir = output_dir
+        self.region_data = region_data
+        self.constraints = constraints
+        self.seed = seed
+        self.prefix = prefix
+        self.state_path = os.path.join(output_dir, f"{prefix}-job.json")
+        self.debug_print_func = debug_print_func or (lambda *args, **kwargs: None)
+        self.writer_settings = {
+            'output_format': output_format, 'max_rows': max_rows, 'max_bytes': max_bytes, 'compression': compression,
+        }
+        # Compared on resume; round-tripped through JSON so tuples and lists compare equal
+        self.params = loads(dumps({'constraints': constraints, 'start_index': start_index, **self.writer_settings}))
+        self.start_index = start_index
+        self.writer = None
+
+    def load_state(self):
+        """Returns the saved job state, or None if there is none."""
+        if not os.path.exists(self.state_path):
+            return None
+        state = load_path(self.state_path)
+        if state.get('version') != JOB_STATE_VERSION:
+            raise ValueError(f"{self.state_path} was written by an incompatible version of the generator")
+        return state
+
+    def _check_resumable(self, state):
+        if self.seed is not None and self.seed != state['seed']:
+            raise ValueError(f"--seed {self.seed} does not match the job's seed {state['seed']}")
+        saved = state['params']
+        differing = sorted(
+            [f"constraints.{key}" for key in set(saved['constraints']) | set(self.params['constraints'])
+             if saved['constraints'].get(key) != self.params['constraints'].get(key)]
+            + [key for key in ('start_index', *self.writer_settings) if saved.get(key) != self.params[key]]
+        )
+        if differing:
+            raise ValueError(f"Cannot resume {self.state_path}: these settings differ from the original run: {', '.join(differing)}")
+
+    def _save_state(self, complete):
+        write_json_atomic(self.state_path, {
+            'version': JOB_STATE_VERSION,
+            'seed': self.seed,
+            'params': self.params,
+            'complete': complete,
+            'rows': sum(shard['rows'] for shard in self.writer.shards),
+            'shards': self.writer.shards,
+        })
+
+    def _checkpoint(self, writer):
+        self._save_state(complete=False)
+        self.debug_print_func(f"Checkpoint: {len(writer.shards)} shards, {sum(shard['rows'] for shard in writer.shards)} profiles")
+
+    def run(self, resume=False, stats=None, stop_event=None):
+        """
+        Generates the profiles, continuing from the last checkpoint with resume=True.
+        Returns the number of profiles produced by this call. Raises ValueError if there is
+        nothing to resume, or if a job already exists in output_dir and resume is not set.
+        Raises JobCancelled, leaving the job resumable, once `stop_event` (a threading.Event) is set.
+        """
+        state = self.load_state()
+        if resume:
+            if state is None:
+                raise ValueError(f"No job to resume in {self.output_dir}")
+            self._check_resumable(state)
+            self.seed = state['seed']
+            if state['complete']:
+                return 0
+            completed_shards = state['shards']
+        else:
+            if state is not None:
+                raise ValueError(f"{self.state_path} already holds a job; resume it or choose another output directory")
+            if self.seed is None:
+                self.seed = random.SystemRandom().getrandbits(SEED_BITS)
+            completed_shards = []
+
+        # Anything written after the last checkpoint is regenerated
+        for part_path in glob.glob(os.path.join(glob.escape(self.output_dir), f"{glob.escape(self.prefix)}-*{PART_SUFFIX}")):
+            os.unlink(part_path)
+
+        self.writer = ShardedWriter(
+            self.output_dir, prefix=self.prefix, constraints=self.constraints,
+            completed_shards=completed_shards, on_shard_closed=self._checkpoint, **self.writer_settings,
+        )
+        if not resume:
+            self._save_state(complete=False)
+        valid_only = self.constraints.get('valid_only', False)
+        already_done = self.writer.rows_written
+        with self.writer:
+            for index in range(self.start_index + already_done, self.start_index + self.constraints['num_profiles']):
+                if stop_event is not None and stop_event.is_set():
+                    raise JobCancelled(f"{self.state_path} was stopped at profile {index}")
+                self.writer.write(generate_profile_at(self.region_data, self.constraints, self.seed, index, self.debug_print_func, valid_only, stats))
+        self._save_state(complete=True)
+        return self.writer.rows_written - already_done
@@ -0,0 +1,87 @@
+import json
+import os
+
+# One place to read and write JSON. orjson (or else ujson) is used when installed, since
+# either encodes profiles several times faster than the stdlib module; without them the
+# stdlib is used. FAKER_MAKER_JSON_BACKEND=stdlib|ujson|orjson picks one explicitly.
+# Output is compact unless an indent is asked for, and non-ASCII text is written as UTF-8
+# rather than \u escapes, so every backend produces the same (valid) JSON.
+
+BACKEND_ENV_VAR = 'FAKER_MAKER_JSON_BACKEND'
+BACKENDS = ('orjson', 'ujson', 'stdlib')
+
+JSONDecodeError = json.JSONDecodeError
+
+def _import_backend(name):
+    if name == 'stdlib':
+        return json
+    try:
+        return __import__(name)
+    except ImportError:
+        return None
+
+def _select_backend():
+    requested = os.environ.get(BACKEND_ENV_VAR)
+    if requested:
+        if requested not in BACKENDS:
+            raise ValueError(f"{BACKEND_ENV_VAR} must be one of {', '.join(BACKENDS)}, got {requested!r}")
+        module = _import_backend(requested)
+        if module is None:
+            raise ValueError(f"{BACKEND_ENV_VAR}={requested} but {requested} is not installed")
+        return requested, module
+    for name in BACKENDS:
+        module = _import_backend(name)
+        if module is not None:
+            return name, module
+
+BACKEND, _module = _select_backend()
+
+if BACKEND == 'orjson':
+    def loads(data):
+        return _module.loads(data) # orjson.JSONDecodeError subclasses json.JSONDecodeError
+
+    def dumps_bytes(obj, indent=None):
+        # orjson only indents by two spaces; any indent asks for that
+        return _module.dumps(obj, option=_module.OPT_INDENT_2 if indent else 0)
+
+    def dumps(obj, indent=None):
+        return dumps_bytes(obj, indent).decode('utf-8')
+
+elif BACKEND == 'ujson':
+    def loads(data):
+        try:
+            return _module.loads(data)
+        except _module.JSONDecodeError as e:
+            # Callers catch the stdlib error type whichever backend is active
+            document = data if isinstance(data, str) else data.decode('utf-8', 'replace')
+            raise JSONDecodeError(str(e), document, 0) from None
+
+    def dumps(obj, indent=None):
+        return _module.dumps(obj, ensure_ascii=False, indent=indent or 0, escape_forward_slashes=False)
+
+    def dumps_bytes(obj, indent=None):
+        return dumps(obj, indent).encode('utf-8')
+
+else:
+    _compact_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    def loads(data):
+        return json.loads(data)
+
+    def dumps(obj, indent=None):
+        if indent:
+            return json.dumps(obj, ensure_ascii=False, indent=indent)
+        return _compact_encoder.encode(obj)
+
+    def dumps_bytes(obj, indent=None):
+        return dumps(obj, indent).encode('utf-8')
+
+def load_path(path):
+    """Reads and parses the JSON file at `path`."""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+def dump_path(obj, path, indent=None):
+    """Writes obj to `path` as UTF-8 JSON, compact unless `indent` is given."""
+    with open(path, 'wb') as f:
+        f.write(dumps_bytes(obj, indent))
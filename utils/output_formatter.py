@@ -1,5 +1,5 @@
-import csv
-import json
+from utils.csv_writer import write_profiles_csv
+from utils.json_backend import dump_path
 from rich.console import Console
 from rich.table import Table
 from rich.text import Text
@@ -48,6 +48,9 @@ def _output_console(profiles, console: Console, constraints: dict, is_quick_gene
                 "first_name", "middle_name", "last_name", "age", "dob", "gender",
                 "Address", "phone_number", "Occupation", "Email"
             ],
+            "Family": [
+                "marital_status", "children"
+            ],
             "Physical Description": [
                 "eye_color", "hair_color", "hair_style", "height_cm", "build", "distinguishing_marks"
             ],
@@ -97,29 +100,11 @@ def _output_console(profiles, console: Console, constraints: dict, is_quick_gene
 def _output_csv(profiles, console: Console, constraints: dict, file_path="output.csv"):
     if not profiles:
         return
-    # Flatten the profiles for CSV output
-    flat_profiles = []
-    for profile in profiles:
-        flat_profile = {}
-        for key, value in profile.items():
-            if key in HIDDEN_ATTRIBUTES and not constraints.get('include_hidden_attributes', False):
-                continue # Skip hidden attributes if not requested
-            if isinstance(value, dict):
-                for sub_key, sub_value in value.items():
-                    flat_profile[f"{key}_{sub_key}"] = sub_value
-            else:
-                flat_profile[key] = value
-        flat_profiles.append(flat_profile)
-    
-    all_keys = set().union(*(d.keys() for d in flat_profiles))
-    
-    with open(file_path, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=sorted(list(all_keys)))
-        writer.writeheader()
-        writer.writerows(flat_profiles)
+    # Columns come from the constraints (hidden attributes only if requested), not a scan of the batch
+    write_profiles_csv(profiles, file_path, constraints)
     console.print(f"\n[bold green]Successfully wrote {len(profiles)} profiles to {file_path}[/bold green]")
 
-def _output_json(profiles, console: Console, constraints: dict, file_path="output.json"):
+def _output_json(profiles, console: Console, constraints: dict, file_path="output.json", indent=None):
     # Filter out hidden attributes if not requested
     filtered_profiles = []
     for profile in profiles:
@@ -129,7 +114,6 @@ def _output_json(profiles, console: Console, constraints: dict, file_path="outpu
         else:
             filtered_profiles.append(profile)
 
-    with open(file_path, 'w') as f:
-        json.dump(filtered_profiles, f, indent=4)
+    dump_path(filtered_profiles, file_path, indent)
     console.print(f"\n[bold green]Successfully wrote {len(profiles)} profiles to {file_path}[/bold green]")
 
@@ -0,0 +1,17 @@
+import re
+import sys
+
+# Matches rich markup tags such as [bold red], [/bold red] or [/].
+_MARKUP_RE = re.compile(r'\[/?(?:[a-z#][\w #.,()-]*)?\]')
+
+class PlainConsole:
+    """
+    A minimal stand-in for rich.console.Console used by headless batch runs.
+    It supports only print(), stripping rich markup, so rich never has to be imported.
+    """
+    def __init__(self, file=None):
+        self.file = file
+
+    def print(self, *objects, sep=" ", end="\n", markup=True, **kwargs):
+        text = sep.join(str(obj) for obj in objects)
+        print(_MARKUP_RE.sub('', text) if markup else text, end=end, file=self.file or sys.stdout, flush=True)
@@ -0,0 +1,193 @@
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+
+import profile_generator
+from profile_generator import generate_profiles_slice
+from utils.json_backend import dumps_bytes, load_path, loads
+from utils.sharded_output import write_json_atomic
+
+# On-disk cache of seeded runs. A seeded run is fully determined by the seed, the start
+# index, the constraints (including the count), the region data and the generator code, plus
+# the calendar year (dates of birth are relative to it; see random_access.py), so a hash of
+# those is the name of its cached output: the profiles as NDJSON, which a later identical
+# request streams back without generating anything. Entries are written under a temporary
+# name and renamed into place once complete. The cache is kept under max_bytes by deleting
+# the least recently used entries (an entry's mtime is bumped on every hit). Hit and miss
+# counters are kept in stats.json; concurrent processes may lose the odd increment.
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+CACHE_READ_BYTES = 256 * 1024
+ENTRY_SUFFIX = '.ndjson'
+PRESENTATION_KEYS = ('mode', 'output_format') # Constraints that do not change which profiles are generated
+
+_code_version = None
+_data_hashes = {} # id(region_data) -> (region_data, hash); keeps the dict alive so ids are not reused
+
+def code_version():
+    """Returns a hash of the profile_generator sources, so entries are not reused once the generators change."""
+    global _code_version
+    if _code_version is None:
+        package_dir = os.path.dirname(os.path.abspath(profile_generator.__file__))
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(package_dir):
+            dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+            for file_name in sorted(files):
+                if file_name.endswith('.py'):
+                    path = os.path.join(root, file_name)
+                    digest.update(os.path.relpath(path, package_dir).encode('utf-8') + b'\0')
+                    with open(path, 'rb') as f:
+                        digest.update(f.read())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+def data_hash(region_data):
+    """Returns a hash of a loaded region bundle, independent of the JSON backend in use."""
+    cached = _data_hashes.get(id(region_data))
+    if cached is None or cached[0] is not region_data:
+        text = json.dumps(region_data, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=repr)
+        cached = (region_data, hashlib.sha256(text.encode('utf-8')).hexdigest())
+        _data_hashes[id(region_data)] = cached
+    return cached[1]
+
+class ProfileCache:
+    """A size-bounded, least-recently-used cache of seeded runs in `cache_dir`."""
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.entries_dir = os.path.join(cache_dir, 'entries')
+        self.stats_path = os.path.join(cache_dir, 'stats.json')
+        os.makedirs(self.entries_dir, exist_ok=True)
+
+    def key(self, region_data, constraints, seed, start_index=0):
+        """Returns the cache key of profiles start_index .. start_index + constraints['num_profiles'] - 1 of `seed`."""
+        constraints = {name: value for name, value in constraints.items() if name not in PRESENTATION_KEYS}
+        constraints['valid_only'] = bool(constraints.get('valid_only'))
+        material = {
+            'version': CACHE_FORMAT_VERSION,
+            'code': code_version(),
+            'data': data_hash(region_data),
+            'year': datetime.date.today().year,
+            'seed': seed,
+            'start_index': start_index,
+            'constraints': constraints,
+        }
+        return hashlib.sha256(json.dumps(material, sort_keys=True, default=repr).encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.entries_dir, key[:2], key + ENTRY_SUFFIX)
+
+    def _count(self, name, amount=1):
+        stats = load_path(self.stats_path) if os.path.exists(self.stats_path) else {}
+        stats[name] = stats.get(name, 0) + amount
+        write_json_atomic(self.stats_path, stats)
+
+    def open(self, key):
+        """Returns the cached entry opened for binary reading and counts a hit, or counts a miss and returns None."""
+        try:
+            f = open(self.path(key), 'rb')
+        except FileNotFoundError:
+            self._count('misses')
+            return None
+        try:
+            os.utime(self.path(key)) # Most recently used
+        except FileNotFoundError:
+            pass # Evicted just now by another process; the open file stays readable
+        self._count('hits')
+        return f
+
+    def read_chunks(self, f):
+        """Yields the NDJSON bytes of an opened entry, CACHE_READ_BYTES at a time, and closes it."""
+        with f:
+            while True:
+                data = f.read(CACHE_READ_BYTES)
+                if not data:
+                    break
+                yield data
+
+    def read_profiles(self, f):
+        """Yields the profiles of an opened entry and closes it."""
+        with f:
+            for line in f:
+                yield loads(line)
+
+    def store(self, key, profiles):
+        """
+        Yields `profiles` while writing them to the entry for `key`. The entry is only added
+        once the iterable is exhausted; if the caller stops early nothing is cached.
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for profile in profiles:
+                    f.write(dumps_bytes(profile) + b'\n')
+                    yield profile
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for root, _, files in os.walk(self.entries_dir):
+            for file_name in files:
+                if file_name.endswith(ENTRY_SUFFIX):
+                    path = os.path.join(root, file_name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Deletes least recently used entries until the cache fits in max_bytes. Returns how many were deleted."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        if evicted:
+            self._count('evictions', evicted)
+        return evicted
+
+    def stats(self):
+        stats = load_path(self.stats_path) if os.path.exists(self.stats_path) else {}
+        entries = self._entries()
+        lookups = stats.get('hits', 0) + stats.get('misses', 0)
+        return {
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+            'hits': stats.get('hits', 0),
+            'misses': stats.get('misses', 0),
+            'evictions': stats.get('evictions', 0),
+            'hit_rate': round(stats.get('hits', 0) / lookups, 3) if lookups else 0.0,
+        }
+
+    def profiles_slice(self, region_data, constraints, seed, start_index, count, debug_print_func, apply_consistency_checks=False, stats=None):
+        """
+        Like generate_profiles_slice, but served from the cache when the same slice has been
+        generated before. Returns (profiles iterator, whether it came from the cache).
+        """
+        valid_only = bool(apply_consistency_checks or constraints.get('valid_only'))
+        key = self.key(region_data, dict(constraints, num_profiles=count, valid_only=valid_only), seed, start_index)
+        f = self.open(key)
+        if f is not None:
+            return self.read_profiles(f), True
+        generated = generate_profiles_slice(region_data, constraints, seed, start_index, count, debug_print_func, apply_consistency_checks, stats)
+        return self.store(key, generated), False
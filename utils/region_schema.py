@@ -0,0 +1,200 @@
+from numbers import Number
+
+# Shape checks and normalization for a loaded region bundle. load_region_data runs this once,
+# so malformed data fails at startup with every problem listed, instead of surfacing as a
+# KeyError deep inside generation, and generators can index the normalized data directly.
+
+REQUIRED_NAME_LISTS = ('first_names_male', 'first_names_female', 'last_names')
+PHYSICAL_CHOICE_LISTS = ('eye_colors', 'natural_hair_colors', 'hair_styles', 'build_types')
+MARK_KINDS = ('tattoos', 'scars', 'birthmarks')
+GENDERS = ('male', 'female')
+
+# Used when a region's physical rules omit a mark's probabilities (same defaults as before)
+DEFAULT_MARK_PROBABILITIES = {
+    'tattoos': {'base_probability': 0.2, 'age_multiplier': 0.3},
+    'scars': {'base_probability': 0.1, 'age_multiplier': 0.2},
+    'birthmarks': {'base_probability': 0.05, 'age_multiplier': 0.1},
+}
+
+DEFAULT_LEGAL_MARRIAGE_AGE = 18
+
+class RegionDataError(ValueError):
+    """Raised when a region bundle does not have the shape the generators expect."""
+    def __init__(self, source, problems):
+        self.source = source
+        self.problems = problems
+        super().__init__(f"Invalid region data in {source}:\n" + "\n".join(f"  - {problem}" for problem in problems))
+
+class _Checker:
+    def __init__(self):
+        self.problems = []
+
+    def problem(self, path, message):
+        self.problems.append(f"{path}: {message}")
+
+    def mapping(self, parent, key, path, required=True, default=None):
+        """Returns parent[key] if it is a dict; fills in `default` (or reports it) when missing."""
+        value = parent.get(key)
+        if value is None:
+            if required:
+                self.problem(f"{path}{key}", "missing")
+                return {}
+            value = parent[key] = default if default is not None else {}
+        if not isinstance(value, dict):
+            self.problem(f"{path}{key}", f"expected an object, got {type(value).__name__}")
+            return {}
+        return value
+
+    def sequence(self, parent, key, path, required=True, non_empty=False):
+        """Returns parent[key] if it is a list; fills in [] (or reports it) when missing."""
+        value = parent.get(key)
+        if value is None:
+            if required:
+                self.problem(f"{path}{key}", "missing")
+                return []
+            value = parent[key] = []
+        if not isinstance(value, list):
+            self.problem(f"{path}{key}", f"expected a list, got {type(value).__name__}")
+            return []
+        if non_empty and not value:
+            self.problem(f"{path}{key}", "must not be empty")
+        return value
+
+    def records(self, items, path, fields):
+        """Checks every item is a dict holding `fields` ({field: type or tuple of types})."""
+        for i, item in enumerate(items):
+            if not isinstance(item, dict):
+                self.problem(f"{path}[{i}]", f"expected an object, got {type(item).__name__}")
+                continue
+            for field, types in fields.items():
+                if field not in item:
+                    self.problem(f"{path}[{i}]", f"missing '{field}'")
+                elif not isinstance(item[field], types) or isinstance(item[field], bool):
+                    self.problem(f"{path}[{i}].{field}", f"unexpected type {type(item[field]).__name__}")
+
+    def named(self, items, path):
+        """Turns plain-string options into {'name': ...} objects, checking the rest have a name."""
+        for i, item in enumerate(items):
+            if isinstance(item, str):
+                items[i] = {'name': item}
+        self.records(items, path, {'name': str})
+
+    def age_ranges(self, rules, path):
+        for i, rule in enumerate(rules):
+            age_range = rule.get('age_range') if isinstance(rule, dict) else None
+            if (not isinstance(age_range, (list, tuple)) or len(age_range) != 2
+                    or not all(isinstance(age, int) for age in age_range) or age_range[0] > age_range[1]):
+                self.problem(f"{path}[{i}].age_range", f"expected [min_age, max_age], got {age_range!r}")
+
+    def min_max(self, value, path):
+        if (not isinstance(value, dict) or not isinstance(value.get('min'), int) or not isinstance(value.get('max'), int)
+                or value['min'] > value['max']):
+            self.problem(path, f"expected {{'min': int, 'max': int}} with min <= max, got {value!r}")
+
+def _check_names(checker, region_data):
+    for key in REQUIRED_NAME_LISTS:
+        checker.records(checker.sequence(region_data, key, '', non_empty=True), key, {'name': str, 'weight': Number})
+    checker.records(checker.sequence(region_data, 'middle_names', '', required=False), 'middle_names', {'name': str, 'weight': Number})
+
+def _check_occupations(checker, region_data):
+    occupations = region_data.get('occupations')
+    if isinstance(occupations, dict): # Raw occupations file shape: {"occupations": [...]}
+        region_data['occupations'] = occupations.get('occupations')
+    occupations = checker.sequence(region_data, 'occupations', '', non_empty=True)
+    checker.records(occupations, 'occupations', {'name': str, 'min_age': int, 'max_age': int})
+    for occupation in occupations:
+        if isinstance(occupation, dict):
+            occupation.setdefault('gender_bias', {})
+
+def _check_physical(checker, region_data):
+    characteristics = checker.mapping(region_data, 'physical_characteristics', '')
+    path = 'physical_characteristics.'
+    for key in PHYSICAL_CHOICE_LISTS:
+        checker.sequence(characteristics, key, path, non_empty=True)
+    heights = checker.mapping(characteristics, 'height_ranges_cm', path)
+    for gender in GENDERS:
+        checker.min_max(heights.get(gender), f"{path}height_ranges_cm.{gender}")
+    marks = checker.mapping(characteristics, 'distinguishing_marks', path)
+    for kind in MARK_KINDS:
+        checker.records(checker.sequence(marks, kind, f"{path}distinguishing_marks.", required=False),
+                        f"{path}distinguishing_marks.{kind}", {'description': str, 'location': str})
+
+    rules = checker.mapping(region_data, 'physical_characteristics_rules', '', required=False)
+    path = 'physical_characteristics_rules.'
+    for key in ('hair_color_rules', 'height_rules_cm', 'build_type_rules'):
+        checker.age_ranges(checker.sequence(rules, key, path, required=False), f"{path}{key}")
+    for i, rule in enumerate(rules.get('height_rules_cm', [])):
+        for gender in GENDERS:
+            checker.min_max(rule.get(gender) if isinstance(rule, dict) else None, f"{path}height_rules_cm[{i}].{gender}")
+    probabilities = checker.mapping(rules, 'distinguishing_mark_probabilities', path, required=False)
+    for kind, defaults in DEFAULT_MARK_PROBABILITIES.items():
+        kind_probabilities = checker.mapping(probabilities, kind, f"{path}distinguishing_mark_probabilities.", required=False)
+        for key, value in defaults.items():
+            kind_probabilities.setdefault(key, value)
+
+def _check_activities(checker, region_data):
+    hobbies_rules = checker.mapping(region_data, 'hobbies_rules', '', required=False)
+    age_based_hobbies = checker.sequence(hobbies_rules, 'age_based_hobbies', 'hobbies_rules.', required=False)
+    checker.age_ranges(age_based_hobbies, 'hobbies_rules.age_based_hobbies')
+    for i, rule in enumerate(age_based_hobbies):
+        if isinstance(rule, dict):
+            checker.named(checker.sequence(rule, 'hobbies', f'hobbies_rules.age_based_hobbies[{i}].', required=False),
+                          f'hobbies_rules.age_based_hobbies[{i}].hobbies')
+
+    skills_rules = checker.mapping(region_data, 'skills_interests_rules', '', required=False)
+    age_based_skills = checker.sequence(skills_rules, 'age_based_skills', 'skills_interests_rules.', required=False)
+    checker.age_ranges(age_based_skills, 'skills_interests_rules.age_based_skills')
+    for i, rule in enumerate(age_based_skills):
+        if isinstance(rule, dict):
+            checker.named(checker.sequence(rule, 'skills', f'skills_interests_rules.age_based_skills[{i}].', required=False),
+                          f'skills_interests_rules.age_based_skills[{i}].skills')
+    interests = checker.sequence(skills_rules, 'interests', 'skills_interests_rules.', required=False)
+    for i, interest in enumerate(interests):
+        if not isinstance(interest, str):
+            checker.problem(f"skills_interests_rules.interests[{i}]", f"expected a string, got {type(interest).__name__}")
+
+def _check_family(checker, region_data):
+    if not isinstance(region_data.setdefault('legal_marriage_age', DEFAULT_LEGAL_MARRIAGE_AGE), int):
+        checker.problem('legal_marriage_age', "expected an integer")
+    family_rules = checker.mapping(region_data, 'family_details_rules', '', required=False)
+    marital_status_rules = checker.sequence(family_rules, 'marital_status_rules', 'family_details_rules.', required=False)
+    checker.age_ranges(marital_status_rules, 'family_details_rules.marital_status_rules')
+    checker.records(marital_status_rules, 'family_details_rules.marital_status_rules', {'status_weights': dict})
+    checker.sequence(family_rules, 'children_info_rules', 'family_details_rules.', required=False)
+
+def _check_unconventional(checker, region_data):
+    rules = checker.mapping(region_data, 'unconventional_data_rules', '')
+    life_events = checker.sequence(rules, 'life_events', 'unconventional_data_rules.', required=False)
+    checker.records(life_events, 'unconventional_data_rules.life_events', {'event': str})
+    checker.age_ranges(life_events, 'unconventional_data_rules.life_events')
+    checker.sequence(rules, 'personality_traits', 'unconventional_data_rules.', non_empty=True)
+
+def _check_contact(checker, region_data):
+    checker.mapping(region_data, 'email_rules', '', required=False)
+    formats = checker.sequence(region_data, 'phone_number_formats', '', required=False)
+    for i, phone_format in enumerate(formats):
+        if not isinstance(phone_format, str):
+            checker.problem(f"phone_number_formats[{i}]", f"expected a string, got {type(phone_format).__name__}")
+
+def _check_addresses(checker, region_data):
+    address_data = checker.mapping(region_data, 'address_data', '')
+    checker.records(checker.sequence(address_data, 'regions', 'address_data.', non_empty=True), 'address_data.regions', {'name': str})
+
+SECTION_CHECKS = (
+    _check_names, _check_occupations, _check_physical, _check_activities,
+    _check_family, _check_unconventional, _check_contact, _check_addresses,
+)
+
+def validate_region_data(region_data, source="region data"):
+    """
+    Checks a loaded region bundle and normalizes it in place: optional sections get their
+    empty defaults, plain-string skills and hobbies become {'name': ...} objects, and the
+    occupations file's {"occupations": [...]} shape becomes a list. Raises RegionDataError
+    listing every problem found. Returns region_data.
+    """
+    checker = _Checker()
+    for check in SECTION_CHECKS:
+        check(checker, region_data)
+    if checker.problems:
+        raise RegionDataError(source, checker.problems)
+    return region_data
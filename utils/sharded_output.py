@@ -0,0 +1,272 @@
+import csv
+import hashlib
+import io
+import os
+import tempfile
+
+from utils.compression import CompressedWriter, CompressionReport, get_codec
+from utils.csv_writer import encode_value, profile_columns
+from utils.json_backend import dumps, dumps_bytes, load_path
+
+# Large runs are written as a series of shards (profiles-00001.ndjson.gz, ...) that are each
+# closed after a row count or an amount of (uncompressed) data. A shard is written under a
+# .part name and renamed once complete, and the manifest listing the finished shards with
+# their row counts and SHA-256 checksums is rewritten after every shard, so a failed run
+# leaves behind a consistent set of whole shards. Several writers (e.g. one per worker) can
+# share a directory under different worker numbers; merge_manifests combines their manifests.
+# Shards are compressed on a background thread (see compression.py).
+
+SHARD_CHUNK_ROWS = 1000 # Profiles encoded and written together
+FIRST_SIZED_CHUNK_ROWS = 16 # Chunk used to estimate the row size when shards are limited by size
+PART_SUFFIX = '.part'
+
+# output format -> shard file extension
+SHARD_EXTENSIONS = {'json': 'ndjson', 'csv': 'csv'}
+
+class _HashingFile:
+    """Passes bytes through to a file, hashing and counting them on the way."""
+    def __init__(self, f):
+        self._file = f
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def flush(self):
+        self._file.flush()
+
+class _NdjsonEncoder:
+    def header(self):
+        return b''
+
+    def encode(self, profiles):
+        """Returns the encoded rows, one bytes object per profile."""
+        return [dumps_bytes(profile) + b'\n' for profile in profiles]
+
+class _CsvEncoder:
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def _take(self):
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return text.encode('utf-8')
+
+    def header(self):
+        self._writer.writerow(self.columns)
+        return self._take()
+
+    def encode(self, profiles):
+        """Returns the encoded rows, one bytes object per profile (a cell may contain newlines)."""
+        columns = self.columns
+        writerow, tell = self._writer.writerow, self._buffer.tell
+        ends = []
+        for profile in profiles:
+            writerow([encode_value(profile.get(column)) for column in columns])
+            ends.append(tell())
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return [text[start:end].encode('utf-8') for start, end in zip([0] + ends, ends)]
+
+class _Shard:
+    """One output file being written; becomes visible under its final name on close()."""
+    def __init__(self, path, codec, header):
+        self.path = path
+        self._part_path = path + PART_SUFFIX
+        self._file = open(self._part_path, 'wb')
+        self._hashing = _HashingFile(self._file)
+        self.stream = CompressedWriter(self._hashing, codec)
+        self.rows = 0
+        self.uncompressed_bytes = 0
+        if header:
+            self.write(header, 0)
+
+    def write(self, data, rows):
+        self.stream.write(data)
+        self.rows += rows
+        self.uncompressed_bytes += len(data)
+
+    def close(self):
+        """Finishes the file and returns its manifest entry."""
+        try:
+            self.stream.close()
+        finally:
+            self._file.close()
+        os.replace(self._part_path, self.path)
+        return {
+            'file': os.path.basename(self.path),
+            'rows': self.rows,
+            'bytes': self._hashing.size,
+            'uncompressed_bytes': self.uncompressed_bytes,
+            'sha256': self._hashing.sha256.hexdigest(),
+        }
+
+def write_json_atomic(path, data):
+    """Writes a manifest or state file atomically, so readers never see a half-written one."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(dumps(data, indent=2))
+        os.chmod(tmp_path, 0o644) # mkstemp creates the file private to the user
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+class ShardedWriter:
+    """
+    Writes profiles to numbered shards in `output_dir`, starting a new shard after
+    `max_rows` profiles and/or at the first row that takes it to `max_bytes` of uncompressed
+    output (so a shard overruns max_bytes by less than a row).
+    output_format 'json' writes NDJSON shards, 'csv' writes CSV shards that each have a
+    header (columns from `constraints` unless `columns` is given). `compression` names a
+    codec from compression.CODECS, or None; `report` totals the compression of every shard.
+    `completed_shards` (manifest entries) continues an earlier writer's numbering, and
+    `on_shard_closed(writer)` is called each time a shard fills up and is rotated out.
+    """
+    def __init__(self, output_dir, output_format='json', max_rows=None, max_bytes=None, compression='gzip',
+                 constraints=None, columns=None, prefix='profiles', worker=None, chunk_rows=SHARD_CHUNK_ROWS,
+                 completed_shards=None, on_shard_closed=None):
+        if output_format not in SHARD_EXTENSIONS:
+            raise ValueError(f"Sharded output supports {', '.join(SHARD_EXTENSIONS)}, not {output_format!r}")
+        if not max_rows and not max_bytes:
+            raise ValueError("Sharded output needs a maximum number of rows or bytes per shard.")
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.compression = compression if compression != 'none' else None
+        self.codec = get_codec(self.compression)
+        self.report = CompressionReport(self.compression)
+        self.chunk_rows = chunk_rows
+        # Workers writing into the same directory each get their own shard names and manifest
+        self.shard_prefix = prefix if worker is None else f"{prefix}-w{worker:02d}"
+        self.extension = SHARD_EXTENSIONS[output_format] + (self.codec.extension if self.codec else '')
+        self.manifest_path = os.path.join(output_dir, f"{self.shard_prefix}-manifest.json")
+
+        if output_format == 'csv':
+            self.columns = list(columns if columns is not None else profile_columns(constraints or {}))
+            self._encoder = _CsvEncoder(self.columns)
+        else:
+            self.columns = None
+            self._encoder = _NdjsonEncoder()
+
+        self.shards = list(completed_shards or []) # manifest entries of the finished shards
+        self.on_shard_closed = on_shard_closed
+        self._shard = None
+        self._pending = []
+        self._row_bytes = None # average encoded row size in the current shard, once known
+        os.makedirs(output_dir, exist_ok=True)
+
+    @property
+    def rows_written(self):
+        return sum(shard['rows'] for shard in self.shards) + (self._shard.rows if self._shard else 0) + len(self._pending)
+
+    def manifest(self, complete):
+        return {
+            'format': SHARD_EXTENSIONS[self.output_format],
+            'compression': self.compression,
+            'columns': self.columns,
+            'complete': complete,
+            'total_rows': sum(shard['rows'] for shard in self.shards),
+            'shards': list(self.shards),
+        }
+
+    def _chunk_limit(self):
+        limit = self.chunk_rows
+        if self.max_rows:
+            limit = min(limit, self.max_rows - (self._shard.rows if self._shard else 0))
+        if self.max_bytes:
+            if self._row_bytes is None:
+                return min(limit, FIRST_SIZED_CHUNK_ROWS)
+            remaining = self.max_bytes - (self._shard.uncompressed_bytes if self._shard else 0)
+            limit = min(limit, max(1, -(-remaining // self._row_bytes)))
+        return limit
+
+    def write(self, profile):
+        self._pending.append(profile)
+        if len(self._pending) >= self._chunk_limit():
+            self._flush_pending()
+
+    def write_many(self, profiles):
+        for profile in profiles:
+            self.write(profile)
+
+    def _flush_pending(self):
+        if not self._pending:
+            return
+        rows = self._encoder.encode(self._pending)
+        self._pending = []
+        start = 0
+        while start < len(rows):
+            if self._shard is None:
+                path = os.path.join(self.output_dir, f"{self.shard_prefix}-{len(self.shards) + 1:05d}.{self.extension}")
+                self._shard = _Shard(path, self.codec, self._encoder.header())
+            shard = self._shard
+            end = len(rows)
+            if self.max_bytes:
+                # The chunk size is only an estimate; the shard ends at the first row that reaches max_bytes
+                room = self.max_bytes - shard.uncompressed_bytes - len(rows[start])
+                end = start + 1
+                while end < len(rows) and room > 0:
+                    room -= len(rows[end])
+                    end += 1
+            data = b''.join(rows[start:end])
+            shard.write(data, end - start)
+            self._row_bytes = max(1, len(data) // (end - start))
+            start = end
+            if (self.max_rows and shard.rows >= self.max_rows) or (self.max_bytes and shard.uncompressed_bytes >= self.max_bytes):
+                self._close_shard()
+                if self.on_shard_closed is not None:
+                    self.on_shard_closed(self)
+
+    def _close_shard(self):
+        shard, self._shard = self._shard, None
+        self._row_bytes = None # Each shard sizes its chunks from its own rows
+        self.shards.append(shard.close())
+        self.report.add(shard.stream)
+        write_json_atomic(self.manifest_path, self.manifest(complete=False))
+
+    def close(self, complete=True):
+        """Writes out the last (partial) shard and the final manifest, and returns the manifest."""
+        self._flush_pending()
+        if self._shard is not None:
+            self._close_shard()
+        manifest = self.manifest(complete)
+        write_json_atomic(self.manifest_path, manifest)
+        return manifest
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # The rows written so far are kept either way; the manifest records whether the run finished.
+        self.close(complete=exc_type is None)
+        return False
+
+def merge_manifests(manifest_paths, path):
+    """Combines the manifests of several writers (e.g. one per worker) into one at `path`."""
+    manifests = [load_path(manifest_path) for manifest_path in manifest_paths]
+    if not manifests:
+        raise ValueError("No manifests to merge.")
+    first = manifests[0]
+    for manifest in manifests[1:]:
+        if (manifest['format'], manifest['compression'], manifest['columns']) != (first['format'], first['compression'], first['columns']):
+            raise ValueError("Cannot merge manifests of differently formatted shards.")
+    merged = {
+        'format': first['format'],
+        'compression': first['compression'],
+        'columns': first['columns'],
+        'complete': all(manifest['complete'] for manifest in manifests),
+        'total_rows': sum(manifest['total_rows'] for manifest in manifests),
+        'shards': [shard for manifest in manifests for shard in manifest['shards']],
+    }
+    write_json_atomic(path, merged)
+    return merged